@@ -0,0 +1,298 @@
+"""
+run chains of transforms and code generators over many files without the gui,
+nothing here imports Qt
+
+    ast_tool_box_batch -o out -s ctree.transformations.PyBasicConversions \\
+        -s my_lowering.Lower(4,name='x') -s ctree.c.codegen.CCodeGen 'kernels/*.py'
+
+each file is parsed and passed through the stages in order, the result is
+written below the output directory as generated code when the last stage is a
+code generator and as source text otherwise. with --fuse consecutive
+transforms that declare local_rewrite run fused in one walk of the tree.
+with --project-files each file of a generated ctree Project is written to
+its own path, in a directory named after the source file. outputs are
+written atomically and left alone when their content is unchanged. files are
+processed in a pool of worker processes, a json summary with per file and
+per stage timings is written to stdout or to --summary
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import argparse
+import ast
+import glob
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+from ast_tool_box.models.code_export import export_files, write_if_changed
+from ast_tool_box.models.code_generation import generate_chunks, tree_to_source
+from ast_tool_box.models.fused_transform import FusedTransform, fuse_passes
+
+
+class StageError(ValueError):
+    pass
+
+
+def parse_stage(spec):
+    """
+    'package.module.Class' or 'package.module.Class(arg, key=value)' into
+    (qualified name, args, kwargs), arguments must be python literals
+    """
+    try:
+        expression = ast.parse(spec.strip(), mode='eval').body
+    except SyntaxError:
+        raise StageError("cannot parse stage %r" % spec)
+
+    args, kwargs = [], {}
+    if isinstance(expression, ast.Call):
+        try:
+            args = [ast.literal_eval(argument) for argument in expression.args]
+            kwargs = dict((keyword.arg, ast.literal_eval(keyword.value)) for keyword in expression.keywords)
+        except ValueError:
+            raise StageError("stage arguments must be literals in %r" % spec)
+        expression = expression.func
+
+    names = []
+    while isinstance(expression, ast.Attribute):
+        names.insert(0, expression.attr)
+        expression = expression.value
+    if not isinstance(expression, ast.Name) or not names:
+        raise StageError("stage %r is not a qualified class name" % spec)
+    names.insert(0, expression.id)
+    return ".".join(names), args, kwargs
+
+
+def load_stage_class(qualified_name):
+    module_name, _, class_name = qualified_name.rpartition('.')
+    try:
+        module = importlib.import_module(module_name)
+        return getattr(module, class_name)
+    except (ImportError, AttributeError) as exception:
+        raise StageError("cannot load %s: %s" % (qualified_name, exception))
+
+
+def is_code_generator(stage_class):
+    try:
+        from ctree.codegen import CodeGenVisitor
+    except ImportError:
+        return False
+    return issubclass(stage_class, CodeGenVisitor)
+
+
+def expand_sources(patterns):
+    """file names matching the patterns, in order, each once"""
+    file_names = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for file_name in matches:
+            if os.path.isfile(file_name) and file_name not in seen:
+                seen.add(file_name)
+                file_names.append(file_name)
+    return file_names
+
+
+def output_name(file_name, source_root, output_directory, suffix):
+    relative_name = os.path.relpath(os.path.abspath(file_name), source_root)
+    return os.path.join(output_directory, os.path.splitext(relative_name)[0] + suffix)
+
+
+def transform_passes(transforms, fuse=False):
+    """
+    (name, pass) for transforms, a list of (qualified name, transformer),
+    fused transforms share a pass named by joining their names with +
+    """
+    if not fuse:
+        return transforms
+    names = dict((id(transformer), name) for name, transformer in transforms)
+    passes = []
+    for transform_pass in fuse_passes([transformer for _, transformer in transforms]):
+        if isinstance(transform_pass, FusedTransform):
+            name = "+".join(names[id(transformer)] for transformer in transform_pass.transformers)
+        else:
+            name = names[id(transform_pass)]
+        passes.append((name, transform_pass))
+    return passes
+
+
+def run_stages(source_text, stages, file_name="<unknown>", fuse=False, project_files=False):
+    """
+    parse source_text and pass it through stages, a list of (qualified name,
+    args, kwargs). returns the resulting text, whether it is generated code and
+    a list of per stage timings, fused stages are timed together. with
+    project_files generated code is the list of GeneratedChunks of its files
+    """
+    timings = []
+
+    start = time.time()
+    tree = ast.parse(source_text, file_name)
+    timings.append({'stage': 'ast.parse', 'seconds': time.time() - start})
+
+    generated = False
+    result = tree
+    pending = []
+    for qualified_name, args, kwargs in list(stages) + [(None, (), {})]:
+        stage_class = load_stage_class(qualified_name) if qualified_name else None
+        if stage_class is not None and not is_code_generator(stage_class):
+            pending.append((qualified_name, stage_class(*args, **kwargs)))
+            generated = False
+            continue
+
+        for name, transform_pass in transform_passes(pending, fuse):
+            start = time.time()
+            result = transform_pass.visit(result)
+            timings.append({'stage': name, 'seconds': time.time() - start})
+        pending = []
+
+        if stage_class is not None:
+            start = time.time()
+            chunks = list(generate_chunks(result))
+            result = chunks if project_files else "".join(chunk.display_text() for chunk in chunks)
+            generated = True
+            timings.append({'stage': qualified_name, 'seconds': time.time() - start})
+
+    if not generated:
+        start = time.time()
+        result = tree_to_source(result)
+        timings.append({'stage': 'to_source', 'seconds': time.time() - start})
+    return result, generated, timings
+
+
+def process_file(job):
+    """runs in a worker process, never raises, failures are reported in the summary entry"""
+    file_name, stages, source_root, output_directory, code_suffix, fuse, project_files = job
+    start = time.time()
+    entry = {'file': file_name, 'output': None, 'status': 'ok', 'error': None, 'stages': [], 'written': []}
+    try:
+        with open(file_name) as source_file:
+            source_text = source_file.read()
+        result, generated, entry['stages'] = run_stages(source_text, stages, file_name, fuse, project_files)
+
+        if generated and project_files:
+            entry['output'] = output_name(file_name, source_root, output_directory, '')
+            default_name = os.path.basename(entry['output']) + code_suffix
+            written = export_files(
+                entry['output'], [(chunk.file_name or default_name, chunk.code) for chunk in result]
+            )
+        else:
+            suffix = code_suffix if generated else '.py'
+            entry['output'] = output_name(file_name, source_root, output_directory, suffix)
+            written = [(entry['output'], write_if_changed(entry['output'], result))]
+        entry['written'] = [{'path': path, 'status': status} for path, status in written]
+    except Exception:
+        entry['status'] = 'error'
+        entry['error'] = traceback.format_exc()
+    entry['seconds'] = time.time() - start
+    return entry
+
+
+def _add_import_paths(import_paths):
+    for path in import_paths:
+        path = os.path.abspath(path)
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def run_batch(file_names, stage_specs, output_directory, processes=None, import_paths=(), code_suffix='.c',
+              fuse=False, project_files=False):
+    """
+    processes every file and returns the summary, processes=1 runs
+    everything in this process, fuse=True runs consecutive local_rewrite
+    transforms in one walk, project_files writes the files of generated projects apart
+    """
+    stages = [parse_stage(spec) for spec in stage_specs]
+    _add_import_paths(import_paths)
+    for qualified_name, _, _ in stages:
+        load_stage_class(qualified_name)
+
+    if file_names:
+        source_root = os.path.commonprefix([os.path.dirname(os.path.abspath(name)) + os.sep for name in file_names])
+        source_root = os.path.dirname(source_root)
+    else:
+        source_root = os.getcwd()
+    jobs = [
+        (file_name, stages, source_root, output_directory, code_suffix, fuse, project_files)
+        for file_name in file_names
+    ]
+
+    start = time.time()
+    if processes == 1 or len(jobs) < 2:
+        entries = [process_file(job) for job in jobs]
+    else:
+        pool = multiprocessing.Pool(processes, initializer=_add_import_paths, initargs=(list(import_paths),))
+        try:
+            entries = list(pool.imap(process_file, jobs))
+        finally:
+            pool.close()
+            pool.join()
+
+    failed = sum(1 for entry in entries if entry['status'] != 'ok')
+    return {
+        'stages': [spec for spec in stage_specs],
+        'fused': fuse,
+        'project_files': project_files,
+        'output_directory': output_directory,
+        'succeeded': len(entries) - failed,
+        'failed': failed,
+        'seconds': time.time() - start,
+        'files': entries,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='ast_tool_box_batch',
+        description='Apply transforms and code generators to many files'
+    )
+    parser.add_argument('sources', nargs='+', help='source files or glob patterns')
+    parser.add_argument(
+        '-s', '--stage', dest='stages', action='append', default=[], required=True,
+        help="transform or code generator class by qualified name, with literal arguments "
+             "as in 'module.Class(1, name=\"x\")', repeat for each stage in order"
+    )
+    parser.add_argument('-o', '--output', dest='output_directory', required=True, help='output directory')
+    parser.add_argument('-j', '--processes', type=int, default=None, help='worker processes, default one per cpu')
+    parser.add_argument('-I', '--path', dest='import_paths', action='append', default=[],
+                        help='directory to add to sys.path to find stages')
+    parser.add_argument('--suffix', dest='code_suffix', default='.c', help="suffix of generated code files")
+    parser.add_argument('--fuse', dest='fuse', action='store_true',
+                        help='run consecutive transforms that declare local_rewrite in one walk')
+    parser.add_argument('--project-files', dest='project_files', action='store_true',
+                        help='write each file of a generated project to its own path')
+    parser.add_argument('--summary', default='-', help='file for the json summary, - for stdout')
+    args = parser.parse_args(argv)
+
+    file_names = expand_sources(args.sources)
+    if not file_names:
+        parser.error("no source files match %s" % " ".join(args.sources))
+
+    try:
+        summary = run_batch(
+            file_names, args.stages, args.output_directory,
+            processes=args.processes, import_paths=args.import_paths, code_suffix=args.code_suffix,
+            fuse=args.fuse, project_files=args.project_files
+        )
+    except StageError as exception:
+        parser.error(str(exception))
+
+    text = json.dumps(summary, indent=2, sort_keys=True)
+    if args.summary == '-':
+        print(text)
+    else:
+        with open(args.summary, 'w') as summary_file:
+            summary_file.write(text + "\n")
+
+    for entry in summary['files']:
+        if entry['status'] != 'ok':
+            print("failed %s\n%s" % (entry['file'], entry['error']), file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,21 @@
 from __future__ import print_function
 
-import copy
-
 from ast_tool_box.controllers.tree_transform_controller import TreeTransformController
+from ast_tool_box.controllers.transform_backends import InProcessBackend, ThreadBackend, WorkerProcessBackend
+from ast_tool_box.models.transform_cache import TransformCache
+from ast_tool_box.models.code_export import export_files, ExportError, WRITTEN
+from ast_tool_box.models.code_generation import CodegenPool
+from ast_tool_box.models.transform_profiler import TransformProfiler
+from ast_tool_box.models.transform_worker import TransformJob
+from ast_tool_box.models.visit_hooks import VisitCounter
 import ast_tool_box.models.code_models.code_model as code_model
+from ast_tool_box.models.code_models.code_graph import CodeGraph
 import ast_tool_box.models.transform_models.transform_file as transform_model
 import ast_tool_box.controllers.transform_presenter as transform_controllers
 
 from ast_tool_box.views.code_views.code_pane import CodePane
+from ast_tool_box.views.code_views.pending_transform_pane import PendingTransformPane
+from ast_tool_box.views.background_task import BackgroundTask
 import ast
 
 
@@ -17,9 +25,32 @@ class CodePresenter(object):
         print("type is                   %s" % TreeTransformController)
         assert isinstance(tree_transform_controller, TreeTransformController), "got %s" % tree_transform_controller
 
-        self.code_items = []
+        self.code_graph = CodeGraph()
         self.transform_presenter = None
         self.tree_transform_controller = tree_transform_controller
+        # when set, ast transforms visit the parent tree through CopyOnWriteTransform instead of
+        # a deep copy of it and the new tree shares all unchanged subtrees with its parent
+        self.copy_on_write = False
+        # when set, ast transforms run with a TransformProfiler and the new tree shows its report
+        self.profile_transforms = False
+        # when set, an ast transform applied to a node of a tree transforms just that node and
+        # splices the result into a copy of the whole tree rather than making a tree of the node
+        self.splice_subtrees = False
+        # when set, code generators write each generated file below this directory as it is done
+        self.generated_code_directory = None
+        # processes code generators spread the files of a project over, None is one per cpu
+        self.codegen_processes = 1
+        # the pool those processes are kept in between regenerations
+        self.codegen_pool = CodegenPool()
+        # when set, code generators record a source map linking the generated code to the tree
+        self.link_generated_code = True
+        self.transform_cache = TransformCache()
+        self.execution_backends = [InProcessBackend(), ThreadBackend(), WorkerProcessBackend()]
+        self.execution_backend = self.execution_backends[0]
+        self.pending_transforms = {}
+        # done callbacks of the pending transforms, a cancelled transform calls its with False
+        self.pending_done = {}
+        self.hashing_tasks = []
 
         self.code_pane = CodePane(code_presenter=self)
 
@@ -31,25 +62,33 @@ class CodePresenter(object):
         assert isinstance(transform_presenter, transform_controllers.TransformPresenter)
         self.transform_presenter = transform_presenter
 
+    @property
+    def code_items(self):
+        """the code items in the order they were made"""
+        return self.code_graph.ordered()
+
     def clear(self):
-        while len(self.code_items) > 0:
-            self.delete_last_item()
+        self.code_graph.clear()
         self.code_pane.clear()
 
     def delete_last(self):
-        self.delete(len(self.code_items)-1)
+        self.delete(self.count()-1)
 
     def count(self):
-        return len(self.code_items)
+        return len(self.code_graph)
 
     def delete_last_item(self):
-        self.code_items.remove(self.code_items[-1])
+        self.remove_code_item(self.code_graph.last())
+
+    def remove_code_item(self, code_item):
+        """forget code_item, the items derived from it stay but no longer have a parent in the graph"""
+        self.code_graph.remove(code_item)
 
     def __getitem__(self, item):
-        return self.code_items[item]
+        return self.code_graph.item_at(item)
 
     def __iter__(self):
-        return iter(self.code_items)
+        return iter(self.code_graph)
 
     def get_valid_index(self, index):
         """
@@ -64,54 +103,45 @@ class CodePresenter(object):
                 return None
 
         if index >= 0:
-            if index < len(self.code_items):
+            if index < self.count():
                 return index
         return None
 
     def current_item(self):
-        return self.code_items[-1]
+        return self.code_graph.last()
 
     def add_code_item(self, code_item):
-        self.code_items.append(code_item)
+        self.code_graph.add(code_item)
         self.code_pane.add_code_item(code_item)
 
     def resolve_transform_args(self, transform_thing):
         return self.code_pane.resolve_transform_arguments(transform_thing)
 
-    def apply_transform(self, code_item, transform_item):
+    def apply_transform(self, code_item, transform_item, tree_item=None):
         """
         transform some kind of code thing into another kind of code thing
-        using some kind of transform thing, update views accordingly
+        using some kind of transform thing, update views accordingly.
+        code_item can be a node of the tree of tree_item
         """
+        subtree_path = None
         if isinstance(code_item, ast.AST):
-            code_item = code_model.AstTreeItem(code_item)
+            if self.splice_subtrees and tree_item is not None and \
+                    isinstance(transform_item, transform_model.AstTransformItem):
+                subtree_path = tree_item.node_path(code_item)
+                if subtree_path is not None:
+                    code_item = tree_item
+            if isinstance(code_item, ast.AST):
+                code_item = code_model.AstTreeItem(code_item)
 
         assert isinstance(code_item, code_model.CodeItem)
         if transform_item is not None:
             assert isinstance(transform_item, transform_model.TransformThing), "bad type %s" % transform_item
-
-        def apply_codegen_transform(ast_root, argument_list):
-            """
-            Code generates each file in the project
-            """
-            import ctree.nodes
-            # assert isinstance(ast_root, ctree.nodes.Project), \
-            #     "apply_code_gen root of tree not Project is a %s" % ast_root
-
-            # TODO: stay more in line with ctree and use ResolveGeneratedPathRefs
-
-            # transform all files a combined source_text string
-            combined_source = ""
-            from ast_tool_box.transformers.NonCtreeNodeConverter import NonCtreeNodeConverter
-            converter = NonCtreeNodeConverter()
-            ast_root = converter.visit(ast_root)
-            if isinstance(ast_root, ctree.nodes.Project) and ast_root.files and len(ast_root.files) > 0:
-                for f in ast_root.files:
-                    combined_source += "File %s\n" % f.name
-                    combined_source += f.codegen()
-                return combined_source
-            else:
-                return ast_root.codegen()
+            try:
+                # transforms found through the discovery cache are imported now
+                transform_item.load()
+            except transform_model.TransformLoadError as error:
+                self.show_error(str(error))
+                return
 
         if isinstance(code_item, code_model.FileItem):
             self.show_error("Transformation cannot be applied to source_text code")
@@ -126,14 +156,11 @@ class CodePresenter(object):
                         print("got arg %s" % a)
                     argument_values = [eval(x) for x in argument_values]
 
-                tree_copy = copy.deepcopy(code_item.ast_tree)
-                new_tree = transform_item.get_instance(argument_values).visit(tree_copy)
-                new_ast_tree_item = code_model.AstTreeItem(
-                    new_tree,
-                    name=transform_item.name(),
-                    parent_link=code_model.CodeTransformLink(code_item=code_item, transform_item=transform_item),
+                self.run_transform(
+                    code_item, transform_item, argument_values,
+                    self.derived_item_maker(code_item, transform_item, argument_values, subtree_path),
+                    subtree_path=subtree_path
                 )
-                self.add_code_item(new_ast_tree_item)
             elif isinstance(transform_item, transform_model.CodeGeneratorItem):
                 # new_code = transform_item.get_instance().visit(code_item.ast_tree)
                 argument_values = []
@@ -145,13 +172,19 @@ class CodePresenter(object):
                         print("got arg %s" % a)
                     argument_values = [eval(x) for x in argument_values]
 
-                tree_copy = copy.deepcopy(code_item.ast_tree)
-                new_code = apply_codegen_transform(tree_copy, argument_values)
-                new_code_item = code_model.GeneratedCodeItem(
-                    new_code,
-                    parent_link=code_model.CodeTransformLink(code_item=code_item, transform_item=transform_item),
+                # running a generator again updates the tab of the code it made last time
+                generated_item = self.generated_item_for(code_item, transform_item, argument_values)
+                done = None
+                if generated_item is not None:
+                    def done(succeeded):
+                        if succeeded:
+                            self.code_pane.select_item(generated_item)
+
+                self.run_transform(
+                    code_item, transform_item, argument_values,
+                    self.derived_item_maker(code_item, transform_item, argument_values),
+                    replace_item=generated_item, done=done
                 )
-                self.add_code_item(new_code_item)
             elif transform_item is None:
                 new_tree = code_item.ast_tree
                 new_ast_tree_item = code_model.AstTreeItem(
@@ -169,9 +202,275 @@ class CodePresenter(object):
         else:
             self.show_error("Unknown transform of\n%s\n with\n%s" % (code_item, transform_item))
 
+    def generated_item_for(self, code_item, transform_item, argument_values):
+        """the code transform_item generated from code_item with argument_values before, if it is still open"""
+        for child in self.code_graph.children_of(code_item):
+            link = child.parent_code_item
+            if isinstance(child, code_model.GeneratedCodeItem) and link.transform_item is not None and \
+                    link.transform_item.name() == transform_item.name() and \
+                    repr(link.argument_values) == repr(list(argument_values)):
+                return child
+        return None
+
+    def derived_item_maker(self, code_item, transform_item, argument_values, subtree_path=None):
+        """function making the item for the result of transform_item applied to code_item"""
+        link = code_model.CodeTransformLink(
+            code_item=code_item, transform_item=transform_item, argument_values=argument_values,
+            subtree_path=subtree_path
+        )
+        if isinstance(transform_item, transform_model.CodeGeneratorItem):
+            return lambda new_code: code_model.GeneratedCodeItem(new_code, parent_link=link)
+
+        def make_tree_item(new_tree):
+            new_item = code_model.AstTreeItem(new_tree, name=transform_item.name(), parent_link=link)
+            if subtree_path or self.copy_on_write:
+                new_item.hash_base = code_item
+            return new_item
+        return make_tree_item
+
+    def run_transform(self, code_item, transform_item, argument_values, make_item, replace_item=None, done=None,
+                      subtree_path=None):
+        """
+        apply transform_item to the tree of code_item, or reuse a cached result,
+        make_item turns the result into the code item that is added, or that
+        replace_item takes the place of. asynchronous backends get a placeholder
+        tab until the result arrives. done(succeeded) is called at the end,
+        with False when the transform is cancelled. with subtree_path only the
+        node there is transformed and spliced back into the tree. the placeholder
+        of a code generator shows the generated files as they arrive. for
+        asynchronous backends a tree that was never hashed is hashed on a
+        background thread first, that counts its nodes for the progress. a
+        tree is only hashed for the cache when it holds a result of the same
+        transform. items made from a result share its tree with the cache
+        """
+        backend = self.execution_backend
+        if backend.asynchronous and not code_item.has_tree_hasher():
+            task = BackgroundTask(code_item.tree_hasher)
+            self.hashing_tasks.append(task)
+
+            def hashed(_):
+                self.hashing_tasks.remove(task)
+                self.run_transform(
+                    code_item, transform_item, argument_values, make_item, replace_item=replace_item, done=done,
+                    subtree_path=subtree_path
+                )
+
+            def hashing_failed(message):
+                self.hashing_tasks.remove(task)
+                self.show_error("%s failed\n%s" % (transform_item.name(), message))
+                if done is not None:
+                    done(False)
+
+            task.succeeded.connect(hashed)
+            task.failed.connect(hashing_failed)
+            task.start()
+            return
+
+        generate = isinstance(transform_item, transform_model.CodeGeneratorItem)
+        profile = self.profile_transforms and not generate
+        write_files = generate and self.generated_code_directory is not None
+
+        def deliver(new_item):
+            if replace_item is None:
+                self.add_code_item(new_item)
+            else:
+                replace_item.take_result_of(new_item)
+                self.code_pane.refresh_code_item(replace_item)
+            if done is not None:
+                done(True)
+
+        cache_key = self.transform_cache.key(
+            code_item.deferred_tree_hash(), transform_item, argument_values, subtree_path
+        )
+        cached = None if profile or write_files else self.transform_cache.get(cache_key)
+        if cached is not None:
+            result, generated = cached
+            new_item = make_item(result)
+            if generate:
+                new_item.source_map = generated['source_map']
+                new_item.generated_files = generated['generated_files']
+            else:
+                new_item.shared_tree = True
+            deliver(new_item)
+            return
+
+        job = TransformJob.for_transform_item(transform_item, code_item.ast_tree, argument_values, generate)
+        job.copy_on_write = self.copy_on_write
+        job.subtree_path = subtree_path
+        if profile:
+            job.profiler = TransformProfiler(transform_item.name())
+        if write_files:
+            job.output_directory = self.generated_code_directory
+        if generate:
+            job.codegen_processes = self.codegen_processes
+            job.codegen_pool = self.codegen_pool
+            job.record_source_map = self.link_generated_code
+
+        pane = None
+        if backend.asynchronous:
+            if generate:
+                job.progress = VisitCounter(unit="files generated")
+            else:
+                job.progress = VisitCounter(total=0 if subtree_path else len(code_item.tree_hasher()))
+            pane = PendingTransformPane(transform_item.name(), "Running %s %s" % (
+                transform_item.name(), backend.name.lower()))
+            pane.cancel_requested.connect(lambda: self.cancel_transform(pane))
+            pane.discarded.connect(lambda: self.cancel_transform(pane, remove_pane=False))
+            self.code_pane.add_pending_pane(pane)
+
+        def finished():
+            """false when the transform was cancelled meanwhile"""
+            if pane is None:
+                return True
+            self.pending_done.pop(pane, None)
+            if self.pending_transforms.pop(pane, None) is None:
+                return False
+            self.code_pane.remove_pane(pane)
+            return True
+
+        def succeeded(new_result):
+            if finished():
+                generated = {'source_map': job.source_map, 'generated_files': job.generated_files}
+                self.transform_cache.put(cache_key, (new_result, generated), transform_item)
+                new_item = make_item(new_result)
+                # a worker process sends back its own filled in profiler
+                new_item.transform_profile = job.profiler
+                if generate:
+                    new_item.file_timings = job.file_timings
+                    new_item.source_map = job.source_map
+                    new_item.generated_files = job.generated_files
+                else:
+                    new_item.shared_tree = True
+                deliver(new_item)
+
+        def failed(message):
+            if finished():
+                self.show_error("%s failed\n%s" % (transform_item.name(), message))
+                if done is not None:
+                    done(False)
+
+        def partial(chunk):
+            if pane in self.pending_transforms:
+                pane.append_text(chunk.display_text())
+
+        running_job = backend.run(job, succeeded, failed, partial if pane is not None and generate else None)
+        if pane is not None:
+            self.pending_transforms[pane] = running_job
+            if done is not None:
+                self.pending_done[pane] = done
+            pane.watch(running_job.progress)
+
+    def replay_lineage(self, transform_collection):
+        """
+        after transform_collection was reloaded, recompute every code item
+        whose lineage uses one of its transforms. only the steps from the first
+        such transform on are rerun, in the order the items were made, and a
+        step whose input came out unchanged is skipped with everything below
+        it. the items and their tabs are updated in place
+        """
+        def uses_collection(link):
+            return (
+                link is not None and link.transform_item is not None and
+                link.transform_item.transform_file is transform_collection
+            )
+
+        made_by_collection = [
+            code_item for code_item in self.code_graph if uses_collection(code_item.parent_code_item)
+        ]
+        steps = self.code_graph.closure(made_by_collection)
+        self.replay_steps(steps, transform_collection, changed=set())
+
+    def replay_steps(self, steps, transform_collection, changed):
+        """start the first of steps that needs to be rerun, the rest follow when it is done"""
+        while steps:
+            code_item = steps.pop(0)
+            link = code_item.parent_code_item
+            parent_item = link.code_item
+            if link.transform_item is None:
+                continue
+            if link.transform_item.transform_file is transform_collection:
+                transform_item = self.reloaded_transform(link.transform_item, transform_collection)
+                if transform_item is None:
+                    self.show_error("%s is no longer in %s, %s was not updated" % (
+                        link.transform_item.name(), transform_collection.collection_name, code_item.name()))
+                    continue
+            elif id(parent_item) in changed:
+                transform_item = link.transform_item
+            else:
+                continue
+
+            def step_done(succeeded, code_item=code_item, old_hash=code_item.result_hash()):
+                if succeeded and code_item.result_hash() != old_hash:
+                    changed.add(id(code_item))
+                self.replay_steps(steps, transform_collection, changed)
+
+            self.run_transform(
+                parent_item, transform_item, link.argument_values,
+                self.derived_item_maker(parent_item, transform_item, link.argument_values, link.subtree_path),
+                replace_item=code_item, done=step_done, subtree_path=link.subtree_path
+            )
+            return
+
+    @staticmethod
+    def reloaded_transform(transform_item, transform_collection):
+        """the item transform_collection now has in place of transform_item, None if it is gone"""
+        for candidate in transform_collection.node_transforms + transform_collection.code_generators:
+            if type(candidate) is type(transform_item) and candidate.name() == transform_item.name():
+                return candidate
+        return None
+
+    def cancel_transform(self, pane, remove_pane=True):
+        running_job = self.pending_transforms.pop(pane, None)
+        done = self.pending_done.pop(pane, None)
+        if running_job is not None:
+            running_job.cancel()
+        if remove_pane:
+            self.code_pane.remove_pane(pane)
+        if done is not None:
+            done(False)
+
+    def set_execution_backend(self, backend):
+        assert backend in self.execution_backends
+        self.execution_backend = backend
+
+    def transforms_reloaded(self, transform_collection=None):
+        """forget results of the reloaded transforms, all of them when transform_collection is None"""
+        if transform_collection is None:
+            self.transform_cache.clear()
+        else:
+            self.transform_cache.invalidate(transform_collection)
+        for backend in self.execution_backends:
+            backend.restart()
+        # the pool processes imported the old modules
+        self.codegen_pool.close()
+
+    def shutdown(self):
+        # nothing is started after the window closes
+        self.pending_done.clear()
+        for pane in list(self.pending_transforms):
+            self.cancel_transform(pane, remove_pane=False)
+        for backend in self.execution_backends:
+            backend.shutdown()
+        self.codegen_pool.close()
+
     def show_error(self, message):
         self.code_pane.show_error(message)
 
+    def export_generated_code(self, code_item, output_directory):
+        """write each file of code_item, generated code, to its own path below output_directory"""
+        if not isinstance(code_item, code_model.GeneratedCodeItem) or not code_item.generated_files:
+            self.show_error("Select the tab of generated code to export it")
+            return None
+        try:
+            results = export_files(output_directory, code_item.files())
+        except (ExportError, EnvironmentError) as exception:
+            self.show_error("Export to %s failed\n%s" % (output_directory, exception))
+            return None
+        written = sum(1 for _, status in results if status == WRITTEN)
+        self.code_pane.show_message("Exported %d files to %s, %d written, %d unchanged" % (
+            len(results), output_directory, written, len(results) - written))
+        return results
+
     def new_item_from_source(self, source_text):
         new_code_item = code_model.FileItem(code=source_text)
         parser_item = transform_model.AstParseItem()
@@ -198,23 +497,12 @@ class CodePresenter(object):
             self.add_code_item(new_code_item)
             self.add_code_item(new_tree_item)
 
-    def fix_derived_items_before_delete(self, item_to_delete):
-        for other_item in self.code_items:
-            if other_item != item_to_delete:
-                if other_item.parent_link:
-                    if other_item.parent_link.parent_ast_tree == item_to_delete:
-                        other_item.parent_link = None
-
     def delete(self, index):
         """
-        delete an ast tree from manager
-        ast_tree_item can be AstTreeWidgetItem or index or string
-        representing index
+        delete the code item at index and its tab
         """
-        if index < len(self.code_items):
-            # self.fix_derived_items_before_delete(self.code_items[index])
-            self.code_items.remove(self.code_items[index])
-            self.code_pane.delete_at(index)
+        if 0 <= index < self.count():
+            self.code_pane.delete_item(self[index])
             return True
         else:
             self.show_error("Tried to delete non-existing code panel %s" % index)
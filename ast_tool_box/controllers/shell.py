@@ -16,6 +16,11 @@ atexit.register(readline.write_history_file, history_file)
 del os, history_file
 
 from ast_tool_box.controllers.tree_transform_controller import TreeTransformController
+from ast_tool_box.models.ast_query import compile_query, AstQueryError
+from ast_tool_box.models.transform_profiler import TransformProfiler
+from ast_tool_box.models.ast_cloner import clone_tree
+from ast_tool_box.models.code_export import export_files, ExportError
+from ast_tool_box.models.code_generation import generate_chunks
 
 
 class AstTransformInterpreter(object):
@@ -110,6 +115,100 @@ class AstTransformInterpreter(object):
         else:
             print("apply requires two numeric indices, tree index and transform index")
 
+    def fuse_command(self, command):
+        """fuse ast_index transform_index transform_index ..., applies the transforms in as few walks as possible"""
+        fields = command.split()
+
+        if len(fields) > 3:
+            ast_index = self.controller.ast_tree_manager.get_valid_index(fields[1])
+            transform_indices = [
+                self.controller.ast_transformer_manager.get_valid_index(field) for field in fields[2:]
+            ]
+            if ast_index is None or None in transform_indices:
+                print("fuse missing index or index out of range")
+                return
+
+            fused_item = self.controller.ast_transformer_manager.fuse(transform_indices)
+            self.controller.apply_transform(ast_index, fused_item, name=fused_item.name())
+            self.show_asts()
+        else:
+            print("fuse requires a tree index and at least two transform indices")
+
+    def profile_command(self, command):
+        """profile ast_index transform_index [json_file], applies the transform and prints where its time went"""
+        fields = command.split()
+
+        if len(fields) > 2:
+            ast_index = self.controller.ast_tree_manager.get_valid_index(fields[1])
+            transform_index = self.controller.ast_transformer_manager.get_valid_index(fields[2])
+            if ast_index is None or transform_index is None:
+                print("profile missing index or index out of range")
+                return
+
+            transform_item = self.controller.ast_transformer_manager[transform_index]
+            profiler = TransformProfiler(transform_item.name())
+            transform_item.profiler = profiler
+            try:
+                self.controller.apply_transform(ast_index, transform_index)
+            finally:
+                transform_item.profiler = None
+
+            if len(fields) > 3:
+                with open(fields[3], 'w') as json_file:
+                    json_file.write(profiler.to_json())
+                print("profile written to %s" % fields[3])
+            else:
+                print(profiler.to_json())
+        else:
+            print("profile requires two numeric indices, tree index and transform index")
+
+    def query_command(self, command):
+        """query ast_index selector, lists the nodes of the tree matched by the selector"""
+        fields = command.split(None, 2)
+
+        if len(fields) > 2:
+            ast_index = self.controller.ast_tree_manager.get_valid_index(fields[1])
+            if ast_index is None:
+                print("query ast index missing or out of range")
+                return
+            try:
+                ast_query = compile_query(fields[2])
+            except AstQueryError as e:
+                print("bad query: %s" % e)
+                return
+
+            ast_tree = self.controller.ast_tree_manager[ast_index].ast_tree
+            for index, node in enumerate(ast_query.find_all(ast_tree)):
+                if hasattr(node, 'lineno'):
+                    print("match[%d]: %s (%d:%d)" % (index, type(node).__name__, node.lineno, node.col_offset))
+                else:
+                    print("match[%d]: %s" % (index, type(node).__name__))
+        else:
+            print("query requires a tree index and a selector, e.g. query 0 For Call[func=Name[id=exp]]")
+
+    def export_command(self, command):
+        """export ast_index directory, writes each file of the code generated from the tree below directory"""
+        fields = command.split()
+
+        if len(fields) > 2:
+            ast_index = self.controller.ast_tree_manager.get_valid_index(fields[1])
+            if ast_index is None:
+                print("export ast index missing or out of range")
+                return
+
+            tree = clone_tree(self.controller.ast_tree_manager[ast_index].ast_tree)
+            default_name = "tree_%d.c" % ast_index
+            try:
+                files = [(chunk.file_name or default_name, chunk.code) for chunk in generate_chunks(tree)]
+                results = export_files(fields[2], files)
+            except (ExportError, EnvironmentError) as e:
+                print("export failed: %s" % e)
+                return
+            for path, status in results:
+                print("%-9s %s" % (status, path))
+        else:
+            print("export requires a tree index and a directory")
+
     def set_verbose(self, new_value=None):
         if new_value is None:
             self.verbose = not self.verbose
@@ -122,6 +221,10 @@ class AstTransformInterpreter(object):
         print("transform [list|delete|load] <arg>")
         print("ast [list|delete|load] <arg>")
         print("apply ast_index transform_index")
+        print("fuse ast_index transform_index transform_index ...")
+        print("profile ast_index transform_index [json_file]")
+        print("query ast_index selector")
+        print("export ast_index directory")
         print("quit")
         print("commands can be abbreviated to first three letters")
         print("\n")
@@ -149,6 +252,14 @@ class AstTransformInterpreter(object):
                 self.transform_command(user_input)
             elif user_input.lower().startswith('app'):
                 self.apply_transform(user_input)
+            elif user_input.lower().startswith('fus'):
+                self.fuse_command(user_input)
+            elif user_input.lower().startswith('pro'):
+                self.profile_command(user_input)
+            elif user_input.lower().startswith('que'):
+                self.query_command(user_input)
+            elif user_input.lower().startswith('exp'):
+                self.export_command(user_input)
             elif user_input.lower().startswith('ver'):
                 self.verbose = not self.verbose
             else:
@@ -0,0 +1,116 @@
+"""
+where CodePresenter runs a transform, each backend takes a TransformJob and
+reports the result or a traceback through callbacks on the gui thread, and
+the chunks of generated code as they are done through partial
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import threading
+import traceback
+
+from ast_tool_box.models.transform_worker import TransformWorkerPool
+from ast_tool_box.models.visit_hooks import VisitCounter
+from ast_tool_box.views.background_task import BackgroundTask
+
+
+class InProcessBackend(object):
+    """runs the job right away on the gui thread, the window waits for it"""
+    name = "In the gui process"
+    asynchronous = False
+
+    def run(self, job, succeeded, failed, partial=None):
+        job.chunk_sink = partial
+        try:
+            result = job.run()
+        except Exception:
+            failed(traceback.format_exc())
+            return None
+        succeeded(result)
+        return None
+
+    def restart(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class _RunningJob(object):
+    """
+    handle to a job a backend is running, cancel drops its result and stops it
+    where possible. progress is the job's VisitCounter, None when the backend
+    cannot see the traversal
+    """
+    def __init__(self, task, stop=None, progress=None):
+        self.task = task
+        self.stop = stop
+        self.progress = progress
+
+    def cancel(self):
+        self.task.cancel()
+        if self.stop is not None:
+            self.stop()
+
+
+class ThreadBackend(object):
+    """
+    copies, transforms and generates code on a background thread, for
+    transforms that are safe to run in the gui process. a VisitCounter on the
+    transformer reports progress and lets cancel stop the traversal
+    """
+    name = "In a background thread"
+    asynchronous = True
+
+    def run(self, job, succeeded, failed, partial=None):
+        if job.progress is None:
+            job.progress = VisitCounter()
+        progress = job.progress
+
+        def stop():
+            progress.cancelled = True
+
+        task = BackgroundTask(job.run)
+        task.succeeded.connect(succeeded)
+        task.failed.connect(failed)
+        if partial is not None:
+            task.partial.connect(partial)
+            job.chunk_sink = task.report
+        return _RunningJob(task.start(), stop, progress)
+
+    def restart(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+
+class WorkerProcessBackend(object):
+    """
+    sends the job to a TransformWorkerPool, a thread waits for the worker so
+    the gui keeps running. a job that hangs, crashes or runs out of memory
+    only costs its worker process
+    """
+    name = "In worker processes"
+    asynchronous = True
+
+    def __init__(self, pool=None):
+        self.pool = pool or TransformWorkerPool()
+
+    def run(self, job, succeeded, failed, partial=None):
+        job.copy_tree = False
+        cancel_event = threading.Event()
+        task = BackgroundTask(self.pool.run, (job, cancel_event))
+        task.succeeded.connect(succeeded)
+        task.failed.connect(failed)
+        if partial is not None:
+            task.partial.connect(partial)
+            job.chunk_sink = task.report
+        return _RunningJob(task.start(), cancel_event.set)
+
+    def restart(self):
+        self.pool.restart()
+
+    def shutdown(self):
+        self.pool.shutdown()
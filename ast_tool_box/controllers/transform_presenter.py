@@ -9,9 +9,10 @@ from operator import methodcaller
 from PySide import QtCore, QtGui
 
 from ast_tool_box.models.transform_models.transform_file import TransformFile, TransformPackage
+from ast_tool_box.models.transform_models.discovery_cache import DiscoveryCache
 from ast_tool_box.controllers.tree_transform_controller import TreeTransformController
 from ast_tool_box.views.transform_views.transform_pane import TransformPane
-from ctree.codegen import CodeGenVisitor
+from ast_tool_box.views.background_task import BackgroundTask
 from ast_tool_box.util import Util
 
 
@@ -20,8 +21,16 @@ class TransformPresenter(object):
     keeps track of transforms (subclasses of ast.NodeTransformers or
     ctree.codegen.CodeGenVisitor) that are found in either a package
     or a file, transforms can be applied to the code objects in the
-    code pane
+    code pane. what is found in each file or package is kept in a
+    DiscoveryCache, later startups take it from there and only import a
+    transform's module when the transform is applied.
+
+    start packages are listed without being looked into, after the window is
+    up the ones the cache knows are filled in from a background thread, the
+    others are imported, also in the background, when they are expanded
     """
+    use_discovery_cache = True
+
     def __init__(self, tree_transform_controller=None, start_packages=None):
         assert isinstance(tree_transform_controller, TreeTransformController)
 
@@ -32,6 +41,11 @@ class TransformPresenter(object):
         self.transform_collections = []
         self.transforms_loaded = []
         self.transforms_by_name = {}
+        self.discovery_cache = DiscoveryCache() if self.use_discovery_cache else None
+        self.checking = set()
+        self.expand_requested = set()
+        self.importing = set()
+        self.discovery_tasks = []
 
     def transform_items(self):
         for collection in self.transform_collections:
@@ -45,14 +59,22 @@ class TransformPresenter(object):
         reload all transforms, clearing everything first
         """
         to_load = self.transform_collections[:]
+        if self.code_presenter is not None:
+            self.code_presenter.transforms_reloaded()
 
         for module in to_load:
-            TransformPresenter.delete_module(module.package_name)
+            if module.discovered:
+                TransformPresenter.delete_module(module.package_name)
 
+        # what was never discovered stays that way
         self.transform_collections = []
-        self.load_files(
-            map(lambda x: x.collection_name, to_load)
-        )
+        for module in to_load:
+            if module.discovered:
+                self.load_file(module.collection_name, cached=False)
+            else:
+                self.transform_collections.append(module)
+        self.transform_pane.transform_tree_widget.build(self.transform_collections)
+        self.show_pending_states()
 
     def set_code_presenter(self, code_presenter):
         # assert isinstance(code_presenter, controllers.TransformPresenter)
@@ -77,32 +99,150 @@ class TransformPresenter(object):
         """return current transforms"""
         return len(list(self.transform_items()))
 
-    def load_file(self, file_name):
+    def load_file(self, file_name, cached=True):
+        """cached False imports the file or package even when the discovery cache is current for it"""
         print("loading %s" % file_name)
         if not os.path.isfile(file_name):
-            transform_package = TransformPackage(file_name)
+            transform_package = TransformPackage(file_name, discovery_cache=self.discovery_cache, cached=cached)
             if len(transform_package.node_transforms) > 0 or len(transform_package.code_generators) > 0:
                 self.transform_collections.append(transform_package)
             else:
                 TransformPane.show_error("Cannot open %s" % file_name)
             return
 
-        transform_file = TransformFile(file_name)
+        transform_file = TransformFile(file_name, discovery_cache=self.discovery_cache, cached=cached)
         self.transform_collections.append(transform_file)
         if transform_file.load_error_info:
             message = transform_file.load_error_info
             self.transform_pane.show_error(message)
 
-    def load_files(self, file_names):
+    def load_files(self, file_names, cached=True):
+        for file_name in file_names:
+            self.load_file(file_name, cached=cached)
+
+        self.transform_pane.transform_tree_widget.build(self.transform_collections)
+        self.show_pending_states()
+
+    def add_start_packages(self, file_names):
+        """list file_names in the transform pane without looking into them, see discover_start_packages"""
         for file_name in file_names:
-            self.load_file(file_name)
+            if os.path.isfile(file_name):
+                collection = TransformFile(file_name, discovery_cache=self.discovery_cache, lazy=True)
+            else:
+                collection = TransformPackage(file_name, discovery_cache=self.discovery_cache, lazy=True)
+            self.transform_collections.append(collection)
 
         self.transform_pane.transform_tree_widget.build(self.transform_collections)
 
+    def discover_start_packages(self):
+        """
+        fill in the start packages the discovery cache is current for, on a
+        background thread, nothing is imported
+        """
+        tree_widget = self.transform_pane.transform_tree_widget
+        pending = [
+            collection for collection in self.transform_collections
+            if not collection.discovered and collection not in self.importing and collection not in self.checking
+        ]
+        if not pending:
+            return
+
+        for collection in pending:
+            self.checking.add(collection)
+            tree_widget.show_pending(collection, "looking for transforms...")
+
+        def from_cache():
+            for collection in pending:
+                try:
+                    collection.load_cached()
+                except Exception as exception:
+                    print("discovery cache failed for %s error %s" % (collection.collection_name, exception))
+            return pending
+
+        self.run_discovery(from_cache, self.cache_checked)
+
+    def show_pending_states(self):
+        """put back the indicators of collections being discovered after the tree was built again"""
+        tree_widget = self.transform_pane.transform_tree_widget
+        for collection in self.checking:
+            tree_widget.show_pending(collection, "looking for transforms...")
+        for collection in self.importing:
+            tree_widget.show_pending(collection, "loading transforms...")
+
+    def cache_checked(self, checked):
+        tree_widget = self.transform_pane.transform_tree_widget
+        for collection in checked:
+            self.checking.discard(collection)
+            if collection.discovered:
+                self.collection_discovered(collection)
+            elif collection in self.expand_requested:
+                self.import_collection(collection)
+            else:
+                tree_widget.show_pending(collection, "expand to load transforms")
+        self.expand_requested.difference_update(checked)
+
+    def collection_expanded(self, collection):
+        """the user opened an undiscovered file or package, import it"""
+        if collection.discovered or collection in self.importing:
+            return
+        if collection in self.checking:
+            self.expand_requested.add(collection)
+            return
+        self.import_collection(collection)
+
+    def import_collection(self, collection):
+        self.importing.add(collection)
+        self.transform_pane.transform_tree_widget.show_pending(collection, "loading transforms...")
+
+        def imported(_):
+            self.collection_discovered(collection)
+
+        def failed(message):
+            collection.load_error_info = message
+            collection.discovered = True
+            self.collection_discovered(collection)
+
+        self.run_discovery(collection.update, imported, failed)
+
+    def run_discovery(self, function, succeeded, failed=None):
+        task = BackgroundTask(function)
+        self.discovery_tasks.append(task)
+
+        def finished():
+            if task in self.discovery_tasks:
+                self.discovery_tasks.remove(task)
+
+        def task_succeeded(result):
+            finished()
+            succeeded(result)
+
+        def task_failed(message):
+            finished()
+            if failed is not None:
+                failed(message)
+            else:
+                print("transform discovery failed\n%s" % message)
+
+        task.succeeded.connect(task_succeeded)
+        task.failed.connect(task_failed)
+        task.start()
+
+    def collection_discovered(self, collection):
+        self.importing.discard(collection)
+        if collection not in self.transform_collections:
+            return
+        self.transform_pane.transform_tree_widget.rebuild(collection)
+        if collection.load_error_info:
+            self.transform_pane.show_error(collection.load_error_info)
+
     def update_file(self, transform_collection):
         TransformPresenter.delete_module(transform_collection.package_name)
+        if self.code_presenter is not None:
+            self.code_presenter.transforms_reloaded(transform_collection)
         transform_collection.update()
         self.transform_pane.transform_tree_widget.rebuild(transform_collection)
+        if self.code_presenter is not None and getattr(transform_collection, 'load_error_info', None) is None:
+            self.code_presenter.replay_lineage(transform_collection)
 
     @staticmethod
     def delete_module(module_name):
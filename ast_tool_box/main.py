@@ -137,8 +137,10 @@ class AstToolBox(QtGui.QMainWindow):
         self.code_presenter.set_transform_presenter(self.transform_presenter)
         self.transform_presenter.set_code_presenter(self.code_presenter)
 
+        # the window shows before the start packages are looked into, see discover_start_packages
         self.code_presenter.new_item_from_file(file_name)
-        self.transform_presenter.load_files(self.start_packages)
+        self.transform_presenter.add_start_packages(self.start_packages)
+        QtCore.QTimer.singleShot(0, self.transform_presenter.discover_start_packages)
 
         central_splitter = QtGui.QSplitter(self, orientation=QtCore.Qt.Horizontal)
         self.setCentralWidget(central_splitter)
@@ -184,6 +186,7 @@ class AstToolBox(QtGui.QMainWindow):
         """
         file_menu = self.menuBar().addMenu("&File")
         file_menu.addAction("&Open...", self.open_file, "Ctrl+O")
+        file_menu.addAction("&Export Generated Files...", self.export_generated_code, "Ctrl+E")
         #file_menu.addAction("C&lose", self.close_window, "Ctrl+W")
         file_menu.addAction("E&xit", AstToolBox.quit_application, "Ctrl+Q")
 
@@ -192,6 +195,49 @@ class AstToolBox(QtGui.QMainWindow):
         self.auto_expand_ast = QtGui.QAction("Expand AST trees on create", self, checkable=True, checked=True)
         assert self.auto_expand_ast.toggled.connect(self.set_auto_expand)
 
+        self.copy_on_write = QtGui.QAction(
+            "Share unchanged subtrees between transformed trees", self, checkable=True, checked=False
+        )
+        self.copy_on_write.toggled.connect(self.set_copy_on_write)
+        view_menu.addAction(self.copy_on_write)
+
+        self.profile_transforms = QtGui.QAction("Profile transforms", self, checkable=True, checked=False)
+        self.profile_transforms.toggled.connect(self.set_profile_transforms)
+        view_menu.addAction(self.profile_transforms)
+
+        self.splice_subtrees = QtGui.QAction(
+            "Transform selected nodes inside a copy of the whole tree", self, checkable=True, checked=False
+        )
+        self.splice_subtrees.toggled.connect(self.set_splice_subtrees)
+        view_menu.addAction(self.splice_subtrees)
+
+        self.write_generated_code = QtGui.QAction(
+            "Write generated files to a directory...", self, checkable=True, checked=False
+        )
+        self.write_generated_code.toggled.connect(self.set_generated_code_directory)
+        view_menu.addAction(self.write_generated_code)
+
+        self.parallel_codegen = QtGui.QAction(
+            "Generate project files in parallel", self, checkable=True, checked=False
+        )
+        self.parallel_codegen.toggled.connect(self.set_parallel_codegen)
+        view_menu.addAction(self.parallel_codegen)
+
+        self.link_generated_code = QtGui.QAction(
+            "Link generated code to the tree it came from", self, checkable=True, checked=True
+        )
+        self.link_generated_code.toggled.connect(self.set_link_generated_code)
+        view_menu.addAction(self.link_generated_code)
+
+        backend_menu = view_menu.addMenu("Run transforms")
+        backend_group = QtGui.QActionGroup(self)
+        for backend in self.code_presenter.execution_backends:
+            action = QtGui.QAction(backend.name, self, checkable=True)
+            action.setChecked(backend is self.code_presenter.execution_backend)
+            action.triggered.connect(lambda checked=True, backend=backend: self.code_presenter.set_execution_backend(backend))
+            backend_group.addAction(action)
+            backend_menu.addAction(action)
+
         self.menuBar().addSeparator()
         help_menu = self.menuBar().addMenu("&Help")
         help_menu.addAction('&About', self.about)
@@ -199,6 +245,37 @@ class AstToolBox(QtGui.QMainWindow):
     def set_auto_expand(self):
         self.tree_transform_controller.ast_tree_manager.set_auto_expand(self.auto_expand_ast.isChecked())
 
+    def set_copy_on_write(self):
+        self.code_presenter.copy_on_write = self.copy_on_write.isChecked()
+
+    def set_profile_transforms(self):
+        self.code_presenter.profile_transforms = self.profile_transforms.isChecked()
+
+    def set_splice_subtrees(self):
+        self.code_presenter.splice_subtrees = self.splice_subtrees.isChecked()
+
+    def set_generated_code_directory(self):
+        directory = None
+        if self.write_generated_code.isChecked():
+            directory = QtGui.QFileDialog.getExistingDirectory(self, "Write generated files to")
+            if not directory:
+                self.write_generated_code.setChecked(False)
+                return
+        self.code_presenter.generated_code_directory = directory
+
+    def set_parallel_codegen(self):
+        self.code_presenter.codegen_processes = None if self.parallel_codegen.isChecked() else 1
+
+    def set_link_generated_code(self):
+        self.code_presenter.link_generated_code = self.link_generated_code.isChecked()
+
+    def export_generated_code(self):
+        """write the files of the generated code in the current tab below a directory"""
+        code_item = self.code_presenter.code_pane.selected_item()
+        directory = QtGui.QFileDialog.getExistingDirectory(self, "Export generated files to")
+        if directory:
+            self.code_presenter.export_generated_code(code_item, directory)
+
     def new_file(self):
         """ Clears the widgets """
         self.ast_tree.make_tree_from()
@@ -221,6 +298,7 @@ class AstToolBox(QtGui.QMainWindow):
 
     def closeEvent(self, event):
         self.write_settings()
+        self.code_presenter.shutdown()
         event.accept()
 
     @staticmethod
@@ -235,7 +313,13 @@ logger = logging.getLogger(__name__)
 
 def main():
     """ Main program to test stand alone
+        ast_tool_box batch ... runs the headless batch pipeline, see ast_tool_box.batch,
+        ast_tool_box_batch runs it without importing Qt
     """
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        from ast_tool_box.batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
+
     sys.argv[0] = "AstToolBox"
     app = QtGui.QApplication(sys.argv) # to allow for Qt command line arguments
     remaining_argv = app.arguments()
@@ -0,0 +1,101 @@
+"""
+a fast replacement for copy.deepcopy of ast and ctree trees
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+import copy
+import types
+
+
+_atomic_types = set([type(None), bool, int, float, complex, str, bytes, type, types.FunctionType,
+                     types.BuiltinFunctionType, type(Ellipsis), type(NotImplemented)])
+try:
+    _atomic_types.update([unicode, long])
+except NameError:
+    pass
+
+
+def clone_tree(root, memo=None):
+    """
+    a deep copy of root, which may be a node or a list of nodes.
+
+    nodes are built with cls.__new__ and get a copy of the original's
+    __dict__, so fields, position attributes and whatever else ctree keeps on
+    a node come across without going through __reduce_ex__. the walk is
+    iterative, so deep trees do not hit the recursion limit.
+
+    immutable values are shared with the original. a node reached twice,
+    through a second field or an attribute such as a ctree parent pointer, is
+    cloned once and the clone is reached twice, so sharing and cycles inside
+    the tree are kept. a method bound to a node, as left by CtreeNode.delete,
+    is bound to the node's clone. anything else is handed to copy.deepcopy.
+
+    memo is a copy.deepcopy style memo, original id to clone, it can be
+    passed in to find the clone of any original node afterwards
+    """
+    if memo is None:
+        memo = {}
+    cloner = _Cloner(memo)
+    result = cloner.clone_value(root)
+    cloner.run()
+    return result
+
+
+class _Cloner(object):
+    def __init__(self, memo):
+        self.memo = memo
+        self.pending = []
+        self.keep_alive = memo.setdefault(id(memo), [])
+
+    def clone_node(self, node):
+        node_clone = self.memo.get(id(node))
+        if node_clone is None:
+            node_clone = type(node).__new__(type(node))
+            self.memo[id(node)] = node_clone
+            self.keep_alive.append(node)
+            self.pending.append((node, node_clone))
+        return node_clone
+
+    def clone_value(self, value):
+        value_type = type(value)
+        if value_type in _atomic_types:
+            return value
+        if isinstance(value, ast.AST):
+            return self.clone_node(value)
+        if value_type is list:
+            value_clone = self.memo.get(id(value))
+            if value_clone is None:
+                value_clone = []
+                self.memo[id(value)] = value_clone
+                self.keep_alive.append(value)
+                clone_value = self.clone_value
+                value_clone.extend([clone_value(element) for element in value])
+            return value_clone
+        if value_type is tuple:
+            return tuple([self.clone_value(element) for element in value])
+        if value_type is types.MethodType and isinstance(getattr(value, '__self__', None), ast.AST):
+            return types.MethodType(value.__func__, self.clone_node(value.__self__))
+        return copy.deepcopy(value, self.memo)
+
+    def run(self):
+        pending = self.pending
+        atomic_types = _atomic_types
+        memo = self.memo
+        clone_node = self.clone_node
+        clone_value = self.clone_value
+        AST = ast.AST
+        while pending:
+            node, node_clone = pending.pop()
+            attributes = node.__dict__.copy()
+            for key, value in node.__dict__.items():
+                if type(value) in atomic_types:
+                    continue
+                if isinstance(value, AST):
+                    value_clone = memo.get(id(value))
+                    attributes[key] = value_clone if value_clone is not None else clone_node(value)
+                else:
+                    attributes[key] = clone_value(value)
+            node_clone.__dict__.update(attributes)
@@ -0,0 +1,350 @@
+"""
+structural queries over ast and ctree trees, with a small css like syntax
+
+    For Call[func=Name[id=exp]]     Calls of exp anywhere inside a For
+    FunctionDef > Return            Returns directly under a FunctionDef
+    Name[id^=tmp], Attribute        Names starting with tmp, and all Attributes
+
+a selector is a chain of node tests separated by whitespace (descendant) or
+'>' (direct child). a node test is a class name, or * for any node, followed
+by predicates in brackets:
+
+    [field]             field is present and not empty
+    [field=value]       also != ^= $= *= (not equal, prefix, suffix, contains)
+    [field.sub=value]   follows attributes through nested nodes
+
+a value is a quoted string, a number or a bare word. when the field holds a
+node, or a list of nodes, a bare word is a class name and may carry its own
+predicates, Name[id=exp]. class names match any class in the node's mro so
+stmt, expr or CtreeNode can be used as well.
+
+queries are compiled once into matcher functions and a search visits each
+node of the tree once.
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+import re
+
+
+class AstQueryError(ValueError):
+    pass
+
+
+_token_pattern = re.compile(r"""
+    (?P<ws>\s+) |
+    (?P<string>'[^']*'|"[^"]*") |
+    (?P<number>-?\d+(?:\.\d+)?(?![\w])) |
+    (?P<ident>[A-Za-z_]\w*) |
+    (?P<op>!=|\^=|\$=|\*=|[\[\]>,*=.])
+""", re.VERBOSE)
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _token_pattern.match(text, position)
+        if not match:
+            raise AstQueryError("unexpected character %r at %d in %r" % (text[position], position, text))
+        kind = match.lastgroup
+        value = match.group(kind)
+        tokens.append((kind, value))
+        position = match.end()
+    tokens.append(('end', None))
+    return tokens
+
+
+_class_names_cache = {}
+
+
+def _class_names(clazz):
+    names = _class_names_cache.get(clazz)
+    if names is None:
+        names = frozenset(base.__name__ for base in clazz.__mro__)
+        _class_names_cache[clazz] = names
+    return names
+
+
+def child_nodes(node):
+    """the ast nodes held in the fields of node, lists are flattened"""
+    children = []
+    pending = [value for _, value in ast.iter_fields(node)]
+    pending.reverse()
+    while pending:
+        value = pending.pop()
+        if isinstance(value, ast.AST):
+            children.append(value)
+        elif isinstance(value, (list, tuple)):
+            pending.extend(reversed(value))
+    return children
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _compile_compare(operator, literal):
+    """matcher for a scalar field value against a literal from the query"""
+    text = literal if not _is_number(literal) else repr(literal)
+
+    if operator == '=':
+        if _is_number(literal):
+            return lambda value: value == literal if _is_number(value) else str(value) == text
+        return lambda value: str(value) == text
+    if operator == '!=':
+        if _is_number(literal):
+            return lambda value: value != literal if _is_number(value) else str(value) != text
+        return lambda value: str(value) != text
+    if operator == '^=':
+        return lambda value: str(value).startswith(text)
+    if operator == '$=':
+        return lambda value: str(value).endswith(text)
+    if operator == '*=':
+        return lambda value: text in str(value)
+    raise AstQueryError("unknown operator %s" % operator)
+
+
+def _compile_predicate(field_path, operator=None, literal=None, node_test=None):
+    """
+    matcher for one bracketed predicate, node_test is set when the
+    value could be a node test, literal is then the bare word
+    """
+    compare = None
+    if operator is not None and literal is not None:
+        compare = _compile_compare(operator, literal)
+
+    negate = operator == '!='
+
+    def get_value(node):
+        value = node
+        for field in field_path:
+            value = getattr(value, field, None)
+            if value is None:
+                return None
+        return value
+
+    def value_matches(value):
+        if isinstance(value, ast.AST):
+            if node_test is None:
+                return negate
+            return node_test(value) != negate
+        if compare is None:
+            return negate
+        return compare(value)
+
+    def predicate(node):
+        value = get_value(node)
+        if operator is None:
+            return bool(value)
+        if value is None:
+            return negate
+        if isinstance(value, (list, tuple)):
+            if negate:
+                return all(value_matches(element) for element in value)
+            return any(value_matches(element) for element in value)
+        return value_matches(value)
+
+    return predicate
+
+
+def _compile_node_test(type_name, predicates):
+    if type_name is None and not predicates:
+        return lambda node: True
+
+    def node_test(node):
+        if type_name is not None and type_name not in _class_names(type(node)):
+            return False
+        for predicate in predicates:
+            if not predicate(node):
+                return False
+        return True
+
+    return node_test
+
+
+class _Parser(object):
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self, skip_ws=True):
+        position = self.position
+        if skip_ws:
+            while self.tokens[position][0] == 'ws':
+                position += 1
+        return self.tokens[position]
+
+    def next(self, skip_ws=True):
+        if skip_ws:
+            self.skip_ws()
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def skip_ws(self):
+        skipped = False
+        while self.tokens[self.position][0] == 'ws':
+            self.position += 1
+            skipped = True
+        return skipped
+
+    def expect(self, kind, value=None):
+        token = self.next()
+        if token[0] != kind or (value is not None and token[1] != value):
+            raise AstQueryError("expected %s but found %s in %r" % (value or kind, token[1], self.text))
+        return token
+
+    def parse(self):
+        selectors = [self.parse_selector()]
+        while self.peek() == ('op', ','):
+            self.next()
+            selectors.append(self.parse_selector())
+        if self.peek()[0] != 'end':
+            raise AstQueryError("unexpected %s in %r" % (self.peek()[1], self.text))
+        return selectors
+
+    def parse_selector(self):
+        """returns a list of node tests and the combinators between them"""
+        node_tests = [self.parse_node_test()]
+        combinators = []
+        while True:
+            had_ws = self.skip_ws()
+            token = self.peek()
+            if token == ('op', '>'):
+                self.next()
+                combinators.append('>')
+            elif had_ws and (token[0] == 'ident' or token == ('op', '*')):
+                combinators.append(' ')
+            else:
+                break
+            node_tests.append(self.parse_node_test())
+        return node_tests, combinators
+
+    def parse_node_test(self):
+        """a class name or * followed by predicates, returns (matcher, bare word or None)"""
+        token = self.next()
+        if token[0] == 'ident':
+            type_name = token[1]
+        elif token == ('op', '*'):
+            type_name = None
+        else:
+            raise AstQueryError("expected a class name or * but found %s in %r" % (token[1], self.text))
+
+        predicates = []
+        while self.peek(skip_ws=False) == ('op', '['):
+            self.next()
+            predicates.append(self.parse_predicate())
+        return _compile_node_test(type_name, predicates), (type_name if not predicates else None)
+
+    def parse_predicate(self):
+        field_path = [self.expect('ident')[1]]
+        while self.peek() == ('op', '.'):
+            self.next()
+            field_path.append(self.expect('ident')[1])
+
+        token = self.next()
+        if token == ('op', ']'):
+            return _compile_predicate(field_path)
+        if token[0] != 'op' or token[1] not in ('=', '!=', '^=', '$=', '*='):
+            raise AstQueryError("expected an operator but found %s in %r" % (token[1], self.text))
+        operator = token[1]
+
+        value_token = self.peek()
+        literal = None
+        node_test = None
+        if value_token[0] == 'string':
+            literal = self.next()[1][1:-1]
+        elif value_token[0] == 'number':
+            number_text = self.next()[1]
+            literal = float(number_text) if '.' in number_text else int(number_text)
+        elif value_token[0] == 'ident' or value_token == ('op', '*'):
+            node_test, literal = self.parse_node_test()
+            if operator not in ('=', '!='):
+                if literal is None:
+                    raise AstQueryError("%s cannot be used with a node test in %r" % (operator, self.text))
+                node_test = None
+        else:
+            raise AstQueryError("expected a value but found %s in %r" % (value_token[1], self.text))
+
+        self.expect('op', ']')
+        return _compile_predicate(field_path, operator, literal, node_test)
+
+
+class AstQuery(object):
+    """a compiled query, see the module documentation for the syntax"""
+    def __init__(self, text):
+        self.text = text
+        self.selectors = []
+        for node_tests, combinators in _Parser(text).parse():
+            self.selectors.append(([test for test, _ in node_tests], combinators))
+
+    def __repr__(self):
+        return "AstQuery(%r)" % self.text
+
+    def matches(self, node, ancestors=()):
+        """does node match, ancestors run from the root down to node's parent"""
+        for node_tests, combinators in self.selectors:
+            if node_tests[-1](node) and self._match_ancestors(
+                    node_tests, combinators, len(node_tests) - 2, ancestors, len(ancestors) - 1):
+                return True
+        return False
+
+    def _match_ancestors(self, node_tests, combinators, test_index, ancestors, position):
+        if test_index < 0:
+            return True
+        if combinators[test_index] == '>':
+            return position >= 0 and node_tests[test_index](ancestors[position]) and self._match_ancestors(
+                node_tests, combinators, test_index - 1, ancestors, position - 1)
+
+        while position >= 0:
+            if node_tests[test_index](ancestors[position]) and self._match_ancestors(
+                    node_tests, combinators, test_index - 1, ancestors, position - 1):
+                return True
+            position -= 1
+        return False
+
+    def find_all(self, root):
+        """yields the matching nodes under root, and root itself, in tree order"""
+        ancestors = []
+        stack = [(root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            del ancestors[depth:]
+            if self.matches(node, ancestors):
+                yield node
+            ancestors.append(node)
+            children = child_nodes(node)
+            for child in reversed(children):
+                stack.append((child, depth + 1))
+
+    def find(self, root):
+        """the first matching node or None"""
+        for node in self.find_all(root):
+            return node
+        return None
+
+
+_compiled_queries = {}
+
+
+def compile_query(text):
+    """compiled queries are kept so repeating a query does not parse it again"""
+    query = _compiled_queries.get(text)
+    if query is None:
+        if len(_compiled_queries) > 100:
+            _compiled_queries.clear()
+        query = AstQuery(text)
+        _compiled_queries[text] = query
+    return query
+
+
+def find_all(query_text, root):
+    return list(compile_query(query_text).find_all(root))
+
+
+def find(query_text, root):
+    return compile_query(query_text).find(root)
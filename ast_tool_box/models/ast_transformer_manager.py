@@ -4,9 +4,10 @@ __author__ = 'Chick Markley'
 
 import sys
 import ast
-import copy
 from ast_tool_box.util import Util
-from ctree.codegen import CodeGenVisitor
+from ast_tool_box.models.copy_on_write import CopyOnWriteTransform
+from ast_tool_box.models.ast_cloner import clone_tree
+from ast_tool_box.models.fused_transform import run_passes
 
 
 class AstTransformerManager(object):
@@ -58,6 +59,7 @@ class AstTransformerManager(object):
 
     def reload(self):
         """rebuild list of all in memory subclasses of ast.NodeTransformer"""
+        from ctree.codegen import CodeGenVisitor
 
         self.transformer_items = map(
             lambda transformer: AstTransformerItem(transformer),
@@ -73,6 +75,13 @@ class AstTransformerManager(object):
             print("loaded %s" % transformer_item.name())
             self.transformers_by_name[transformer_item.name()] = transformer_item
 
+    def fuse(self, transformer_items):
+        """one item applying transformer_items, items or indices, in order"""
+        return FusedTransformerItem([
+            self.transformer_items[item] if isinstance(item, int) else item
+            for item in transformer_items
+        ])
+
     def get_instance_by_name(self, transformer_name):
         transformer_item = self.transformers_by_name[transformer_name]
         return transformer_item.get_instance()
@@ -108,7 +117,14 @@ class AstTransformerItem(object):
     """
     Basic wrapper of an ast.NodeTransformer with convenience methods
     for creating, getting names etc
+    copy_on_write makes copy_and_transform share unchanged subtrees with the
+    tree it was given rather than transforming a deep copy of it
+    a TransformProfiler in profiler is installed on every transformer made
+    by transform and copy_and_transform
     """
+    copy_on_write = False
+    profiler = None
+
     def __init__(self, node_transformer):
         self.node_transformer = node_transformer
 
@@ -121,16 +137,25 @@ class AstTransformerItem(object):
     def get_instance(self):
         return self.node_transformer()
 
+    def make_transformer(self, *args, **kwargs):
+        transformer = self.node_transformer(*args, **kwargs)
+        if self.profiler is not None:
+            self.profiler.install(transformer)
+        return transformer
+
     def transform(self, *args, **kwargs):
         """Transform a tree in place"""
         if args:
-            transformer = self.node_transformer(*args[1:], **kwargs)
+            transformer = self.make_transformer(*args[1:], **kwargs)
             return transformer.visit(args[0])
         return None
 
     def copy_and_transform(self, *args, **kwargs):
+        if args and self.copy_on_write:
+            transformer = self.make_transformer(*args[1:], **kwargs)
+            return CopyOnWriteTransform(transformer).visit(args[0])
         if args:
-            new_ast = copy.deepcopy(args[0])
+            new_ast = clone_tree(args[0])
             new_args = [new_ast]
             new_args += args[1:]
 
@@ -139,3 +164,33 @@ class AstTransformerItem(object):
         return None
 
 
+class FusedTransformerItem(AstTransformerItem):
+    """
+    an ordered list of AstTransformerItems applied as one, consecutive
+    transforms that declare local_rewrite share a single walk of the tree,
+    see ast_tool_box.models.fused_transform
+    """
+    def __init__(self, transformer_items):
+        super(FusedTransformerItem, self).__init__(None)
+        self.transformer_items = list(transformer_items)
+
+    def package(self):
+        return ", ".join(sorted(set(item.package() for item in self.transformer_items)))
+
+    def name(self):
+        return "+".join(item.name() for item in self.transformer_items)
+
+    def get_instance(self):
+        return None
+
+    def transform(self, *args, **kwargs):
+        """Transform a tree in place, the fused transforms take no arguments"""
+        if args:
+            transformers = [item.make_transformer() for item in self.transformer_items]
+            return run_passes(args[0], transformers)
+        return None
+
+    def copy_and_transform(self, *args, **kwargs):
+        if args:
+            return self.transform(clone_tree(args[0]))
+        return None
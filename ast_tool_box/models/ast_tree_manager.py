@@ -4,25 +4,36 @@ __author__ = 'Chick Markley'
 
 import ast
 import os
-import copy
+
+from ast_tool_box.models.ast_cloner import clone_tree
+from ast_tool_box.models.code_models.code_graph import CodeGraph
+
+
+def parent_ast_tree(ast_tree_item):
+    return ast_tree_item.parent_link.parent_ast_tree if ast_tree_item.parent_link else None
 
 
 class AstTreeManager(object):
     def __init__(self):
-        self.ast_trees = []
+        self.tree_graph = CodeGraph(parent_of=parent_ast_tree)
         self.default_tree_depth = 1
 
+    @property
+    def ast_trees(self):
+        """the trees in the order they were made"""
+        return self.tree_graph.ordered()
+
     def clear(self):
-        self.ast_trees = []
+        self.tree_graph.clear()
 
     def count(self):
-        return len(self.ast_trees)
+        return len(self.tree_graph)
 
     def __getitem__(self, item):
-        return self.ast_trees[item]
+        return self.tree_graph.item_at(item)
 
     def __iter__(self):
-        return iter(self.ast_trees)
+        return iter(self.tree_graph)
 
     def get_valid_index(self, index):
         """
@@ -37,55 +48,48 @@ class AstTreeManager(object):
                 return None
 
         if index >= 0:
-            if index < len(self.ast_trees):
+            if index < self.count():
                 return index
         return None
 
     def create_transformed_child(self, ast_tree_item, ast_transform_item=None, name=None):
-        # child_ast_tree = copy.deepcopy(ast_tree_item.ast_tree)
-        # if ast_transform_item:
-        #     child_ast_tree = ast_transform_item.transform(child_ast_tree)
-        child_ast_tree = ast_transform_item.copy_and_transform(ast_tree_item.ast_tree)
+        if ast_transform_item:
+            child_ast_tree = ast_transform_item.copy_and_transform(ast_tree_item.ast_tree)
+        else:
+            child_ast_tree = clone_tree(ast_tree_item.ast_tree)
         link = AstLink(parent_ast_tree=ast_tree_item, transform_item=ast_transform_item)
         new_ast_tree_item = AstTreeItem(child_ast_tree, parent_link=link, name=name)
 
-        self.ast_trees.append(new_ast_tree_item)
+        self.tree_graph.add(new_ast_tree_item)
         return new_ast_tree_item
 
     def new_item_from_source(self, source_text):
         new_ast_item = AstTreeItem.from_source(source_text)
-        self.ast_trees.append(new_ast_item)
+        self.tree_graph.add(new_ast_item)
         return new_ast_item
 
     def new_item_from_file(self, file_name):
         new_ast_item = AstTreeItem.from_file(file_name)
-        self.ast_trees.append(new_ast_item)
+        self.tree_graph.add(new_ast_item)
         return new_ast_item
 
-    def fix_derived_items_before_delete(self, item_to_delete):
-        for other_item in self.ast_trees:
-            if other_item != item_to_delete:
-                if other_item.parent_link:
-                    if other_item.parent_link.parent_ast_tree == item_to_delete:
-                        other_item.parent_link = None
-
     def delete(self, ast_tree_item):
         """
         delete an ast tree from manager
         ast_tree_item can be AstTreeWidgetItem or index or string
-        representing index
+        representing index, trees derived from it lose their parent link
         """
-        if isinstance(ast_tree_item, AstTreeItem):
-            self.fix_derived_items_before_delete(ast_tree_item)
-            self.ast_trees.remove(ast_tree_item)
-            return True
-        else:
+        if not isinstance(ast_tree_item, AstTreeItem):
             index = self.get_valid_index(ast_tree_item)
-            if index:
-                self.fix_derived_items_before_delete(self.ast_trees[index])
-                self.ast_trees.remove(self.ast_trees[index])
-                return True
-        return False
+            if index is None:
+                return False
+            ast_tree_item = self[index]
+        if ast_tree_item not in self.tree_graph:
+            return False
+
+        for orphan in self.tree_graph.remove(ast_tree_item):
+            orphan.parent_link = None
+        return True
 
 
 class AstTreeItem(object):
@@ -102,7 +106,7 @@ class AstTreeItem(object):
 
     @staticmethod
     def from_source(source_text):
-        return AstTreeItem(ast.parse(source_text), source_text)
+        return AstTreeItem(ast.parse(source_text), source=source_text)
 
     @staticmethod
     def from_file(file_name):
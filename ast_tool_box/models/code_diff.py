@@ -0,0 +1,192 @@
+"""
+what changed between two versions of generated code, by line and within
+changed lines by token. lines that occur once in both versions anchor the
+diff, as in patience diff, so big files are split into small gaps cheaply
+and only the gaps are compared line by line
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+# gaps without anchors up to this many line pairs are compared with SequenceMatcher,
+# bigger ones are reported as replaced
+MAX_GAP_PAIRS = 250000
+# lines longer than this are not compared token by token
+MAX_TOKEN_LINE = 2000
+
+token_pattern = re.compile(r"\w+|\s+|[^\w\s]")
+
+
+def unique_anchors(old, new, i1, i2, j1, j2):
+    """
+    (i, j) of lines found exactly once in old[i1:i2] and in new[j1:j2], the
+    longest run of them in the same order in both
+    """
+    def unique_positions(lines, start, end):
+        """line to its position, -1 for lines that repeat"""
+        positions = {}
+        for position in range(start, end):
+            line = lines[position]
+            positions[line] = -1 if line in positions else position
+        return positions
+
+    old_positions = unique_positions(old, i1, i2)
+    new_positions = unique_positions(new, j1, j2)
+    pairs = []
+    for line, i in old_positions.items():
+        if i >= 0:
+            j = new_positions.get(line, -1)
+            if j >= 0:
+                pairs.append((i, j))
+    pairs.sort()
+
+    # longest increasing subsequence of the new positions, patience sorting
+    tails = []
+    tail_indices = []
+    previous = []
+    for index, (i, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_indices.append(index)
+        else:
+            tails[pile] = j
+            tail_indices[pile] = index
+        previous.append(tail_indices[pile - 1] if pile > 0 else -1)
+
+    anchors = []
+    index = tail_indices[-1] if tail_indices else -1
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def diff_lines(old, new):
+    """opcodes turning the list of lines old into new, (tag, i1, i2, j1, j2) as difflib makes them"""
+    opcodes = []
+
+    def emit(tag, i1, i2, j1, j2):
+        if i1 == i2 and j1 == j2:
+            return
+        if opcodes and opcodes[-1][0] == tag:
+            last = opcodes.pop()
+            opcodes.append((tag, last[1], i2, last[3], j2))
+        elif opcodes and {opcodes[-1][0], tag} <= {'delete', 'insert', 'replace'}:
+            last = opcodes.pop()
+            opcodes.append(('replace', last[1], i2, last[3], j2))
+        else:
+            opcodes.append((tag, i1, i2, j1, j2))
+
+    pending = [('gap', 0, len(old), 0, len(new))]
+    while pending:
+        tag, i1, i2, j1, j2 = pending.pop()
+        if tag != 'gap':
+            emit(tag, i1, i2, j1, j2)
+            continue
+
+        start_i, start_j = i1, j1
+        while i1 < i2 and j1 < j2 and old[i1] == new[j1]:
+            i1 += 1
+            j1 += 1
+        end_i, end_j = i2, j2
+        while i2 > i1 and j2 > j1 and old[i2 - 1] == new[j2 - 1]:
+            i2 -= 1
+            j2 -= 1
+
+        parts = [('equal', start_i, i1, start_j, j1)]
+        if i1 == i2 or j1 == j2:
+            parts.append(('delete' if j1 == j2 else 'insert', i1, i2, j1, j2))
+        else:
+            anchors = unique_anchors(old, new, i1, i2, j1, j2)
+            if anchors:
+                for i, j in anchors:
+                    if i > i1 or j > j1:
+                        parts.append(('gap', i1, i, j1, j))
+                        parts.append(('equal', i, i + 1, j, j + 1))
+                    else:
+                        # next to the anchor before, extend its run
+                        last = parts.pop()
+                        parts.append(('equal', last[1], i + 1, last[3], j + 1))
+                    i1, j1 = i + 1, j + 1
+                parts.append(('gap', i1, i2, j1, j2))
+            elif (i2 - i1) * (j2 - j1) <= MAX_GAP_PAIRS:
+                matcher = SequenceMatcher(None, old[i1:i2], new[j1:j2], autojunk=False)
+                for sub_tag, a1, a2, b1, b2 in matcher.get_opcodes():
+                    parts.append((sub_tag, i1 + a1, i1 + a2, j1 + b1, j1 + b2))
+            else:
+                parts.append(('replace', i1, i2, j1, j2))
+        parts.append(('equal', i2, end_i, j2, end_j))
+        pending.extend(reversed(parts))
+    return opcodes
+
+
+def changed_columns(old_line, new_line):
+    """(start, end) columns of the tokens of new_line that are not in old_line"""
+    if len(old_line) > MAX_TOKEN_LINE or len(new_line) > MAX_TOKEN_LINE:
+        return [(0, len(new_line))]
+    old_tokens = token_pattern.findall(old_line)
+    new_tokens = token_pattern.findall(new_line)
+    columns = [0]
+    for token in new_tokens:
+        columns.append(columns[-1] + len(token))
+
+    spans = []
+    matcher = SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, _, _, b1, b2 in matcher.get_opcodes():
+        if tag in ('replace', 'insert') and b1 < b2:
+            spans.append((columns[b1], columns[b2]))
+    return spans
+
+
+class Change(namedtuple('Change', ['first_line', 'end_line', 'removed', 'token_spans'])):
+    """
+    one changed stretch of the new text, lines first_line up to end_line,
+    counted from 1. first_line == end_line when lines were only removed,
+    removed is how many old lines went. token_spans are (line, start column,
+    end column) of what changed within lines that were edited
+    """
+    def lines(self):
+        return range(self.first_line, self.end_line)
+
+
+class CodeDiff(object):
+    """the changes that turned old_text into new_text, in order"""
+    def __init__(self, old_text, new_text):
+        old = old_text.splitlines()
+        new = new_text.splitlines()
+        self.line_count = len(new)
+        self.changes = []
+        for tag, i1, i2, j1, j2 in diff_lines(old, new):
+            if tag == 'equal':
+                continue
+            token_spans = []
+            if tag == 'replace':
+                for offset in range(min(i2 - i1, j2 - j1)):
+                    for start, end in changed_columns(old[i1 + offset], new[j1 + offset]):
+                        token_spans.append((j1 + offset + 1, start, end))
+            self.changes.append(Change(j1 + 1, j2 + 1, i2 - i1, token_spans))
+        self.first_lines = [change.first_line for change in self.changes]
+
+    def __len__(self):
+        return len(self.changes)
+
+    def next_change(self, line):
+        """the first change starting after line, wrapping around, None when nothing changed"""
+        if not self.changes:
+            return None
+        index = bisect_right(self.first_lines, line)
+        return self.changes[index if index < len(self.changes) else 0]
+
+    def previous_change(self, line):
+        """the last change starting before line, wrapping around"""
+        if not self.changes:
+            return None
+        index = bisect_left(self.first_lines, line) - 1
+        return self.changes[index]
@@ -0,0 +1,104 @@
+"""
+writing generated code to disk, each file of a ctree Project to its own path
+below an output directory. a file is written to a temporary file beside it
+and renamed into place, so a build never reads half a file, and a file whose
+content has not changed is not touched, so make does not rebuild what
+depends on it
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import multiprocessing
+import os
+import tempfile
+from multiprocessing.pool import ThreadPool
+
+from ast_tool_box.models.tree_hash import text_digest
+
+WRITTEN, UNCHANGED = 'written', 'unchanged'
+
+
+class ExportError(ValueError):
+    pass
+
+
+def export_path(output_directory, file_name):
+    """where file_name goes below output_directory, it may not lead outside of it"""
+    root = os.path.abspath(output_directory)
+    path = os.path.abspath(os.path.join(root, file_name))
+    if not path.startswith(root + os.sep):
+        raise ExportError("%s is not below %s" % (file_name, output_directory))
+    return path
+
+
+def _default_mode():
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def write_if_changed(path, text):
+    """
+    write text to path unless it already holds exactly that, returns WRITTEN
+    or UNCHANGED. the text goes to a temporary file in the same directory that
+    is then renamed over path
+    """
+    data = text.encode('utf-8') if not isinstance(text, bytes) else text
+    if os.path.isfile(path) and os.path.getsize(path) == len(data):
+        with open(path, 'rb') as existing_file:
+            if text_digest(existing_file.read()) == text_digest(data):
+                return UNCHANGED
+
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+    mode = os.stat(path).st_mode & 0o777 if os.path.exists(path) else _default_mode()
+
+    handle, temporary_path = tempfile.mkstemp(dir=directory or '.', prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as temporary_file:
+            temporary_file.write(data)
+        os.chmod(temporary_path, mode)
+        replace = getattr(os, 'replace', None)
+        if replace is not None:
+            replace(temporary_path, path)
+        else:
+            if os.name == 'nt' and os.path.exists(path):
+                os.remove(path)
+            os.rename(temporary_path, path)
+    except Exception:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return WRITTEN
+
+
+def _write_file(entry):
+    path, text = entry
+    return path, write_if_changed(path, text)
+
+
+def export_files(output_directory, files, threads=None):
+    """
+    write files, (file name, text) pairs, below output_directory on a pool of
+    threads, None for one per cpu. returns (path, WRITTEN or UNCHANGED) for
+    each file, in order
+    """
+    entries = [(export_path(output_directory, file_name), text) for file_name, text in files]
+    paths = [path for path, _ in entries]
+    if len(set(paths)) != len(paths):
+        raise ExportError("two files would be written to the same path")
+    if threads == 1 or len(entries) < 2:
+        return [_write_file(entry) for entry in entries]
+
+    pool = ThreadPool(min(threads or multiprocessing.cpu_count(), len(entries)))
+    try:
+        return pool.map(_write_file, entries)
+    finally:
+        pool.close()
+        pool.join()
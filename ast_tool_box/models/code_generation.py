@@ -0,0 +1,164 @@
+"""
+turning trees back into text, ctree trees through their codegen methods and
+python trees through the codegen package
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import multiprocessing
+import threading
+import time
+from collections import namedtuple
+from functools import partial
+
+from ast_tool_box.models.code_export import export_path, write_if_changed
+from ast_tool_box.models.source_map import CodegenRecorder
+
+
+def is_ctree(ast_root):
+    try:
+        from ctree.nodes import CtreeNode
+    except ImportError:
+        return False
+    return isinstance(ast_root, CtreeNode)
+
+
+class GeneratedChunk(namedtuple('GeneratedChunk', ['name', 'file_name', 'code', 'seconds', 'source_map'])):
+    """
+    the code of one file of a project, file_name is what it is written to
+    disk as, name is None for a tree that is not a project. seconds is how
+    long generating it took, source_map the SourceMap of code when asked for
+    """
+    def __new__(cls, name, file_name, code, seconds=None, source_map=None):
+        return super(GeneratedChunk, cls).__new__(cls, name, file_name, code, seconds, source_map)
+
+    def display_text(self):
+        if self.name is None:
+            return self.code
+        return "File %s\n%s" % (self.name, self.code)
+
+
+def recorded_codegen(node, source_map=False):
+    """node.codegen() and its SourceMap, None unless source_map"""
+    if not source_map:
+        return node.codegen(), None
+    recorder = CodegenRecorder(node)
+    recorder.install()
+    try:
+        code = node.codegen()
+        return code, recorder.source_map()
+    finally:
+        recorder.uninstall()
+
+
+def generate_file(code_file, source_map=False):
+    """the GeneratedChunk of one file of a project, runs in pool processes too"""
+    start = time.time()
+    code, file_map = recorded_codegen(code_file, source_map)
+    get_filename = getattr(code_file, 'get_filename', None)
+    file_name = get_filename() if get_filename is not None else code_file.name
+    return GeneratedChunk(code_file.name, file_name, code, time.time() - start, file_map)
+
+
+def can_use_processes():
+    """daemonic processes, transform workers and batch pool workers, cannot start a pool"""
+    return not multiprocessing.current_process().daemon
+
+
+class CodegenPool(object):
+    """
+    a multiprocessing pool for generate_chunks, made on first use and kept so
+    regenerating a project does not start processes each time. close it when
+    the modules its processes imported were reloaded, the next use makes a new one
+    """
+    def __init__(self):
+        self.processes = None
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def get(self, processes=None):
+        """the pool, with processes processes, None for one per cpu"""
+        with self.lock:
+            if self.pool is not None and self.processes != processes:
+                self._close()
+            if self.pool is None:
+                self.pool = multiprocessing.Pool(processes)
+                self.processes = processes
+            return self.pool
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+    def _close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+
+def generate_chunks(ast_root, processes=1, source_map=False, codegen_pool=None):
+    """
+    code generates ast_root a file at a time, yields a GeneratedChunk as
+    each file is done. ast_root is changed, pass a copy. with processes
+    other than 1 the files of a project are generated in a pool of that many
+    processes, None for one per cpu, and still come out in project order.
+    the pool is taken from codegen_pool, a CodegenPool, when there is one,
+    otherwise it is made for this call. source_map records a SourceMap of
+    each file, its paths start at the file
+    """
+    import ctree.nodes
+
+    # TODO: stay more in line with ctree and use ResolveGeneratedPathRefs
+
+    from ast_tool_box.transformers.NonCtreeNodeConverter import NonCtreeNodeConverter
+    converter = NonCtreeNodeConverter()
+    ast_root = converter.visit(ast_root)
+    if isinstance(ast_root, ctree.nodes.Project) and ast_root.files and len(ast_root.files) > 0:
+        if processes != 1 and len(ast_root.files) > 1 and can_use_processes():
+            generate = partial(generate_file, source_map=source_map)
+            if codegen_pool is not None:
+                for chunk in codegen_pool.get(processes).imap(generate, ast_root.files):
+                    yield chunk
+                return
+            pool = multiprocessing.Pool(processes)
+            try:
+                for chunk in pool.imap(generate, ast_root.files):
+                    yield chunk
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            for code_file in ast_root.files:
+                yield generate_file(code_file, source_map)
+    else:
+        start = time.time()
+        code, root_map = recorded_codegen(ast_root, source_map)
+        yield GeneratedChunk(None, None, code, time.time() - start, root_map)
+
+
+def generate_code(ast_root):
+    """
+    code generates each file in the project, the files are concatenated
+    each after a File name line. ast_root is changed, pass a copy
+    """
+    return "".join(chunk.display_text() for chunk in generate_chunks(ast_root))
+
+
+def write_chunk(output_directory, chunk, default_file_name):
+    """
+    write the code of chunk below output_directory, atomically and only when
+    it changed, see code_export. returns the path
+    """
+    path = export_path(output_directory, chunk.file_name or default_file_name)
+    write_if_changed(path, chunk.code)
+    return path
+
+
+def tree_to_source(ast_root):
+    """source text for a tree, python source unless the tree is a ctree"""
+    if is_ctree(ast_root):
+        return generate_code(ast_root)
+    import codegen
+    return codegen.to_source(ast_root)
@@ -0,0 +1,105 @@
+"""
+a search index over the rows of an ast tree, built once when the tree is
+created so searches do not have to walk the tree or the view
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+from bisect import bisect_right
+
+from ast_tool_box.models.code_models.ast_tree_rows import row_label, walk_rows
+
+
+class AstSearchIndex(object):
+    """
+    every row of the tree gets an entry whose text is its label plus, for
+    ast nodes, the identifiers and constant values held in its fields.
+    all entry texts are lower cased and joined into one string so a query is
+    a handful of str.find calls rather than a python loop over the rows
+    """
+    separator = "\n"
+    term_fields = ('id', 'name', 'attr', 'arg', 'module', 'n', 's', 'value')
+
+    def __init__(self, ast_root, file_name=""):
+        self.ast_root = ast_root
+        self.paths = []
+        self.parents = []
+        self.leaf_values = []
+        self.path_by_node_id = {}
+
+        starts = []
+        pieces = []
+        offset = 0
+        for path, spec, parent_position in walk_rows(ast_root, file_name):
+            self.paths.append(path)
+            self.parents.append(parent_position)
+
+            is_node = isinstance(spec.value, ast.AST)
+            self.leaf_values.append(not is_node)
+            if is_node:
+                self.path_by_node_id.setdefault(id(spec.value), path)
+
+            # lower cased piece by piece, lower can change the length of a string
+            text = self.entry_text(spec).replace(self.separator, " ").lower()
+            starts.append(offset)
+            pieces.append(text)
+            offset += len(text) + len(self.separator)
+
+        self.starts = starts
+        self.text = self.separator.join(pieces)
+
+    def __len__(self):
+        return len(self.paths)
+
+    @staticmethod
+    def entry_text(spec):
+        text = row_label(spec.label, spec.value)
+        if isinstance(spec.value, ast.AST):
+            terms = [
+                str(value) for field, value in ast.iter_fields(spec.value)
+                if field in AstSearchIndex.term_fields and
+                value is not None and not isinstance(value, (ast.AST, list, tuple))
+            ]
+            if terms:
+                text += " " + " ".join(terms)
+        return text
+
+    def query(self, text):
+        """
+        paths of the rows whose text contains text, ignoring case, in display
+        order. a field value row is left out when its node's row also matched,
+        so a Name and its id do not show up as two separate hits
+        """
+        needle = text.lower()
+        if not needle or self.separator in needle:
+            return []
+
+        hits = []
+        position = self.text.find(needle)
+        while position >= 0:
+            entry = bisect_right(self.starts, position) - 1
+            hits.append(entry)
+            if entry + 1 >= len(self.starts):
+                break
+            position = self.text.find(needle, self.starts[entry + 1])
+
+        matched = set(hits)
+        return [
+            self.paths[entry] for entry in hits
+            if not (self.leaf_values[entry] and self.parents[entry] in matched)
+        ]
+
+    def path_for_node(self, node):
+        """the row path of an ast node of this tree, None if it is not in the tree"""
+        return self.path_by_node_id.get(id(node))
+
+    def structural_query(self, ast_query):
+        """paths of the rows of the nodes matched by a compiled AstQuery"""
+        paths = []
+        for node in ast_query.find_all(self.ast_root):
+            path = self.path_for_node(node)
+            if path is not None:
+                paths.append(path)
+        return paths
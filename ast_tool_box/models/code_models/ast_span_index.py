@@ -0,0 +1,96 @@
+"""
+source spans of the nodes of an ast, used to go from a cursor position in
+the source to the node under it and back without walking the tree
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import sys
+from bisect import bisect_right
+
+from ast_tool_box.models.ast_query import child_nodes
+
+
+END_OF_SOURCE = (sys.maxsize, 0)
+
+
+class AstSpanIndex(object):
+    """
+    every node with a lineno and col_offset gets a span, positions are
+    (line, column) tuples with lines counted from 1 like the ast does.
+    nodes that carry end_lineno and end_col_offset use them, for the others
+    a span ends where the next node that is not one of its descendants starts.
+
+    spans are kept sorted by start, node_at finds the last span starting at
+    or before the position with a binary search and then walks up through
+    the enclosing nodes until one contains the position
+    """
+    def __init__(self, ast_root):
+        nodes = []
+        starts = []
+        parents = []
+
+        stack = [(ast_root, -1)]
+        while stack:
+            node, parent_entry = stack.pop()
+            entry = parent_entry
+            if hasattr(node, 'lineno') and hasattr(node, 'col_offset'):
+                entry = len(nodes)
+                nodes.append(node)
+                starts.append((node.lineno, node.col_offset))
+                parents.append(parent_entry)
+            for child in reversed(child_nodes(node)):
+                stack.append((child, entry))
+
+        last_descendant = list(range(len(nodes)))
+        furthest_start = list(starts)
+        for entry in range(len(nodes) - 1, -1, -1):
+            parent_entry = parents[entry]
+            if parent_entry >= 0:
+                last_descendant[parent_entry] = max(last_descendant[parent_entry], last_descendant[entry])
+                furthest_start[parent_entry] = max(furthest_start[parent_entry], furthest_start[entry])
+
+        ends = []
+        for entry, node in enumerate(nodes):
+            if getattr(node, 'end_lineno', None) is not None and getattr(node, 'end_col_offset', None) is not None:
+                ends.append((node.end_lineno, node.end_col_offset))
+                continue
+            following = last_descendant[entry] + 1
+            end = starts[following] if following < len(nodes) else END_OF_SOURCE
+            line, column = furthest_start[entry]
+            ends.append(max(end, (line, column + 1)))
+
+        order = sorted(range(len(nodes)), key=lambda entry: (starts[entry], (-ends[entry][0], -ends[entry][1])))
+
+        self.nodes = nodes
+        self.starts = starts
+        self.ends = ends
+        self.parents = parents
+        self.sorted_entries = order
+        self.sorted_starts = [starts[entry] for entry in order]
+        self.entry_by_node_id = dict((id(node), entry) for entry, node in enumerate(nodes))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node_at(self, line, column):
+        """the innermost node whose span holds the position, None if there is none"""
+        position = (line, column)
+        sorted_position = bisect_right(self.sorted_starts, position) - 1
+        if sorted_position < 0:
+            return None
+
+        entry = self.sorted_entries[sorted_position]
+        while entry >= 0:
+            if self.starts[entry] <= position < self.ends[entry]:
+                return self.nodes[entry]
+            entry = self.parents[entry]
+        return None
+
+    def span_of(self, node):
+        """(start, end) of node, end is END_OF_SOURCE for the last nodes of a tree without end positions"""
+        entry = self.entry_by_node_id.get(id(node))
+        if entry is None:
+            return None
+        return self.starts[entry], self.ends[entry]
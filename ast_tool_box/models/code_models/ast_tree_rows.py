@@ -0,0 +1,85 @@
+"""
+describes how an ast is laid out as rows in a tree view, these helpers do not
+touch Qt so anything that needs to find or label rows can do so without
+building widgets
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+from collections import namedtuple
+
+
+RowSpec = namedtuple('RowSpec', ['label', 'field_name', 'list_path', 'value'])
+
+
+def class_name(obj):
+    """ Returns the class name of an object"""
+    return obj.__class__.__name__
+
+
+def root_spec(ast_root, file_name=""):
+    """the spec for the single top level row of a tree"""
+    return RowSpec('"{}"'.format(file_name), None, (), ast_root)
+
+
+def child_specs(value):
+    """
+    returns a RowSpec for each child row of value, lists and tuples held in
+    a field are flattened so each element gets its own row labelled field[index]
+    empty fields do not get rows
+    """
+    specs = []
+    if not isinstance(value, ast.AST):
+        return specs
+
+    for field_name, field_value in ast.iter_fields(value):
+        if field_value:
+            _add_specs(specs, field_name, field_name, (), field_value)
+    return specs
+
+
+def _add_specs(specs, field_label, field_name, list_path, value):
+    if isinstance(value, (list, tuple)):
+        for index, element in enumerate(value):
+            _add_specs(
+                specs,
+                "{}[{:d}]".format(field_label, index),
+                field_name,
+                list_path + (index,),
+                element
+            )
+    else:
+        specs.append(RowSpec(field_label, field_name, list_path, value))
+
+
+def row_label(field_label, value):
+    """the text shown for a row"""
+    if isinstance(value, ast.AST):
+        text = "{} = {}".format(field_label, class_name(value))
+    else:
+        text = "{}: {}".format(field_label, repr(value))
+
+    if hasattr(value, 'lineno'):
+        text += " ({:d}:{:d})".format(value.lineno, getattr(value, 'col_offset', 0))
+    return text
+
+
+def walk_rows(ast_root, file_name=""):
+    """
+    iterates over every row of the tree in display order without
+    recursion, yields (path, spec, parent_position) where path is the tuple
+    of row numbers leading from the top of the view to the row and
+    parent_position is the position in this iteration of the parent row,
+    -1 for the top row
+    """
+    stack = [((0,), root_spec(ast_root, file_name), -1)]
+    position = 0
+    while stack:
+        path, spec, parent_position = stack.pop()
+        yield path, spec, parent_position
+        children = child_specs(spec.value)
+        for row in range(len(children) - 1, -1, -1):
+            stack.append((path + (row,), children[row], position))
+        position += 1
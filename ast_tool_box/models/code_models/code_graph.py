@@ -0,0 +1,132 @@
+"""
+the code items of a session as a graph, an edge goes from the item a
+transform was applied to, to the item it made
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+from collections import OrderedDict
+
+
+class CodeGraph(object):
+    """
+    items keyed by id with parent and child indexes, so lookups, adding and
+    removing do not scan. parent_of(item) is the item it was derived from,
+    by default item.parent_item(). a parent has to be in the graph before its
+    children, so the order items were added in is a topological order, an
+    item derived from one that is not in the graph becomes a root
+    """
+    def __init__(self, parent_of=None):
+        self.parent_of = parent_of or (lambda item: item.parent_item())
+        self.items_by_id = OrderedDict()
+        self.parents = {}
+        self.children = {}
+        self.sequence = {}
+        self.added = 0
+        self._ordered = []
+
+    def clear(self):
+        self.items_by_id = OrderedDict()
+        self.parents = {}
+        self.children = {}
+        self.sequence = {}
+        self._ordered = []
+
+    def __len__(self):
+        return len(self.items_by_id)
+
+    def __contains__(self, item):
+        return id(item) in self.items_by_id
+
+    def __iter__(self):
+        return iter(list(self.items_by_id.values()))
+
+    def ordered(self):
+        """the items in the order they were added, rebuilt after a removal"""
+        if self._ordered is None:
+            self._ordered = list(self.items_by_id.values())
+        return self._ordered
+
+    def item_at(self, index):
+        return self.ordered()[index]
+
+    def index_of(self, item):
+        return self.ordered().index(item)
+
+    def last(self):
+        return self.item_at(-1) if self.items_by_id else None
+
+    def add(self, item):
+        key = id(item)
+        assert key not in self.items_by_id, "%s is already in the graph" % item
+        parent = self.parent_of(item)
+        if parent is not None and id(parent) not in self.items_by_id:
+            parent = None
+
+        self.items_by_id[key] = item
+        self.sequence[key] = self.added
+        self.added += 1
+        self.children[key] = OrderedDict()
+        if parent is not None:
+            self.parents[key] = parent
+            self.children[id(parent)][key] = item
+        if self._ordered is not None:
+            self._ordered.append(item)
+        return item
+
+    def remove(self, item):
+        """take item out, its children become roots and are returned"""
+        key = id(item)
+        if key not in self.items_by_id:
+            return []
+        del self.items_by_id[key]
+        del self.sequence[key]
+        parent = self.parents.pop(key, None)
+        if parent is not None:
+            del self.children[id(parent)][key]
+        orphans = list(self.children.pop(key).values())
+        for child in orphans:
+            del self.parents[id(child)]
+        self._ordered = None
+        return orphans
+
+    def parent(self, item):
+        return self.parents.get(id(item))
+
+    def children_of(self, item):
+        return list(self.children.get(id(item), {}).values())
+
+    def roots(self):
+        return [item for key, item in self.items_by_id.items() if key not in self.parents]
+
+    def ancestors(self, item):
+        """the items above item, root first"""
+        ancestors = []
+        parent = self.parent(item)
+        while parent is not None:
+            ancestors.append(parent)
+            parent = self.parent(parent)
+        ancestors.reverse()
+        return ancestors
+
+    def closure(self, items):
+        """items and everything derived from them, in topological order"""
+        found = set()
+        pending = [item for item in items if id(item) in self.items_by_id]
+        while pending:
+            item = pending.pop()
+            if id(item) in found:
+                continue
+            found.add(id(item))
+            pending.extend(self.children[id(item)].values())
+        return self.topological(found)
+
+    def descendants(self, item):
+        return [other for other in self.closure([item]) if other is not item]
+
+    def topological(self, keys=None):
+        """the items, or those whose ids are in keys, parents before children"""
+        if keys is None:
+            return list(self.items_by_id.values())
+        return [self.items_by_id[key] for key in sorted(keys, key=self.sequence.__getitem__)]
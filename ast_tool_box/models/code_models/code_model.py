@@ -5,6 +5,10 @@ __author__ = 'Chick Markley'
 import ast
 import os
 import ast_tool_box.models.transform_models.transform_file as transform_model
+from ast_tool_box.models.tree_hash import TreeHasher, text_digest
+from ast_tool_box.models.ast_cloner import clone_tree
+from ast_tool_box.models.subtree_splice import node_path
+from ast_tool_box.models.code_diff import CodeDiff
 
 
 class CodeItem(object):
@@ -18,6 +22,8 @@ class CodeItem(object):
         self.code_name = code_name
         self.path_name = path_name
         self.parent_code_item = parent_link
+        # TransformProfiler of the transform that made this item, when it was profiled
+        self.transform_profile = None
 
     def name(self):
         return self.code_name
@@ -28,6 +34,30 @@ class CodeItem(object):
     def has_parent(self):
         return self.parent_code_item is not None and self.parent_code_item.code_item is not None
 
+    def parent_item(self):
+        """the code item this one was derived from, None if there is none"""
+        return self.parent_code_item.code_item if self.has_parent() else None
+
+    def lineage(self):
+        """the links from the original item down to this one"""
+        links = []
+        item = self
+        while item.has_parent():
+            links.append(item.parent_code_item)
+            item = item.parent_item()
+        links.reverse()
+        return links
+
+    def result_hash(self):
+        """changes when the code changes, tells whether recomputing an item changed it"""
+        return text_digest(self.code if self.code is not None else '')
+
+    def take_result_of(self, other_item):
+        """become other_item, a recomputed version of this item, keeping the identity tabs and children use"""
+        self.code = other_item.code
+        self.parent_code_item = other_item.parent_code_item
+        self.transform_profile = other_item.transform_profile
+
 
 class AstTreeItem(CodeItem):
     """
@@ -41,6 +71,77 @@ class AstTreeItem(CodeItem):
             parent_link=parent_link
         )
         self.ast_tree = ast_tree
+        self._tree_hashers = {}
+        # an item whose tree shares subtrees with this one, its hashes are reused by the
+        # first tree_hasher built, after that it is let go so the item does not keep it alive
+        self.hash_base = None
+        # set when ast_tree is also held by the transform cache, see own_tree
+        self.shared_tree = False
+
+    def tree_hasher(self, include_positions=True):
+        """hashes of every subtree of ast_tree, see TreeHasher, built on first use"""
+        hasher = self._tree_hashers.get(include_positions)
+        if hasher is None:
+            base = self.hash_base._tree_hashers.get(include_positions) if self.hash_base is not None else None
+            hasher = TreeHasher(self.ast_tree, include_positions, base=base)
+            self._tree_hashers[include_positions] = hasher
+            self.hash_base = None
+        return hasher
+
+    def has_tree_hasher(self, include_positions=True):
+        """whether tree_hasher was built already, building it walks the whole tree"""
+        return include_positions in self._tree_hashers
+
+    def node_path(self, node):
+        """the path from the root of ast_tree to node, see subtree_splice, None when node is not in it"""
+        return node_path(self.ast_tree, node, self.tree_hasher().parent_of)
+
+    def tree_hash(self, include_positions=True):
+        return self.tree_hasher(include_positions).hash_of()
+
+    def deferred_tree_hash(self, include_positions=True):
+        """a function returning the tree_hash of the tree the item holds now, for when it may not be needed"""
+        tree = self.ast_tree
+
+        def later():
+            if self.ast_tree is tree:
+                return self.tree_hash(include_positions)
+            return TreeHasher(tree, include_positions).hash_of()
+        return later
+
+    def own_tree(self):
+        """
+        call before changing ast_tree in place, a shared tree is cloned first
+        so the change does not reach the transform cache or other items
+        """
+        if self.shared_tree:
+            self.ast_tree = self.code = clone_tree(self.ast_tree)
+            self._tree_hashers = {}
+            self.hash_base = None
+            self.shared_tree = False
+        return self.ast_tree
+
+    def subtree_hash(self, node, include_positions=True):
+        return self.tree_hasher(include_positions).hash_of(node)
+
+    def same_tree_as(self, other_item, include_positions=True):
+        """true when other_item holds a tree with the same structure, a transform that changed nothing"""
+        return self.tree_hash(include_positions) == other_item.tree_hash(include_positions)
+
+    def nodes_changed(self, *nodes):
+        """call after changing nodes of own_tree in place, only they and their ancestors are rehashed"""
+        for hasher in self._tree_hashers.values():
+            hasher.changed(*nodes)
+
+    def result_hash(self):
+        return self.tree_hash()
+
+    def take_result_of(self, other_item):
+        super(AstTreeItem, self).take_result_of(other_item)
+        self.ast_tree = other_item.ast_tree
+        self._tree_hashers = {}
+        self.hash_base = other_item.hash_base
+        self.shared_tree = other_item.shared_tree
 
     @staticmethod
     def from_source(source_text):
@@ -62,16 +163,56 @@ class FileItem(CodeItem):
 
 
 class GeneratedCodeItem(CodeItem):
+    """
+    code made by a code generator, file_timings are (file name, seconds) for
+    each generated file, empty when the code came from the cache. source_map
+    is a GeneratedSourceMap from positions in code to paths in the parent tree.
+    when the item is regenerated previous_code keeps what it was before.
+    generated_files are (file name, start, end) of each file's code in code
+    """
     def __init__(self, code=None, parent_link=None, parent_ast_node=None, transform_item=None):
         super(GeneratedCodeItem, self).__init__(
             code,
             parent_link=parent_link
         )
+        self.file_timings = []
+        self.source_map = None
+        self.previous_code = None
+        self._code_diff = None
+        self.generated_files = []
+
+    def take_result_of(self, other_item):
+        self.previous_code = self.code
+        self._code_diff = None
+        super(GeneratedCodeItem, self).take_result_of(other_item)
+        self.file_timings = other_item.file_timings
+        self.source_map = other_item.source_map
+        self.generated_files = other_item.generated_files
+
+    def files(self):
+        """(file name, code) of each generated file"""
+        return [(file_name, self.code[start:end]) for file_name, start, end in self.generated_files]
+
+    def code_diff(self):
+        """the CodeDiff from previous_code to code, None before the item is regenerated"""
+        if self.previous_code is None:
+            return None
+        if self._code_diff is None:
+            self._code_diff = CodeDiff(self.previous_code, self.code or '')
+        return self._code_diff
 
 
 class CodeTransformLink(object):
-    def __init__(self, code_item=None, transform_item=None):
+    """
+    how a code item was made, argument_values are the values the transform
+    was constructed with so the step can be replayed. subtree_path is the path
+    of the node the transform was applied to when it was spliced back into
+    the whole tree
+    """
+    def __init__(self, code_item=None, transform_item=None, argument_values=None, subtree_path=None):
         assert isinstance(code_item, CodeItem)
         assert transform_item is None or isinstance(transform_item, transform_model.TransformThing)
         self.code_item = code_item
-        self.transform_item = transform_item
\ No newline at end of file
+        self.transform_item = transform_item
+        self.argument_values = list(argument_values or [])
+        self.subtree_path = subtree_path
\ No newline at end of file
@@ -0,0 +1,149 @@
+"""
+apply an ast.NodeTransformer to a tree without copying the tree first and
+without modifying it, the result shares every subtree the transformer did
+not change with the input tree
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+import copy
+
+from ast_tool_box.models.visit_hooks import wrap_visit
+
+
+def shallow_copy_node(node):
+    """a copy of node that shares its children but has its own field lists"""
+    node_copy = copy.copy(node)
+    for field, value in ast.iter_fields(node):
+        if isinstance(value, list):
+            setattr(node_copy, field, list(value))
+    return node_copy
+
+
+def _same_contents(node_copy, original):
+    """true when node_copy still holds exactly the objects original does"""
+    if type(node_copy) is not type(original):
+        return False
+    copy_dict = node_copy.__dict__
+    original_dict = original.__dict__
+    if len(copy_dict) != len(original_dict):
+        return False
+    for key, value in copy_dict.items():
+        if key not in original_dict:
+            return False
+        original_value = original_dict[key]
+        if value is original_value:
+            continue
+        if isinstance(value, list) and isinstance(original_value, list) and len(value) == len(original_value):
+            if all(a is b for a, b in zip(value, original_value)):
+                continue
+        return False
+    return True
+
+
+class CopyOnWriteTransform(object):
+    """
+    wraps a transformer instance so that every node is shallow copied just
+    before the transformer visits it, the transformer only ever changes
+    copies. once it is done, copies that ended up identical to their
+    original are swapped back for the original, so only the paths to changed
+    nodes are new.
+
+    the transformer must only change nodes it has been handed by visit or
+    generic_visit, a transformer that reaches down and edits a child it has
+    not visited would edit the input tree.
+    """
+    def __init__(self, transformer):
+        self.transformer = transformer
+        self.copies = {}
+
+    def visit(self, root):
+        def wrapper(visit):
+            def copy_on_visit(node):
+                if isinstance(node, ast.AST):
+                    node_copy = shallow_copy_node(node)
+                    self.copies[id(node_copy)] = (node_copy, node)
+                    node = node_copy
+                return visit(node)
+            return copy_on_visit
+
+        restore = wrap_visit(self.transformer, wrapper)
+        try:
+            result = self.transformer.visit(root)
+        finally:
+            restore()
+
+        try:
+            return self.share_unchanged(result)
+        finally:
+            self.copies = {}
+
+    def _original_of(self, node):
+        entry = self.copies.get(id(node))
+        if entry is not None and entry[0] is node:
+            return entry[1]
+        return None
+
+    def _pending_children(self, node):
+        """
+        children of node that may hold copies, a child that is still the
+        original's own child was never visited and cannot hold any
+        """
+        original = self._original_of(node)
+        children = []
+        for field, value in ast.iter_fields(node):
+            original_value = getattr(original, field, None) if original is not None else None
+            if isinstance(value, ast.AST):
+                if value is not original_value:
+                    children.append(value)
+            elif isinstance(value, list):
+                for index, element in enumerate(value):
+                    if not isinstance(element, ast.AST):
+                        continue
+                    if isinstance(original_value, list) and index < len(original_value) and \
+                            original_value[index] is element:
+                        continue
+                    children.append(element)
+        return children
+
+    @staticmethod
+    def _replace_children(node, replacements):
+        for field, value in ast.iter_fields(node):
+            if isinstance(value, ast.AST):
+                if id(value) in replacements:
+                    setattr(node, field, replacements[id(value)])
+            elif isinstance(value, list):
+                for index, element in enumerate(value):
+                    if isinstance(element, ast.AST) and id(element) in replacements:
+                        value[index] = replacements[id(element)]
+
+    def share_unchanged(self, result):
+        """bottom up, put originals back in place of copies that did not change"""
+        roots = result if isinstance(result, list) else [result]
+        replacements = {}
+        done = set()
+
+        stack = [(root, False) for root in roots if isinstance(root, ast.AST)]
+        while stack:
+            node, children_done = stack.pop()
+            if not children_done:
+                if id(node) in done:
+                    continue
+                stack.append((node, True))
+                for child in self._pending_children(node):
+                    stack.append((child, False))
+                continue
+
+            if id(node) in done:
+                continue
+            done.add(id(node))
+            self._replace_children(node, replacements)
+            original = self._original_of(node)
+            if original is not None and _same_contents(node, original):
+                replacements[id(node)] = original
+
+        if isinstance(result, list):
+            return [replacements.get(id(node), node) for node in result]
+        return replacements.get(id(result), result)
@@ -0,0 +1,168 @@
+"""
+running several NodeTransformers in one walk of the tree. a fused walk takes
+each node through the transformers in order, when a transformer's handler
+calls generic_visit, or the transformer has no handler for the node, the
+children are walked from that transformer on, so a chain of local rewrites
+costs one traversal instead of one per transform.
+
+fusing is opt in, a transformer class sets local_rewrite = True to promise
+that each handler decides what to do from the node it is handed and its
+plain fields only, never from the nodes below it, and never visits children
+itself, generic_visit is called or not. the children of a node may already
+have been through later transformers when a handler runs, so that promise is
+what keeps the result the same as running the passes one after another. a
+transformer without it, or that sets needs_global_state, overrides visit or
+generic_visit, or has hooks on its visit runs as a pass of its own
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+
+
+def can_fuse(transformer):
+    transformer_class = type(transformer)
+    return (
+        isinstance(transformer, ast.NodeTransformer) and
+        getattr(transformer_class, 'local_rewrite', False) and
+        not getattr(transformer, 'needs_global_state', False) and
+        'visit' not in transformer.__dict__ and
+        transformer_class.visit == ast.NodeTransformer.visit and
+        transformer_class.generic_visit == ast.NodeTransformer.generic_visit
+    )
+
+
+class FusedTransform(object):
+    """
+    applies transformers, a list of instances that can_fuse, in one walk.
+    a node a handler creates in place of the one it was given is walked by
+    the transformers after that handler, the way the later passes would
+    have found it
+    """
+    def __init__(self, transformers):
+        self.transformers = list(transformers)
+        self.handlers = [{} for _ in self.transformers]
+        self.finished = set()
+        self.walked = set()
+        self.keep_alive = []
+
+    def name(self):
+        return "+".join(type(transformer).__name__ for transformer in self.transformers)
+
+    def handler(self, stage, node_class):
+        handlers = self.handlers[stage]
+        try:
+            return handlers[node_class]
+        except KeyError:
+            handler = getattr(self.transformers[stage], 'visit_' + node_class.__name__, None)
+            handlers[node_class] = handler
+            return handler
+
+    def visit(self, node):
+        for stage, transformer in enumerate(self.transformers):
+            transformer.generic_visit = self.stage_generic_visit(stage)
+        try:
+            return self._visit(node, 0)
+        finally:
+            for transformer in self.transformers:
+                transformer.__dict__.pop('generic_visit', None)
+            self.finished = set()
+            self.walked = set()
+            self.keep_alive = []
+
+    def stage_generic_visit(self, stage):
+        """stands in for generic_visit of the transformer at stage during a fused walk"""
+        def generic_visit(node):
+            self._walk(node, stage)
+            return node
+        return generic_visit
+
+    def _walk(self, node, stage):
+        """children of node through the transformers from stage on, once per node"""
+        if id(node) in self.walked:
+            return
+        self.walked.add(id(node))
+        self.keep_alive.append(node)
+        self._visit_children(node, stage)
+
+    def _visit(self, node, stage):
+        """run the transformers from stage on over node"""
+        for index in range(stage, len(self.transformers)):
+            handler = self.handler(index, node.__class__)
+            if handler is None:
+                self._walk(node, index)
+                continue
+            result = handler(node)
+            if result is node:
+                continue
+            if result is None:
+                return None
+            if isinstance(result, list):
+                results = []
+                for item in result:
+                    item = self._continue(item, index + 1)
+                    if isinstance(item, list):
+                        results.extend(item)
+                    elif item is not None:
+                        results.append(item)
+                return results
+            return self._continue(result, index + 1)
+
+        self.finished.add(id(node))
+        self.keep_alive.append(node)
+        return node
+
+    def _visit_children(self, node, stage):
+        """same field handling as NodeTransformer.generic_visit"""
+        for field, old_value in ast.iter_fields(node):
+            if isinstance(old_value, list):
+                new_values = []
+                for value in old_value:
+                    if isinstance(value, ast.AST):
+                        value = self._continue(value, stage)
+                        if value is None:
+                            continue
+                        elif not isinstance(value, ast.AST):
+                            new_values.extend(value)
+                            continue
+                    new_values.append(value)
+                old_value[:] = new_values
+            elif isinstance(old_value, ast.AST):
+                new_node = self._continue(old_value, stage)
+                if new_node is None:
+                    delattr(node, field)
+                else:
+                    setattr(node, field, new_node)
+
+    def _continue(self, node, stage):
+        if not isinstance(node, ast.AST) or id(node) in self.finished:
+            return node
+        return self._visit(node, stage)
+
+
+def fuse_passes(transformers):
+    """
+    group transformers into the passes that run_passes makes, each runs of
+    consecutive fusable ones become a FusedTransform, others stay alone
+    """
+    passes = []
+    group = []
+    for transformer in transformers:
+        if can_fuse(transformer):
+            group.append(transformer)
+            continue
+        if group:
+            passes.append(FusedTransform(group) if len(group) > 1 else group[0])
+            group = []
+        passes.append(transformer)
+    if group:
+        passes.append(FusedTransform(group) if len(group) > 1 else group[0])
+    return passes
+
+
+def run_passes(tree, transformers, fuse=True):
+    """tree transformed by each of transformers in order, in as few walks as fusing allows"""
+    for transform_pass in (fuse_passes(transformers) if fuse else transformers):
+        tree = transform_pass.visit(tree)
+    return tree
@@ -0,0 +1,252 @@
+"""
+source maps of generated code, which node of the tree each stretch of the
+output came from. nodes are named by their path from the root of the tree,
+see subtree_splice, because generation runs on a copy of the tree, often in
+another process.
+
+ctree builds code by nesting the strings of a node's children in the
+string of the node. CodegenRecorder wraps the codegen of each node, when a
+node's codegen returns the strings its children returned are looked for in
+its string, each after the one before, that is where they went
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+import gc
+from bisect import bisect_right
+
+
+class CodegenRecorder(object):
+    """
+    records the source map of codegen of root, install before generating,
+    source_map afterwards, uninstall puts the nodes back. the cyclic garbage
+    collector is paused from install to uninstall, the wrappers are many
+    small objects it would otherwise keep scanning
+    """
+    def __init__(self, root):
+        self.root = root
+        self.steps = []
+        self.entry_parents = []
+        self.installed = []
+        self.pending = [[]]
+        self.collecting = False
+
+    def install(self):
+        from ast_tool_box.transformers.NonCtreeNodeConverter import NonCtreeNode
+
+        self.collecting = gc.isenabled()
+        gc.disable()
+        AST = ast.AST
+        steps = self.steps
+        entry_parents = self.entry_parents
+        stack = [(self.root, None, -1)]
+        while stack:
+            node, step, parent_entry = stack.pop()
+            entry = len(steps)
+            steps.append(step)
+            entry_parents.append(parent_entry)
+            self.wrap(node, entry)
+            if isinstance(node, NonCtreeNode):
+                # what is below is converted when codegen gets there and is part of node's text
+                continue
+            for field in node._fields:
+                value = getattr(node, field, None)
+                if isinstance(value, AST):
+                    stack.append((value, (field, None), entry))
+                elif isinstance(value, list):
+                    for index, element in enumerate(value):
+                        if isinstance(element, AST):
+                            stack.append((element, (field, index), entry))
+
+    def wrap(self, node, entry):
+        codegen = getattr(node, 'codegen', None)
+        if codegen is None:
+            return
+        self.installed.append((node, node.__dict__.get('codegen')))
+
+        def recorded_codegen(*args, **kwargs):
+            self.pending.append([])
+            try:
+                text = codegen(*args, **kwargs)
+            finally:
+                children = self.pending.pop()
+            self.pending[-1].append((entry, text, self.place(text, children)))
+            return text
+        node.codegen = recorded_codegen
+
+    def uninstall(self):
+        for node, codegen in self.installed:
+            if codegen is None:
+                node.__dict__.pop('codegen', None)
+            else:
+                node.codegen = codegen
+        self.installed = []
+        if self.collecting:
+            gc.enable()
+
+    @staticmethod
+    def place(text, children):
+        """(offset, entry, length, placed) of each child whose text is found in text"""
+        if not children:
+            return ()
+        placed = []
+        seen = set()
+        cursor = 0
+        for entry, child_text, child_placed in children:
+            if not child_text or entry in seen:
+                continue
+            offset = text.find(child_text, cursor)
+            if offset < 0:
+                continue
+            seen.add(entry)
+            placed.append((offset, entry, len(child_text), child_placed))
+            cursor = offset + len(child_text)
+        return placed
+
+    def source_map(self):
+        """the SourceMap of the last codegen of root"""
+        top = [(0, entry, len(text), placed) for entry, text, placed in self.pending[-1][-1:]]
+        return SourceMap(self.steps, self.entry_parents, top)
+
+
+class SourceMap(object):
+    """
+    spans of the text of one codegen, offsets into that text. entries are
+    the nodes of the tree, each with its parent entry and step, spans are
+    kept in start order with parents before the spans they hold
+    """
+    def __init__(self, steps, entry_parents, placed):
+        self.steps = steps
+        self.entry_parents = entry_parents
+        self._child_entries = None
+        self.starts = []
+        self.ends = []
+        self.span_entries = []
+        self.span_parents = []
+        self.span_by_entry = {}
+
+        stack = [(0, -1, record) for record in reversed(placed)]
+        while stack:
+            base, parent_span, (offset, entry, length, children) = stack.pop()
+            start = base + offset
+            span = len(self.starts)
+            self.starts.append(start)
+            self.ends.append(start + length)
+            self.span_entries.append(entry)
+            self.span_parents.append(parent_span)
+            self.span_by_entry.setdefault(entry, span)
+            for child in reversed(children):
+                stack.append((start, span, child))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_child_entries'] = None
+        return state
+
+    def child_entries(self):
+        """entries by (parent entry, step), made on the first lookup of a path"""
+        if self._child_entries is None:
+            self._child_entries = dict(
+                ((parent, step), entry) for entry, (parent, step) in enumerate(zip(self.entry_parents, self.steps))
+            )
+        return self._child_entries
+
+    def entry_at(self, offset):
+        """the innermost entry whose span holds offset, None if there is none"""
+        span = bisect_right(self.starts, offset) - 1
+        while span >= 0:
+            if self.starts[span] <= offset < self.ends[span]:
+                return self.span_entries[span]
+            span = self.span_parents[span]
+        return None
+
+    def path_of(self, entry):
+        path = []
+        while self.entry_parents[entry] >= 0:
+            path.append(self.steps[entry])
+            entry = self.entry_parents[entry]
+        path.reverse()
+        return path
+
+    def span_of(self, path):
+        """(start, end) of the deepest node on path that has a span, None if none has"""
+        entry = 0 if self.steps else None
+        found = self.span_by_entry.get(entry)
+        child_entries = self.child_entries()
+        for step in path:
+            entry = child_entries.get((entry, tuple(step)))
+            if entry is None:
+                break
+            found = self.span_by_entry.get(entry, found)
+        if found is None:
+            return None
+        return self.starts[found], self.ends[found]
+
+
+class GeneratedSourceMap(object):
+    """
+    the source map of a whole generated text, made of the SourceMaps of its
+    files. positions are (line, column) tuples, lines counted from 1 as the
+    ast and the editor do. lookups are binary searches
+    """
+    def __init__(self):
+        self.offsets = []
+        self.root_paths = []
+        self.maps = []
+        self.map_by_root = {}
+        self.line_starts = [0]
+
+    def add(self, offset, root_path, source_map):
+        """source_map covers the text from offset on, its paths start below root_path"""
+        root_path = tuple(root_path)
+        self.map_by_root[root_path] = len(self.maps)
+        self.offsets.append(offset)
+        self.root_paths.append(root_path)
+        self.maps.append(source_map)
+
+    def finish(self, text):
+        """index the lines of the text the maps were added for"""
+        line_starts = [0]
+        newline = text.find('\n')
+        while newline >= 0:
+            line_starts.append(newline + 1)
+            newline = text.find('\n', newline + 1)
+        self.line_starts = line_starts
+        return self
+
+    def offset_of(self, line, column):
+        return self.line_starts[min(max(line, 1), len(self.line_starts)) - 1] + column
+
+    def position_of(self, offset):
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1]
+
+    def path_at(self, line, column):
+        """the path of the innermost node that generated the text at the position, None if none did"""
+        offset = self.offset_of(line, column)
+        index = bisect_right(self.offsets, offset) - 1
+        if index < 0:
+            return None
+        entry = self.maps[index].entry_at(offset - self.offsets[index])
+        if entry is None:
+            return None
+        return list(self.root_paths[index]) + self.maps[index].path_of(entry)
+
+    def span_of(self, path):
+        """(start, end) positions of what the node at path, or its nearest ancestor, generated"""
+        path = [tuple(step) for step in path]
+        for length in range(len(path), -1, -1):
+            index = self.map_by_root.get(tuple(path[:length]))
+            if index is None:
+                continue
+            span = self.maps[index].span_of(path[length:])
+            if span is None:
+                return None
+            offset = self.offsets[index]
+            return self.position_of(offset + span[0]), self.position_of(offset + span[1])
+        return None
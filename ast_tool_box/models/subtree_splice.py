@@ -0,0 +1,104 @@
+"""
+applying a transform to one node of a tree. the node's subtree is
+transformed on its own and the result is spliced into a new tree that copies
+only the nodes on the path from the root down to it, everything else is
+shared with the original tree, so the cost follows the size of the node and
+the depth of the tree, not the size of the tree.
+
+a path is a list of (field, index) steps from the root, index is None for a
+field holding a single node. paths are plain data so they survive being
+pickled to a worker process where node identities do not
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+
+from ast_tool_box.models.copy_on_write import shallow_copy_node
+
+
+def child_step(parent, child):
+    """the (field, index) of parent that holds child, None when it does not"""
+    for field, value in ast.iter_fields(parent):
+        if value is child:
+            return field, None
+        if isinstance(value, list):
+            for index, element in enumerate(value):
+                if element is child:
+                    return field, index
+    return None
+
+
+def node_path(root, node, parent_of=None):
+    """
+    the path from root to node. parent_of(node) gives a node's parent, a
+    TreeHasher's parent_of makes this cost the depth of node, without it
+    the tree is searched
+    """
+    if parent_of is None:
+        parents = {id(root): None}
+        stack = [root]
+        while stack and id(node) not in parents:
+            current = stack.pop()
+            for child in ast.iter_child_nodes(current):
+                parents[id(child)] = current
+                stack.append(child)
+        parent_of = lambda child: parents.get(id(child))
+
+    path = []
+    while node is not root:
+        parent = parent_of(node)
+        step = child_step(parent, node) if parent is not None else None
+        if step is None:
+            return None
+        path.append(step)
+        node = parent
+    path.reverse()
+    return path
+
+
+def node_at(root, path):
+    node = root
+    for field, index in path:
+        node = getattr(node, field)
+        if index is not None:
+            node = node[index]
+    return node
+
+
+def splice(root, path, replacement):
+    """
+    a new tree in which the node at path is replaced, None removes it and a
+    list takes its place in a list field, as with NodeTransformer results.
+    root and the nodes on the path are copied, nothing else is
+    """
+    if not path:
+        return replacement
+    new_root = shallow_copy_node(root)
+    node = new_root
+    for depth, (field, index) in enumerate(path):
+        last = depth == len(path) - 1
+        if index is None:
+            if not last:
+                child = shallow_copy_node(getattr(node, field))
+            elif replacement is None:
+                delattr(node, field)
+                break
+            else:
+                child = replacement
+            setattr(node, field, child)
+        else:
+            # shallow_copy_node gave node a list of its own
+            values = getattr(node, field)
+            if not last:
+                child = values[index] = shallow_copy_node(values[index])
+            elif replacement is None:
+                del values[index]
+            elif isinstance(replacement, list):
+                values[index:index + 1] = replacement
+            else:
+                values[index] = replacement
+        if not last:
+            node = child
+    return new_root
@@ -0,0 +1,83 @@
+"""
+remembers the results of applying transforms so applying the same transform
+with the same arguments to the same tree again does not run it again
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+from collections import OrderedDict
+
+from ast_tool_box.models.tree_hash import text_digest
+
+
+class TransformCache(object):
+    """
+    a bounded lru cache of transform results. a key is made of the hash of
+    the input tree, the transform's class and a hash of its source text and
+    the repr of the argument values and of the scope, the path of the node
+    it was applied to, so an edited transform never hits an old entry.
+    entries remember the transform file they came from so reloading that
+    file can drop them. the tree hash may be a function returning it, it is
+    only called when the cache holds a result of the same transform with the
+    same arguments and scope, so a first application does not hash its tree.
+    a cached tree is shared read only by the items made from it
+    """
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(tree_hash, transform_item, argument_values=None, scope=None):
+        transform = transform_item.transform
+        source_text = getattr(transform_item, 'source_text', '')
+        return (
+            tree_hash,
+            type(transform_item).__name__,
+            "%s.%s" % (transform.__module__, transform.__name__),
+            text_digest(source_text),
+            repr(list(argument_values or [])),
+            repr(scope),
+        )
+
+    def resolve(self, key):
+        """key with its tree hash worked out, None when no entry could match it"""
+        part = key[1:]
+        if not any(entry_key[1:] == part for entry_key in self.entries):
+            return None
+        if any(callable(entry_key[0]) and entry_key[1:] == part for entry_key in self.entries):
+            self.entries = OrderedDict(
+                ((entry_key[0](),) + part if callable(entry_key[0]) and entry_key[1:] == part else entry_key, entry)
+                for entry_key, entry in self.entries.items()
+            )
+        return (key[0](),) + part if callable(key[0]) else key
+
+    def get(self, key):
+        """the cached result or None, a hit makes the entry the most recently used"""
+        key = self.resolve(key)
+        entry = None if key is None else self.entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries[key] = entry
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, result, transform_item=None):
+        self.entries.pop(key, None)
+        self.entries[key] = (getattr(transform_item, 'transform_file', None), result)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, transform_file):
+        """forget every result produced by a transform from transform_file"""
+        for key in [key for key, entry in self.entries.items() if entry[0] is transform_file]:
+            del self.entries[key]
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,110 @@
+"""
+what discovering the transforms of a file or package found, kept on disk so
+the transform pane can be filled at startup without importing ctree and the
+transform modules. an entry lists the source files it was made from, it is
+current while each file has the mtime and size it had, or, when those
+changed, still has the same content hash
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import json
+import os
+import threading
+
+from ast_tool_box.models.code_export import write_if_changed
+from ast_tool_box.models.tree_hash import text_digest
+
+CACHE_VERSION = 1
+
+
+def default_cache_path():
+    return os.path.join(os.path.expanduser("~"), ".ast_tool_box", "transform_discovery.json")
+
+
+def file_stamp(file_name):
+    """[file name, mtime, size, content digest] of file_name"""
+    with open(file_name, 'rb') as source_file:
+        data = source_file.read()
+    return [file_name, os.path.getmtime(file_name), len(data), text_digest(data)]
+
+
+class DiscoveryCache(object):
+    """
+    descriptions of transforms by collection key, read from path the first
+    time they are needed and written back whenever they change. collections
+    are discovered on background threads, a lock keeps the entries and the
+    file consistent
+    """
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        self._entries = None
+        self.lock = threading.RLock()
+
+    def entries(self):
+        with self.lock:
+            return self._read_entries()
+
+    def _read_entries(self):
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, 'r') as cache_file:
+                    contents = json.load(cache_file)
+                if contents.get('version') == CACHE_VERSION:
+                    self._entries = contents['entries']
+            except (IOError, OSError, ValueError, KeyError, AttributeError):
+                pass
+        return self._entries
+
+    def get(self, key):
+        """the transform descriptions stored for key, None if there are none or they are out of date"""
+        with self.lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry = self._read_entries().get(key)
+        if entry is None:
+            return None
+        refreshed = False
+        for stamp in entry['files']:
+            file_name, mtime, size, digest = stamp
+            try:
+                if os.path.getmtime(file_name) == mtime and os.path.getsize(file_name) == size:
+                    continue
+                current = file_stamp(file_name)
+            except (IOError, OSError):
+                return None
+            if current[2:] != [size, digest]:
+                return None
+            # touched but not changed
+            stamp[1] = current[1]
+            refreshed = True
+        if refreshed:
+            self.save()
+        return entry['transforms']
+
+    def put(self, key, file_names, transforms):
+        """store transforms, a list of descriptions, for key, valid while file_names do not change"""
+        try:
+            stamps = [file_stamp(file_name) for file_name in sorted(set(file_names))]
+        except (IOError, OSError):
+            return
+        with self.lock:
+            self._read_entries()[key] = {'files': stamps, 'transforms': transforms}
+            self.save()
+
+    def discard(self, key):
+        with self.lock:
+            if self._read_entries().pop(key, None) is not None:
+                self.save()
+
+    def save(self):
+        with self.lock:
+            try:
+                write_if_changed(self.path, json.dumps(
+                    {'version': CACHE_VERSION, 'entries': self._read_entries()}, sort_keys=True, indent=1
+                ))
+            except (IOError, OSError) as error:
+                print("cannot write transform discovery cache %s error %s" % (self.path, error))
@@ -7,41 +7,118 @@ import os.path
 import inspect
 import ast
 from operator import methodcaller
-from ctree.codegen import CodeGenVisitor
 from ast_tool_box.util import Util
 from collections import namedtuple
-import codegen
 
 
 PositionalArg = namedtuple('PositionalArg', ['name', 'default_source'])
 
 
+def code_generator_base():
+    """ctree's CodeGenVisitor, imported when a class is first checked against it, not at startup"""
+    from ctree.codegen import CodeGenVisitor
+    return CodeGenVisitor
+
+
+class TransformLoadError(ImportError):
+    pass
+
+
 class TransformThing(object):
-    def __init__(self, transform, package_name=None, file_name=None, transform_file=None):
-        self.transform = transform
+    """
+    a transform class and what it takes to make one. made from a description,
+    see describe, the class is only imported when it is first used
+    """
+    def __init__(self, transform=None, package_name=None, file_name=None, transform_file=None, description=None):
+        self._transform = transform
         self.package_name = package_name
         self.transform_file = transform_file
-        try:
-            self.source_text = inspect.getsource(self.transform)
-        except Exception as e:
-            print("Failed to get source for %s error %s" % (self.transform, e.message))
-            self.source_text = 'Unavailable'
         self.file_name = file_name
-        # print(self.source_text)
-        self.ast_root = ast.parse(self.source_text)
         self.init_source = ''
         self.positional_args = []
         self._has_varargs = False
         self._has_kwargs = False
         self._super_classes = []
-        self.doc = "TODO to get doc string from transform"
+        if description is not None:
+            self.take_description(description)
+            return
+
+        self._name = transform.__name__
+        self.module_name = transform.__module__
+        self.source_span = None
+        try:
+            lines, first_line = inspect.getsourcelines(self.transform)
+            self._source_text = "".join(lines)
+            self.source_span = (inspect.getsourcefile(self.transform), first_line, first_line + len(lines) - 1)
+        except Exception as e:
+            print("Failed to get source for %s error %s" % (self.transform, e))
+            self._source_text = 'Unavailable'
+        # print(self.source_text)
+        self.ast_root = ast.parse(self.source_text)
+        self.doc = inspect.getdoc(self.transform) or ''
         self.get_args()
         self.figure_super_classes()
 
         print("new transform thing type %s package %s has args %s" % (type(self), package_name, self.has_args))
 
+    @property
+    def transform(self):
+        """the transform class, its module is imported the first time it is needed"""
+        if self._transform is None:
+            self.load()
+        return self._transform
+
+    def load(self):
+        """import the module of the transform if that has not happened yet"""
+        if self._transform is None:
+            try:
+                __import__(self.module_name)
+                self._transform = getattr(sys.modules[self.module_name], self._name)
+            except Exception as exception:
+                raise TransformLoadError("Cannot load %s from %s\n%s" % (self._name, self.module_name, exception))
+        return self._transform
+
+    @property
+    def source_text(self):
+        if self._source_text is None:
+            self._source_text = 'Unavailable'
+            if self.source_span:
+                file_name, first_line, last_line = self.source_span
+                try:
+                    with open(file_name, "r") as f:
+                        self._source_text = "".join(f.readlines()[first_line - 1:last_line])
+                except (IOError, OSError) as e:
+                    print("Failed to get source for %s error %s" % (self._name, e))
+        return self._source_text
+
+    def describe(self):
+        """what discovering the transform found, as json friendly values"""
+        return {
+            'kind': 'code_generator' if isinstance(self, CodeGeneratorItem) else 'node_transformer',
+            'name': self._name,
+            'module': self.module_name,
+            'super_classes': list(self._super_classes),
+            'positional_args': [list(positional_arg) for positional_arg in self.positional_args],
+            'has_varargs': bool(self._has_varargs),
+            'has_kwargs': bool(self._has_kwargs),
+            'source_span': list(self.source_span) if self.source_span else None,
+            'doc': self.doc,
+        }
+
+    def take_description(self, description):
+        self._name = description['name']
+        self.module_name = description['module']
+        self._super_classes = list(description['super_classes'])
+        self.positional_args = [PositionalArg(*positional_arg) for positional_arg in description['positional_args']]
+        self._has_varargs = description['has_varargs']
+        self._has_kwargs = description['has_kwargs']
+        self.source_span = tuple(description['source_span']) if description['source_span'] else None
+        self._source_text = None
+        self.ast_root = None
+        self.doc = description['doc']
+
     def name(self):
-        return self.transform.__name__
+        return self._name
 
     def has_args(self):
         return self.has_positional_args() or self.has_varargs() or self.has_kwargs()
@@ -58,11 +135,15 @@ class TransformThing(object):
     def super_classes(self):
         return self._super_classes
 
-    def get_instance(self, positional_args=None):
+    def get_instance(self, positional_args=None, profiler=None):
+        """a new transformer, a TransformProfiler given as profiler is installed on it"""
         if positional_args:
-            return self.transform(*positional_args)
+            instance = self.transform(*positional_args)
         else:
-            return self.transform()
+            instance = self.transform()
+        if profiler is not None:
+            profiler.install(instance)
+        return instance
 
     def figure_super_classes(self):
         do_copy = True
@@ -100,6 +181,7 @@ class TransformThing(object):
         for index, val in enumerate(init_func.args.args):
             if not val.id == 'self':
                 if defaults[index] is not None:
+                    import codegen
                     default_st = codegen.to_source(defaults[index])
                 else:
                     default_st = None
@@ -167,22 +249,24 @@ class TransformThing(object):
 
 
 class AstTransformItem(TransformThing):
-    def __init__(self, transform, package_name=None, file_name=None, transform_file=None):
+    def __init__(self, transform=None, package_name=None, file_name=None, transform_file=None, description=None):
         super(AstTransformItem, self).__init__(
             transform=transform,
             package_name=package_name,
             file_name=file_name,
-            transform_file=transform_file
+            transform_file=transform_file,
+            description=description
         )
 
 
 class CodeGeneratorItem(TransformThing):
-    def __init__(self, transform, package_name=None, file_name=None, transform_file=None):
+    def __init__(self, transform=None, package_name=None, file_name=None, transform_file=None, description=None):
         super(CodeGeneratorItem, self).__init__(
             transform=transform,
             package_name=package_name,
             file_name=file_name,
-            transform_file=transform_file
+            transform_file=transform_file,
+            description=description
         )
 
 
@@ -201,7 +285,7 @@ class TransformFactory(object):
                     except Exception as e:
                         print("Error could not instantiate class %s error %s" % (class_def, e.message))
                         return None
-            if issubclass(class_def, CodeGenVisitor):
+            if issubclass(class_def, code_generator_base()):
                 if class_def.__name__ != "CodeGenVisitor":
                     try:
                         return CodeGeneratorItem(
@@ -213,6 +297,36 @@ class TransformFactory(object):
                         print("Error could not instantiate class %s error %s" % (class_def, e.message))
                         return None
 
+    @staticmethod
+    def from_description(description, file_name=None, transform_collection=None):
+        """a transform item made from what describe said about it, nothing is imported"""
+        item_class = CodeGeneratorItem if description['kind'] == 'code_generator' else AstTransformItem
+        return item_class(file_name=file_name, transform_file=transform_collection, description=description)
+
+
+def source_files(module):
+    """
+    the source files the transforms of module were discovered from, the
+    module's own and those of the classes in it and of their base classes
+    """
+    file_names = set()
+
+    def add(thing):
+        try:
+            file_name = inspect.getsourcefile(thing)
+        except (TypeError, IOError, OSError):
+            return
+        if file_name:
+            file_names.add(os.path.abspath(file_name))
+
+    add(module)
+    for thing in list(module.__dict__.values()):
+        if inspect.isclass(thing):
+            for clazz in inspect.getmro(thing):
+                add(clazz)
+    return sorted(file_names)
+
+
 class AstParseItem(TransformThing):
     def __init__(self):
         # super(AstParseItem, self).__init__(self)
@@ -226,29 +340,89 @@ class AstParseItem(TransformThing):
         """override base class method"""
         return "ast.parse"
 
-    def get_instance(self):
+    def get_instance(self, positional_args=None, profiler=None):
+        """override base class method"""
+        return None
+
+    def load(self):
         """override base class method"""
         return None
 
 
 class TransformCollection(object):
     """
-    a list of transforms contained in file
+    a list of transforms contained in file. with a discovery_cache the
+    transforms are taken from it when it is current for the collection,
+    update imports the module and puts what it found there. discovered is
+    False until one of them has looked
     """
-    def __init__(self, collection_name):
+    def __init__(self, collection_name, discovery_cache=None):
         self.collection_name = collection_name
+        self.discovery_cache = discovery_cache
+        self.discovered = False
         self.node_transforms = []
         self.code_generators = []
 
     def update(self):
         raise Exception("did not implement update method for %s" % self)
 
+    def discover(self, cached=True):
+        """
+        find the transforms, cached False imports the module even when the
+        discovery cache is current for it. a collection made lazy waits for this
+        """
+        if not (cached and self.load_cached()):
+            self.update()
+
+    def discovery_key(self):
+        return "%s %s %s" % (type(self).__name__, self.path, self.collection_name)
+
+    def load_cached(self):
+        """take the transforms from the discovery cache, False if it has nothing current for this collection"""
+        if self.discovery_cache is None:
+            return False
+        descriptions = self.discovery_cache.get(self.discovery_key())
+        if descriptions is None:
+            return False
+
+        print("transforms of %s %s from discovery cache" % (self.path, self.package_name))
+        if not self.path in sys.path:
+            sys.path.append(self.path)
+
+        self.node_transforms = []
+        self.code_generators = []
+        for description in descriptions:
+            new_transform = TransformFactory.from_description(
+                description, file_name=self.file_name, transform_collection=self
+            )
+            if isinstance(new_transform, CodeGeneratorItem):
+                self.code_generators.append(new_transform)
+            else:
+                self.node_transforms.append(new_transform)
+        self.discovered = True
+        return True
+
+    def remember(self, module):
+        """put the transforms update found in module into the discovery cache"""
+        if self.discovery_cache is None:
+            return
+        self.discovery_cache.put(
+            self.discovery_key(),
+            source_files(module),
+            [transform.describe() for transform in self.node_transforms + self.code_generators]
+        )
+
+    def forget(self):
+        if self.discovery_cache is not None:
+            self.discovery_cache.discard(self.discovery_key())
+
+
 class TransformFile(TransformCollection):
     """
     a list of transforms contained in file
     """
-    def __init__(self, file_name):
-        super(TransformFile, self).__init__(file_name)
+    def __init__(self, file_name, discovery_cache=None, cached=True, lazy=False):
+        super(TransformFile, self).__init__(file_name, discovery_cache=discovery_cache)
         self.file_name = file_name
         self.base_name = os.path.basename(file_name)
 
@@ -261,28 +435,40 @@ class TransformFile(TransformCollection):
         self.path, self.package_name = Util.path_to_path_and_package(self.file_name)
         self.path = os.path.abspath(self.path)
 
-        self.update()
-
-    def update(self):
-        self.load_error_info = None
-        self.load_error_line_number = None
-
-        if self.package_name in sys.modules:
-            Util.clear_classes_in_package(self.package_name)
+        if lazy:
+            # the editor shows the file before its transforms are known
+            self.read_source()
+        else:
+            self.discover(cached)
 
+    def read_source(self):
         self.source_text = ''
         with open(self.file_name, "r") as f:
             self.source_text = f.read()
 
         self.class_def_nodes = {}
-        self.node_transforms = []
-        self.code_generators = []
-
         self.ast_tree = ast.parse(self.source_text)
         for node in ast.walk(self.ast_tree):
             if isinstance(node, ast.ClassDef):
                 self.class_def_nodes[node.name] = node
 
+    def load_cached(self):
+        if self.discovery_cache is None:
+            return False
+        self.read_source()
+        return super(TransformFile, self).load_cached()
+
+    def update(self):
+        self.load_error_info = None
+        self.load_error_line_number = None
+
+        if self.package_name in sys.modules:
+            Util.clear_classes_in_package(self.package_name)
+
+        self.read_source()
+        self.node_transforms = []
+        self.code_generators = []
+
         print("transform file %s %s" % (self.path, self.package_name))
 
         if not self.path in sys.path:
@@ -302,6 +488,8 @@ class TransformFile(TransformCollection):
 
             self.load_error_info = message
             self.load_error_line_number = exc_tb.tb_lineno
+            self.forget()
+            self.discovered = True
 
             return
 
@@ -318,14 +506,16 @@ class TransformFile(TransformCollection):
 
         self.node_transforms.sort(key=methodcaller('name'))
         self.code_generators.sort(key=methodcaller('name'))
+        self.remember(module)
+        self.discovered = True
 
 
 class TransformPackage(TransformCollection):
     """
     a list of transforms contained in package
     """
-    def __init__(self, raw_package_name):
-        super(TransformPackage, self).__init__(raw_package_name)
+    def __init__(self, raw_package_name, discovery_cache=None, cached=True, lazy=False):
+        super(TransformPackage, self).__init__(raw_package_name, discovery_cache=discovery_cache)
         print (raw_package_name)
         self.file_name = raw_package_name
         self.base_name = raw_package_name.split(".")[0]
@@ -336,10 +526,13 @@ class TransformPackage(TransformCollection):
         self.path, self.package_name = Util.path_to_path_and_package(self.file_name)
         self.path = os.path.abspath(self.path)
 
-        self.update()
+        if not lazy:
+            self.discover(cached)
 
     def update(self):
         print("transform package %s %s" % (self.path, self.package_name))
+        self.node_transforms = []
+        self.code_generators = []
 
         if not self.path in sys.path:
             sys.path.append(self.path)
@@ -358,12 +551,15 @@ class TransformPackage(TransformCollection):
 
             self.load_error_info = message
             self.load_error_line_number = exc_tb.tb_lineno
+            self.forget()
+            self.discovered = True
 
             return
 
         module = sys.modules[self.package_name]
         print("module %s" % module)
 
+        code_generator_class = code_generator_base()
         for key in module.__dict__:
             thing = module.__dict__[key]
             # print("  got %s -> %s" % (key, thing))
@@ -375,7 +571,7 @@ class TransformPackage(TransformCollection):
                             file_name=self.file_name,
                             transform_file=self
                         ))
-                if issubclass(thing, CodeGenVisitor):
+                if issubclass(thing, code_generator_class):
                     if thing.__name__ != "CodeGenVisitor":
                         self.code_generators.append(CodeGeneratorItem(
                             thing,
@@ -385,6 +581,8 @@ class TransformPackage(TransformCollection):
 
         self.node_transforms.sort(key=methodcaller('name'))
         self.code_generators.sort(key=methodcaller('name'))
+        self.remember(module)
+        self.discovered = True
 
 
 if __name__ == '__main__':
@@ -0,0 +1,145 @@
+"""
+where a transform spends its time, broken down by the visit_* method that
+handled each node and by the class of the node. installed on a transformer
+instance through its visit, a transformer without a profiler runs untouched
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import json
+import time
+
+from ast_tool_box.models.visit_hooks import wrap_visit
+
+try:
+    clock = time.perf_counter
+except AttributeError:
+    clock = time.time
+
+# what a visit did with the node it was given
+KEPT, REPLACED, REMOVED, EXPANDED, RAISED = 'kept', 'replaced', 'removed', 'expanded', 'raised'
+outcomes = (KEPT, REPLACED, REMOVED, EXPANDED, RAISED)
+
+
+class VisitStats(object):
+    """
+    totals for one visit_* method or node class. inclusive time counts
+    nested visits, recursive ones only once, exclusive time does not
+    """
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.inclusive_seconds = 0.0
+        self.exclusive_seconds = 0.0
+        self.outcomes = dict((outcome, 0) for outcome in outcomes)
+        self.active = 0
+
+    def as_dict(self):
+        entry = {
+            'name': self.name,
+            'calls': self.calls,
+            'inclusive_seconds': self.inclusive_seconds,
+            'exclusive_seconds': self.exclusive_seconds,
+        }
+        entry.update(self.outcomes)
+        return entry
+
+
+class TransformProfiler(object):
+    """
+    profiles every transformer it is installed on, one profiler can be used
+    for several instances and accumulates over them. plain data so it can be
+    pickled back from a worker process
+    """
+    def __init__(self, transform_name=None):
+        self.transform_name = transform_name
+        self.methods = {}
+        self.node_classes = {}
+        self.nodes_visited = 0
+        self.total_seconds = 0.0
+        self._child_seconds = []
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_child_seconds'] = []
+        return state
+
+    def install(self, instance):
+        if self.transform_name is None:
+            self.transform_name = type(instance).__name__
+        method_names = {}
+
+        def method_name(node_class):
+            """the method NodeVisitor.visit would dispatch node_class to"""
+            name = method_names.get(node_class)
+            if name is None:
+                name = 'visit_' + node_class.__name__
+                if getattr(instance, name, None) is None:
+                    name = 'generic_visit'
+                method_names[node_class] = name
+            return name
+
+        def wrapper(visit):
+            def profiled_visit(node):
+                node_class = type(node)
+                method = self._stats(self.methods, method_name(node_class))
+                by_class = self._stats(self.node_classes, node_class.__name__)
+                method.active += 1
+                by_class.active += 1
+                self._child_seconds.append(0.0)
+                outcome = RAISED
+                start = clock()
+                try:
+                    result = visit(node)
+                    if result is node:
+                        outcome = KEPT
+                    elif result is None:
+                        outcome = REMOVED
+                    elif isinstance(result, list):
+                        outcome = EXPANDED
+                    else:
+                        outcome = REPLACED
+                    return result
+                finally:
+                    elapsed = clock() - start
+                    exclusive = elapsed - self._child_seconds.pop()
+                    if self._child_seconds:
+                        self._child_seconds[-1] += elapsed
+                    else:
+                        self.total_seconds += elapsed
+                    self.nodes_visited += 1
+                    for stats in (method, by_class):
+                        stats.active -= 1
+                        stats.calls += 1
+                        stats.exclusive_seconds += exclusive
+                        stats.outcomes[outcome] += 1
+                        if not stats.active:
+                            stats.inclusive_seconds += elapsed
+            return profiled_visit
+        return wrap_visit(instance, wrapper)
+
+    @staticmethod
+    def _stats(table, name):
+        stats = table.get(name)
+        if stats is None:
+            stats = table[name] = VisitStats(name)
+        return stats
+
+    def report(self):
+        """everything as plain dicts and lists, rows slowest exclusive time first"""
+        def rows(table):
+            return [
+                stats.as_dict()
+                for stats in sorted(table.values(), key=lambda s: (-s.exclusive_seconds, s.name))
+            ]
+        return {
+            'transform': self.transform_name,
+            'nodes_visited': self.nodes_visited,
+            'total_seconds': self.total_seconds,
+            'methods': rows(self.methods),
+            'node_classes': rows(self.node_classes),
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.report(), indent=indent, sort_keys=True)
@@ -0,0 +1,320 @@
+"""
+applying transforms in worker processes, so a transform that never returns,
+eats all memory or crashes the interpreter costs a worker and not the session
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+
+from ast_tool_box.models.ast_cloner import clone_tree
+from ast_tool_box.models.copy_on_write import CopyOnWriteTransform
+from ast_tool_box.models.code_generation import generate_chunks, write_chunk
+from ast_tool_box.models.source_map import GeneratedSourceMap
+from ast_tool_box.models.visit_hooks import VisitCancelled
+from ast_tool_box.models.subtree_splice import node_at, splice
+
+
+class TransformWorkerError(RuntimeError):
+    pass
+
+
+class TransformCancelled(TransformWorkerError):
+    pass
+
+
+class TransformJob(object):
+    """
+    one application of a transform or code generator to a tree, everything
+    needed to do it somewhere else. the transform class is pickled by
+    reference so the worker imports it, import_paths are added to its sys.path.
+
+    copy_tree makes run work on a clone of the tree, a worker has its own
+    unpickled copy and does not need one. copy_on_write uses
+    CopyOnWriteTransform instead of a clone. a VisitCounter in progress is
+    installed on the transformer to count the nodes it visits, a
+    TransformProfiler in profiler to time them, a worker sends it back filled in.
+    with a subtree_path only the node there is transformed and the result is
+    spliced into a copy of the path to it.
+
+    code generation goes a file at a time, each GeneratedChunk is passed to
+    chunk_sink as it is done and, with an output_directory, written below it.
+    progress then counts files. codegen_processes other than 1 generates the
+    files of a project in a pool, the one of codegen_pool, a CodegenPool kept
+    by the caller, when it is set. file_timings gets (file name, seconds) for
+    each file. record_source_map makes source_map a GeneratedSourceMap of the
+    text. generated_files gets (file name, start, end) of the code of each
+    file in the text. profiler, file_timings, source_map and generated_files
+    come back from a worker with the result
+    """
+    def __init__(self, transform, tree, argument_values=None, generate=False, import_paths=()):
+        self.transform = transform
+        self.tree = tree
+        self.argument_values = list(argument_values or [])
+        self.generate = generate
+        self.import_paths = list(import_paths)
+        self.copy_tree = True
+        self.copy_on_write = False
+        self.progress = None
+        self.profiler = None
+        self.subtree_path = None
+        self.chunk_sink = None
+        self.output_directory = None
+        self.codegen_processes = 1
+        self.codegen_pool = None
+        self.file_timings = []
+        self.record_source_map = False
+        self.source_map = None
+        self.generated_files = []
+        self.name = transform.__name__
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['progress'] = None
+        state['chunk_sink'] = None
+        state['codegen_pool'] = None
+        return state
+
+    @staticmethod
+    def for_transform_item(transform_item, tree, argument_values=None, generate=False):
+        import_paths = []
+        transform_file = getattr(transform_item, 'transform_file', None)
+        if getattr(transform_file, 'path', None):
+            import_paths.append(transform_file.path)
+        return TransformJob(transform_item.transform, tree, argument_values, generate, import_paths)
+
+    def reports(self):
+        """what running the job found out besides the result"""
+        return {
+            'profiler': self.profiler,
+            'file_timings': self.file_timings,
+            'source_map': self.source_map,
+            'generated_files': self.generated_files,
+        }
+
+    def take_reports(self, reports):
+        self.profiler = reports['profiler']
+        self.file_timings = reports['file_timings']
+        self.source_map = reports['source_map']
+        self.generated_files = reports['generated_files']
+
+    def instance(self):
+        if self.argument_values:
+            return self.transform(*self.argument_values)
+        return self.transform()
+
+    def run(self):
+        if self.generate:
+            return self.generate_code()
+        transformer = self.instance()
+        if self.progress is not None:
+            self.progress.install(transformer)
+        if self.profiler is not None:
+            self.profiler.install(transformer)
+        if self.subtree_path:
+            subtree = node_at(self.tree, self.subtree_path)
+            return splice(self.tree, self.subtree_path, self.transform_tree(transformer, subtree))
+        return self.transform_tree(transformer, self.tree)
+
+    def generate_code(self):
+        texts = []
+        self.file_timings = []
+        self.generated_files = []
+        source_map = GeneratedSourceMap() if self.record_source_map else None
+        offset = 0
+        tree = clone_tree(self.tree) if self.copy_tree else self.tree
+        chunks = generate_chunks(tree, self.codegen_processes, self.record_source_map, self.codegen_pool)
+        for index, chunk in enumerate(chunks):
+            self.file_timings.append((chunk.file_name or self.name, chunk.seconds))
+            if self.progress is not None:
+                if self.progress.cancelled:
+                    raise VisitCancelled()
+                self.progress.count += 1
+            if self.output_directory:
+                write_chunk(self.output_directory, chunk, "%s.c" % self.name)
+            if self.chunk_sink is not None:
+                self.chunk_sink(chunk)
+            text = chunk.display_text()
+            code_offset = offset + len(text) - len(chunk.code)
+            self.generated_files.append(
+                (chunk.file_name or "%s.c" % self.name, code_offset, code_offset + len(chunk.code))
+            )
+            if chunk.source_map is not None:
+                root_path = [] if chunk.name is None else [('files', index)]
+                source_map.add(code_offset, root_path, chunk.source_map)
+            offset += len(text)
+            texts.append(text)
+        text = "".join(texts)
+        self.source_map = source_map.finish(text) if source_map is not None else None
+        return text
+
+    def transform_tree(self, transformer, tree):
+        if self.copy_tree and self.copy_on_write:
+            return CopyOnWriteTransform(transformer).visit(tree)
+        return transformer.visit(clone_tree(tree) if self.copy_tree else tree)
+
+
+def _worker_main(connection, memory_limit_bytes):
+    """loop of a worker process, runs jobs until it gets None or the pipe closes"""
+    if memory_limit_bytes and not os.path.exists('/proc/self/statm'):
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+        except (ImportError, ValueError, OSError):
+            pass
+
+    while True:
+        try:
+            job = connection.recv()
+        except (EOFError, IOError):
+            return
+        if job is None:
+            return
+
+        for path in job.import_paths:
+            if path not in sys.path:
+                sys.path.append(path)
+        job.chunk_sink = lambda chunk: connection.send(('chunk', chunk, None))
+        try:
+            connection.send(('ok', job.run(), job.reports()))
+        except Exception:
+            connection.send(('error', traceback.format_exc(), None))
+
+
+class _Worker(object):
+    def __init__(self, memory_limit_bytes, generation=0):
+        self.generation = generation
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_worker_main, args=(child_connection, memory_limit_bytes))
+        self.process.daemon = True
+        self.process.start()
+        child_connection.close()
+
+    def rss_bytes(self):
+        """resident memory of the worker, None where /proc is not available"""
+        try:
+            with open('/proc/%d/statm' % self.process.pid) as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (IOError, OSError, ValueError, IndexError, AttributeError):
+            return None
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join(1)
+        self.connection.close()
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except (IOError, OSError):
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+
+
+class TransformWorkerPool(object):
+    """
+    up to max_workers worker processes, started when first needed and kept
+    for the next job. run blocks its calling thread, not the gui thread, until
+    the job is done. a worker that runs past timeout_seconds, grows past
+    memory_limit_mb resident, or whose job is cancelled is killed and
+    replaced by a new one on the next run.
+
+    workers are forked with the transforms already imported, call restart
+    after transforms are reloaded so new jobs see the new classes
+    """
+    poll_seconds = 0.05
+
+    def __init__(self, max_workers=2, timeout_seconds=120, memory_limit_mb=4096):
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_mb = memory_limit_mb
+        self.idle_workers = []
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(max_workers)
+        self.generation = 0
+
+    def memory_limit_bytes(self):
+        return self.memory_limit_mb * 1024 * 1024 if self.memory_limit_mb else None
+
+    def _take_worker(self):
+        with self.lock:
+            while self.idle_workers:
+                worker = self.idle_workers.pop()
+                if worker.process.is_alive():
+                    return worker
+        return _Worker(self.memory_limit_bytes(), self.generation)
+
+    def _give_back(self, worker):
+        with self.lock:
+            if worker.generation == self.generation:
+                self.idle_workers.append(worker)
+                return
+        worker.stop()
+
+    def run(self, job, cancel_event=None):
+        """the result of job, raises TransformWorkerError with the reason or the worker's traceback"""
+        self.slots.acquire()
+        try:
+            worker = self._take_worker()
+            try:
+                worker.connection.send(job)
+            except Exception:
+                self._give_back(worker)
+                raise TransformWorkerError(
+                    "cannot send %s to a worker process\n%s" % (job.name, traceback.format_exc()))
+
+            deadline = time.time() + self.timeout_seconds if self.timeout_seconds else None
+            limit = self.memory_limit_bytes()
+            while True:
+                if worker.connection.poll(self.poll_seconds):
+                    try:
+                        status, value, reports = worker.connection.recv()
+                    except (EOFError, IOError):
+                        worker.kill()
+                        raise TransformWorkerError(
+                            "worker process running %s died, exit code %s" % (job.name, worker.process.exitcode))
+                    if status == 'chunk':
+                        if job.chunk_sink is not None:
+                            job.chunk_sink(value)
+                        continue
+                    self._give_back(worker)
+                    if status == 'ok':
+                        job.take_reports(reports)
+                        return value
+                    raise TransformWorkerError(value)
+
+                if cancel_event is not None and cancel_event.is_set():
+                    worker.kill()
+                    raise TransformCancelled("%s was cancelled" % job.name)
+                if deadline is not None and time.time() > deadline:
+                    worker.kill()
+                    raise TransformWorkerError(
+                        "%s did not finish in %s seconds, its worker was stopped" % (job.name, self.timeout_seconds))
+                if limit:
+                    rss = worker.rss_bytes()
+                    if rss is not None and rss > limit:
+                        worker.kill()
+                        raise TransformWorkerError(
+                            "%s used more than %d MB, its worker was stopped" % (job.name, self.memory_limit_mb))
+        finally:
+            self.slots.release()
+
+    def restart(self):
+        """stop the idle workers, busy ones finish their job and are replaced afterwards"""
+        with self.lock:
+            self.generation += 1
+            workers, self.idle_workers = self.idle_workers, []
+        for worker in workers:
+            worker.stop()
+
+    def shutdown(self):
+        self.restart()
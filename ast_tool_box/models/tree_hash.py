@@ -0,0 +1,319 @@
+"""
+structural hashes of ast and ctree trees, two trees with the same node
+types, field values and positions get the same hash
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+import hashlib
+
+
+position_attributes = ('lineno', 'col_offset', 'end_lineno', 'end_col_offset')
+
+
+def text_digest(text):
+    """sha1 hex digest of a str, unicode or bytes"""
+    if not isinstance(text, bytes):
+        text = text.encode('utf-8')
+    return hashlib.sha1(text).hexdigest()
+
+
+def _node_fields(node):
+    fields = getattr(node, '_fields', None) or ()
+    return [(field, getattr(node, field, None)) for field in fields]
+
+
+def is_atom(node):
+    """
+    a node with no fields and no position, like the ast context and operator
+    instances the parser shares between many parents, its hash only depends
+    on its class so hashers keep no entry for it
+    """
+    return not getattr(node, '_fields', None) and all(
+        getattr(node, attribute, None) is None for attribute in position_attributes
+    )
+
+
+_atom_digests = {}
+
+
+def _value_token(value, digests):
+    """text standing for a field value, nodes are replaced by their digest"""
+    if isinstance(value, ast.AST):
+        digest = digests.get(id(value))
+        if digest is None:
+            digest = _atom_digests.get(type(value))
+            if digest is None:
+                digest = _atom_digests[type(value)] = node_digest(value, digests, False)
+        return digest
+    if isinstance(value, (list, tuple)):
+        return "[%s]" % ",".join(_value_token(element, digests) for element in value)
+    return repr(value)
+
+
+def node_digest(node, digests, include_positions=True):
+    """
+    the digest of one node given the digests of its children, keyed by id,
+    covers the node's class, its field values and optionally its position
+    """
+    parts = [type(node).__module__, type(node).__name__]
+    for field, value in _node_fields(node):
+        parts.append("%s=%s" % (field, _value_token(value, digests)))
+    if include_positions:
+        for attribute in position_attributes:
+            value = getattr(node, attribute, None)
+            if value is not None:
+                parts.append("%s=%r" % (attribute, value))
+    return text_digest("\x00".join(parts))
+
+
+def field_children(node):
+    """the nodes held in node's fields, lists are flattened"""
+    children = []
+    pending = [value for _, value in _node_fields(node)]
+    pending.reverse()
+    while pending:
+        value = pending.pop()
+        if isinstance(value, ast.AST):
+            children.append(value)
+        elif isinstance(value, (list, tuple)):
+            pending.extend(reversed(value))
+    return children
+
+
+def tree_hash(root, include_positions=True):
+    """hex digest for the tree under root"""
+    if not isinstance(root, ast.AST):
+        return text_digest(repr(root))
+    return TreeHasher(root, include_positions).hash_of(root)
+
+
+_missing = object()
+_removed = object()
+
+
+class LayeredMap(object):
+    """
+    a mapping read through the top dict and then the dicts below it, the
+    maps of the hashers a hasher was built on. writes and removals stay in
+    the top dict, the ones below are never changed
+    """
+    def __init__(self, below):
+        self.top = {}
+        self.below = below
+
+    def layers(self):
+        return [self.top] + self.below
+
+    def get(self, key, default=None):
+        value = self.top.get(key, _missing)
+        if value is _missing:
+            for layer in self.below:
+                value = layer.get(key, _missing)
+                if value is not _missing:
+                    break
+        if value is _missing or value is _removed:
+            return default
+        return value
+
+    def __getitem__(self, key):
+        value = self.get(key, _missing)
+        if value is _missing:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def __setitem__(self, key, value):
+        self.top[key] = value
+
+    def __delitem__(self, key):
+        self.top[key] = _removed
+
+    def flattened(self):
+        merged = {}
+        for layer in reversed(self.layers()):
+            merged.update(layer)
+        return dict((key, value) for key, value in merged.items() if value is not _removed)
+
+
+def _layers_of(mapping):
+    return mapping.layers() if isinstance(mapping, LayeredMap) else [mapping]
+
+
+class TreeHasher(object):
+    """
+    merkle style hashes for every subtree of a tree, computed in one bottom up
+    pass and kept, so comparing two subtrees, here or in another hasher, is
+    comparing two strings. a node's hash covers its class, its scalar fields,
+    the hashes of its children and, unless include_positions is False, its
+    line and column. hashes and parents are kept by id, atoms have none, see
+    is_atom. the tree keeps its nodes alive, the hasher does not.
+
+    after changing nodes in place call changed with them, only they and their
+    ancestors are hashed again, and the walk up stops at the first ancestor
+    whose hash comes out the same. subtrees that were put into a changed node
+    are hashed as they are found, subtrees taken out of the tree are passed
+    to forget before they are dropped so their ids are not taken for nodes
+    made later
+
+    base is the hasher of a tree this one shares subtrees with, a copy on
+    write or spliced result of it. its maps are read through and not copied,
+    only the nodes that are not in base are hashed and only the part of the
+    base tree that was replaced is walked to hide its entries, so the cost
+    follows what changed, not the size of the tree. base is not kept
+    """
+    max_layers = 8
+
+    def __init__(self, root, include_positions=True, base=None):
+        self.root = root
+        self.include_positions = include_positions
+        self.count = 0
+        self.lent = False
+        self._nodes_by_digest = None
+        if base is not None and base.include_positions == include_positions:
+            self.digests = base.layered('digests')
+            self.parents = base.layered('parents')
+            self.count = base.count
+            shared = set()
+            self._hash_subtree(root, None, shared)
+            self._hide_replaced(base.root, shared)
+        else:
+            self.digests = {}
+            self.parents = {}
+            self._hash_subtree(root, None)
+
+    def __len__(self):
+        return self.count
+
+    def layered(self, name):
+        """a LayeredMap over the map called name, for a hasher built on this one"""
+        self.lent = True
+        layers = _layers_of(getattr(self, name))
+        if len(layers) > self.max_layers:
+            layers = [LayeredMap(layers).flattened()]
+        return LayeredMap(layers)
+
+    def _writable(self):
+        """maps lent to another hasher are left as they are, writes go to a new top"""
+        if self.lent:
+            self.digests = LayeredMap(_layers_of(self.digests))
+            self.parents = LayeredMap(_layers_of(self.parents))
+            self.lent = False
+
+    def _hash_subtree(self, root, parent, shared=None):
+        """
+        hash the nodes under root that have no hash yet, shared gets the ids
+        of the hashed nodes found below them
+        """
+        digests = self.digests
+        parents = self.parents
+        stack = [(root, parent, False)]
+        while stack:
+            node, parent, children_done = stack.pop()
+            if not children_done:
+                parents[id(node)] = parent
+                stack.append((node, parent, True))
+                for child in field_children(node):
+                    if is_atom(child):
+                        continue
+                    if id(child) not in digests:
+                        stack.append((child, node, False))
+                    else:
+                        parents[id(child)] = node
+                        if shared is not None:
+                            shared.add(id(child))
+                continue
+            if id(node) not in digests:
+                self.count += 1
+            digests[id(node)] = node_digest(node, digests, self.include_positions)
+        self._nodes_by_digest = None
+
+    def _hide_replaced(self, base_root, shared):
+        """
+        remove the entries of the nodes of the base tree that this tree does
+        not hold, walking down from base_root until nodes this tree shares
+        """
+        if base_root is self.root:
+            return
+        stack = [base_root]
+        while stack:
+            node = stack.pop()
+            if id(node) in shared or is_atom(node) or id(node) not in self.digests:
+                continue
+            del self.digests[id(node)]
+            del self.parents[id(node)]
+            self.count -= 1
+            stack.extend(field_children(node))
+
+    def hash_of(self, node=None):
+        """hash of the subtree under node, the whole tree by default, None for a node not in the tree"""
+        if node is None:
+            node = self.root
+        if is_atom(node):
+            return _value_token(node, self.digests)
+        return self.digests.get(id(node))
+
+    def parent_of(self, node):
+        return self.parents.get(id(node))
+
+    def same(self, node, other_node, other_hasher=None):
+        """do the two subtrees have the same structure, other_node may belong to another hasher"""
+        other_hasher = other_hasher or self
+        digest = self.hash_of(node)
+        return digest is not None and digest == other_hasher.hash_of(other_node)
+
+    def changed(self, *nodes):
+        """
+        rehash nodes that were changed in place and their ancestors,
+        returns the new hash of the whole tree
+        """
+        self._writable()
+        for node in nodes:
+            while node is not None:
+                for child in field_children(node):
+                    if is_atom(child):
+                        continue
+                    if id(child) not in self.digests:
+                        self._hash_subtree(child, node)
+                    else:
+                        self.parents[id(child)] = node
+
+                digest = node_digest(node, self.digests, self.include_positions)
+                if digest == self.digests.get(id(node)):
+                    break
+                if id(node) not in self.digests:
+                    self.count += 1
+                self.digests[id(node)] = digest
+                node = self.parents.get(id(node))
+        self._nodes_by_digest = None
+        return self.hash_of()
+
+    def forget(self, *subtrees):
+        """drop the entries of subtrees that were taken out of the tree"""
+        self._writable()
+        stack = [subtree for subtree in subtrees if isinstance(subtree, ast.AST)]
+        while stack:
+            node = stack.pop()
+            if is_atom(node) or id(node) not in self.digests:
+                continue
+            del self.digests[id(node)]
+            del self.parents[id(node)]
+            self.count -= 1
+            stack.extend(field_children(node))
+        self._nodes_by_digest = None
+
+    def nodes_with_hash(self, digest):
+        """nodes of the tree whose subtree hash is digest, for finding duplicate subtrees"""
+        if self._nodes_by_digest is None:
+            nodes_by_digest = {}
+            stack = [self.root]
+            while stack:
+                node = stack.pop()
+                nodes_by_digest.setdefault(self.hash_of(node), []).append(node)
+                stack.extend(reversed(field_children(node)))
+            self._nodes_by_digest = nodes_by_digest
+        return self._nodes_by_digest.get(digest, [])
@@ -0,0 +1,52 @@
+"""
+hooks around the visit method of a transformer instance. NodeVisitor and
+NodeTransformer call self.visit for every child, so an instance attribute
+named visit sees every node of the traversal without changing the class
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+
+class VisitCancelled(Exception):
+    pass
+
+
+def wrap_visit(instance, wrapper):
+    """
+    replace instance.visit by wrapper(visit), returns a function that puts
+    back what was there before, hooks can be stacked
+    """
+    previous_visit = instance.__dict__.get('visit')
+    instance.visit = wrapper(instance.visit)
+
+    def restore():
+        if previous_visit is None:
+            instance.__dict__.pop('visit', None)
+        else:
+            instance.visit = previous_visit
+    return restore
+
+
+class VisitCounter(object):
+    """
+    counts the nodes visited by the transformers it is installed on, total is
+    the expected number when known. read from other threads to show progress,
+    setting cancelled stops the traversal at the next node with VisitCancelled.
+    unit says what is counted when it is not visited nodes
+    """
+    def __init__(self, total=0, unit="nodes visited"):
+        self.count = 0
+        self.total = total
+        self.unit = unit
+        self.cancelled = False
+
+    def install(self, instance):
+        def wrapper(visit):
+            def counting_visit(node):
+                if self.cancelled:
+                    raise VisitCancelled()
+                self.count += 1
+                return visit(node)
+            return counting_visit
+        return wrap_visit(instance, wrapper)
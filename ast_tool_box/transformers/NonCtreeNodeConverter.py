@@ -1,34 +1,60 @@
-from ast import NodeTransformer, iter_fields
+from ast import AST, NodeTransformer
 from ctree.nodes import CtreeNode
 from ctree.codegen import CodeGenVisitor
-from copy import deepcopy
 
-class NonCtreeNodeConverter(NodeTransformer):
 
+class NonCtreeNodeConverter(NodeTransformer):
+    """
+    wraps the nodes of a tree that are not ctree nodes so ctree codegen can
+    show them. only ctree nodes are walked, a foreign node is wrapped where
+    a ctree node holds it and the subtree below it is left alone until
+    NonCtreeNode.codegen reaches it, so a large python subtree costs one
+    wrapper until code is generated for it
+    """
     def generic_visit(self, node):
         if not isinstance(node, CtreeNode):
-            NodeTransformer.generic_visit(self,node)
             return NonCtreeNode(node)
-        return NodeTransformer.generic_visit(self,node)
+        return NodeTransformer.generic_visit(self, node)
 
-class NonCtreeNode(CtreeNode):
 
+def converted(node):
+    """node made safe for ctree codegen, foreign nodes get wrapped"""
+    if isinstance(node, NonCtreeNode) or not isinstance(node, AST):
+        return node
+    return NonCtreeNodeConverter().visit(node)
+
+
+class NonCtreeNode(CtreeNode):
+    """
+    stands in for a foreign node, its fields are read from the node rather
+    than copied. children are converted as codegen gets to them
+    """
     def _requires_semicolon(self):
         return False
 
-    def __init__(self, node=CtreeNode()):
-        self._fields = tuple(node._fields) + ('string',)
-        self.string = '// ' + type(node).__name__ + '\n'
-        for field, value in iter_fields(node):
-            setattr(self, field, value)
+    def __init__(self, node=None):
+        self.node = node if node is not None else CtreeNode()
+        self._fields = tuple(self.node._fields) + ('string',)
+        self.string = '// ' + type(self.node).__name__ + '\n'
+
+    def __getattr__(self, name):
+        # only called for what the wrapper does not have itself, copy and pickle
+        # look for attributes before node is set
+        if name == 'node':
+            raise AttributeError(name)
+        return getattr(self.node, name)
 
     def codegen(self, indent=0):
         str = self.string
         for field in self._fields:
-            if isinstance(getattr(self,field),CtreeNode):
-                str += getattr(self,field).codegen(indent)
+            value = getattr(self, field, None)
+            if isinstance(value, AST):
+                str += converted(value).codegen(indent)
         if 'body' in self._fields:
             visitor = CodeGenVisitor(indent = indent)
-            str += visitor._genblock(self.body)
+            body = self.body
+            if isinstance(body, list):
+                body = [converted(statement) for statement in body]
+            str += visitor._genblock(body)
 
         return str
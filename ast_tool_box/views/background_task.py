@@ -0,0 +1,50 @@
+__author__ = 'Chick Markley'
+
+import threading
+import traceback
+
+from PySide import QtCore
+
+
+class BackgroundTask(QtCore.QObject):
+    """
+    calls function(*args) on a worker thread and delivers the result, or the
+    formatted traceback if it raised, through signals handled on the gui thread.
+    the function must not touch any widgets, it can hand partial results to
+    report, they arrive through the partial signal
+    """
+    succeeded = QtCore.Signal(object)
+    failed = QtCore.Signal(str)
+    partial = QtCore.Signal(object)
+
+    def __init__(self, function, args=(), parent=None):
+        super(BackgroundTask, self).__init__(parent)
+        self.function = function
+        self.args = args
+        self.cancelled = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def report(self, value):
+        """called on the worker thread"""
+        if not self.cancelled:
+            self.partial.emit(value)
+
+    def cancel(self):
+        """the result of a cancelled task is dropped, the function itself runs to completion"""
+        self.cancelled = True
+
+    def run(self):
+        try:
+            result = self.function(*self.args)
+        except Exception:
+            if not self.cancelled:
+                self.failed.emit(traceback.format_exc())
+            return
+        if not self.cancelled:
+            self.succeeded.emit(result)
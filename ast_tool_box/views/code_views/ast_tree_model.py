@@ -0,0 +1,154 @@
+__author__ = 'Chick Markley'
+
+from PySide import QtCore
+
+from ast_tool_box.models.code_models.ast_tree_rows import child_specs, root_spec, row_label
+
+
+class AstTreeRow(object):
+    """
+    one row of the tree view, wraps a node or field value of the ast
+    child rows are only created when the view asks for them
+    """
+    def __init__(self, spec, parent_row=None, row=0):
+        self.spec = spec
+        self.parent_row = parent_row
+        self.row = row
+        self.children = []
+        self._child_specs = None
+        self._text = None
+
+    @property
+    def ast_node(self):
+        return self.spec.value if self.spec else None
+
+    def parent(self):
+        return self.parent_row
+
+    def child_specs(self):
+        if self._child_specs is None:
+            self._child_specs = child_specs(self.spec.value)
+        return self._child_specs
+
+    def has_children(self):
+        return len(self.child_specs()) > 0
+
+    def can_fetch_more(self):
+        return len(self.children) < len(self.child_specs())
+
+    def text(self):
+        if self._text is None:
+            self._text = row_label(self.spec.label, self.spec.value)
+        return self._text
+
+    def path(self):
+        """row numbers from the top of the view down to this row"""
+        path = []
+        row = self
+        while row.parent_row is not None:
+            path.append(row.row)
+            row = row.parent_row
+        return tuple(reversed(path))
+
+
+class AstTreeModel(QtCore.QAbstractItemModel):
+    """
+    presents an ast to a QTreeView, rows are built straight from the ast
+    objects in batches as the view scrolls or expands, so the cost of
+    showing a tree follows the number of rows looked at, not the size of the tree
+    """
+    fetch_batch_size = 256
+
+    def __init__(self, ast_root=None, file_name="", parent=None):
+        super(AstTreeModel, self).__init__(parent)
+        self.ast_root = ast_root
+        self.file_name = file_name
+
+        self.root_row = AstTreeRow(None)
+        self.root_row._child_specs = []
+        if ast_root is not None:
+            self.root_row._child_specs.append(root_spec(ast_root, file_name))
+            self.root_row.children.append(AstTreeRow(self.root_row._child_specs[0], self.root_row, 0))
+
+    def row_for_index(self, index):
+        if index.isValid():
+            return index.internalPointer()
+        return self.root_row
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        parent_row = self.row_for_index(parent)
+        if column != 0 or row < 0 or row >= len(parent_row.children):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, parent_row.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+
+        parent_row = index.internalPointer().parent_row
+        if parent_row is None or parent_row is self.root_row:
+            return QtCore.QModelIndex()
+        return self.createIndex(parent_row.row, 0, parent_row)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.row_for_index(parent).children)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        return self.row_for_index(parent).has_children()
+
+    def canFetchMore(self, parent):
+        return self.row_for_index(parent).can_fetch_more()
+
+    def fetchMore(self, parent):
+        self.fetch_rows(parent, self.fetch_batch_size)
+
+    def fetch_rows(self, parent, count):
+        """create up to count more child rows under parent, returns the number created"""
+        parent_row = self.row_for_index(parent)
+        specs = parent_row.child_specs()
+        start = len(parent_row.children)
+        end = min(len(specs), start + count)
+        if end <= start:
+            return 0
+
+        self.beginInsertRows(parent, start, end - 1)
+        for position in range(start, end):
+            parent_row.children.append(AstTreeRow(specs[position], parent_row, position))
+        self.endInsertRows()
+        return end - start
+
+    def fetch_all(self, parent):
+        parent_row = self.row_for_index(parent)
+        self.fetch_rows(parent, len(parent_row.child_specs()))
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return index.internalPointer().text()
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole and section == 0:
+            return "Node"
+        return None
+
+    def index_for_path(self, path):
+        """
+        returns the index of the row at path, only the rows above it
+        are created
+        """
+        index = QtCore.QModelIndex()
+        for row in path:
+            parent_row = self.row_for_index(index)
+            if row >= len(parent_row.child_specs()):
+                return QtCore.QModelIndex()
+            if row >= len(parent_row.children):
+                self.fetch_rows(index, row + 1 - len(parent_row.children))
+            index = self.index(row, 0, index)
+        return index
@@ -1,10 +1,16 @@
 __author__ = 'Chick Markley'
 
-import types
 import ast
 import tempfile
 import os
 from ast_tool_box.views.search_widget import SearchLineEdit
+from ast_tool_box.views.code_views.ast_tree_model import AstTreeModel
+from ast_tool_box.views.code_views.transform_profile_view import TransformProfileView
+from ast_tool_box.views.time_sliced_task import TimeSlicedTask
+from ast_tool_box.views.background_task import BackgroundTask
+from ast_tool_box.models.code_models.ast_search_index import AstSearchIndex
+from ast_tool_box.models.code_models.ast_span_index import AstSpanIndex
+from ast_tool_box.models.ast_query import compile_query, AstQueryError
 
 from PySide import QtGui, QtCore
 
@@ -12,23 +18,49 @@ DEBUGGING = False
 
 
 class AstTreePane(QtGui.QGroupBox):
+    """
+    a searchable ast tree, search text starting with query_prefix is a
+    structural query (see ast_tool_box.models.ast_query) otherwise rows whose
+    text contains the search text are found
+    """
+    search_delay_milliseconds = 150
+    query_prefix = '/'
+
     def __init__(self, code_presenter=None, ast_root=None, tab_name=None):
         super(AstTreePane, self).__init__()
         self.code_presenter = code_presenter
+        self.tab_name = tab_name
 
+        self.search_index = None
+        self.span_index = None
+        self.index_task = None
+        self.span_task = None
+        self.query_task = None
+        self.search_results = {}
         self.search_next_index = 0
         self.last_search = ''
 
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(AstTreePane.search_delay_milliseconds)
+        self.search_timer.timeout.connect(self.run_search)
+
         layout = QtGui.QVBoxLayout()
 
         self.search_box = SearchLineEdit(on_changed=self.search_box_changed, on_next=self.search_next)
         layout.addWidget(self.search_box)
 
-        self.ast_tree_widget = AstTreeWidget(code_presenter=self.code_presenter, ast_root=ast_root, tab_name=tab_name)
-        layout.addWidget(self.ast_tree_widget)
+        self.ast_tree_widget = AstTreeWidget(code_presenter=self.code_presenter, tab_name=tab_name)
+        self.splitter = QtGui.QSplitter(QtCore.Qt.Vertical)
+        self.splitter.addWidget(self.ast_tree_widget)
+        layout.addWidget(self.splitter)
+        self.profile_view = None
 
         self.setLayout(layout)
 
+        if ast_root:
+            self.make_tree_from(ast_root)
+
     def expand_all(self):
         print("got to %s" % self)
         self.ast_tree_widget.expand_descendants()
@@ -37,59 +69,141 @@ class AstTreePane(QtGui.QGroupBox):
         print("got to %s" % self)
         self.ast_tree_widget.collapse_descendants()
 
+    def show_profile(self, profiler):
+        """show the report of the TransformProfiler that made this tree below it, None removes it"""
+        if self.profile_view is not None:
+            self.profile_view.setParent(None)
+            self.profile_view = None
+        if profiler is None:
+            return
+        self.profile_view = TransformProfileView(profiler)
+        self.splitter.addWidget(self.profile_view)
+        self.splitter.setSizes([3, 1])
+
     def make_tree_from(self, syntax_tree, file_name="", display_depth=1):
         self.ast_tree_widget.make_tree_from(syntax_tree, file_name=file_name, display_depth=display_depth)
+        self.build_search_index(syntax_tree, file_name)
+        self.build_span_index(syntax_tree)
+
+    def cancel_build(self):
+        self.ast_tree_widget.cancel_build()
+        for task in (self.index_task, self.span_task, self.query_task):
+            if task is not None:
+                task.cancel()
+        self.search_timer.stop()
+
+    def build_search_index(self, syntax_tree, file_name=""):
+        """index the rows of the tree on a worker thread, searches wait for it"""
+        self.search_index = None
+        self.search_results = {}
+        if self.index_task is not None:
+            self.index_task.cancel()
+        if syntax_tree is None:
+            return
 
-    def search_next(self):
-        if self.search_box.text() != self.last_search:
-            self.search_next_index = 0
-        else:
-            self.search_next_index += 1
-
-        self.last_search = self.search_box.text()
+        self.index_task = BackgroundTask(AstSearchIndex, (syntax_tree, file_name), parent=self)
+        self.index_task.succeeded.connect(self.search_index_ready)
+        self.index_task.start()
+
+    def search_index_ready(self, search_index):
+        self.index_task = None
+        self.search_index = search_index
+        if self.search_box.text():
+            self.run_search()
+
+    def build_span_index(self, syntax_tree):
+        """index the source positions of the tree on a worker thread"""
+        self.span_index = None
+        if self.span_task is not None:
+            self.span_task.cancel()
+        if syntax_tree is None:
+            return
 
-        current_tree = self.ast_tree_widget
-        items = current_tree.findItems(
-            self.search_box.text(),
-            QtCore.Qt.MatchContains | QtCore.Qt.MatchRecursive,
-            column=AstTreeWidget.COL_NODE
-        )
-        # print("Found %d items" % len(items))
-        if len(items) > 0:
-            if self.search_next_index >= len(items):
-                self.search_next_index = 0
+        self.span_task = BackgroundTask(AstSpanIndex, (syntax_tree,), parent=self)
+        self.span_task.succeeded.connect(self.span_index_ready)
+        self.span_task.start()
 
-            # print(items[0])
-            current_tree.setCurrentItem(items[self.search_next_index])
-            current_tree.expandItem(items[self.search_next_index])
+    def span_index_ready(self, span_index):
+        self.span_task = None
+        self.span_index = span_index
 
+    def select_node(self, node):
+        """make the row of node current, returns False if it cannot be found (yet)"""
+        if self.search_index is None or node is None:
+            return False
+        path = self.search_index.path_for_node(node)
+        if path is None:
+            return False
+        self.ast_tree_widget.select_path(path)
+        return True
 
     def search_box_changed(self):
-        if not self.search_box.text():
+        self.search_next_index = 0
+        if self.search_box.text():
+            self.search_timer.start()
+        else:
+            self.search_timer.stop()
+
+    def run_search(self):
+        """look up the current search text, querying the index off the gui thread on a cache miss"""
+        self.search_timer.stop()
+        text = self.search_box.text()
+        if not text:
+            return
+        if text in self.search_results:
+            self.show_search_result(text)
+            return
+        if self.search_index is None:
             return
 
-        current_tree = self.ast_tree_widget
-        # print("current tree %s" % current_tree)
-        #
-        # for widget_index in range(self.ast_tree_tabs.count()):
-        #     widget = self.ast_tree_tabs.widget(widget_index)
-        #     print("widget %s ast_tree %s" % (widget, widget.ast_root))
-
-        items = current_tree.findItems(
-            self.search_box.text(),
-            QtCore.Qt.MatchContains | QtCore.Qt.MatchRecursive,
-            column=AstTreeWidget.COL_NODE
+        if text.startswith(AstTreePane.query_prefix):
+            try:
+                ast_query = compile_query(text[len(AstTreePane.query_prefix):])
+            except AstQueryError as error:
+                self.search_box.setToolTip(str(error))
+                return
+            search, argument = self.search_index.structural_query, ast_query
+        else:
+            search, argument = self.search_index.query, text
+        self.search_box.setToolTip("")
+
+        if self.query_task is not None:
+            self.query_task.cancel()
+        self.query_task = BackgroundTask(search, (argument,), parent=self)
+        self.query_task.succeeded.connect(
+            lambda paths, text=text: self.search_finished(text, paths)
         )
-        # print("Found %d items" % len(items))
-        if len(items) > 0:
-            # print(items[0])
-            current_tree.setCurrentItem(items[0])
-            current_tree.expandItem(items[0])
+        self.query_task.start()
+
+    def search_finished(self, text, paths):
+        self.query_task = None
+        self.search_results[text] = paths
+        if text == self.search_box.text():
+            self.show_search_result(text)
+
+    def show_search_result(self, text):
+        paths = self.search_results[text]
+        self.last_search = text
+        if len(paths) > 0:
+            if self.search_next_index >= len(paths):
+                self.search_next_index = 0
+            self.ast_tree_widget.select_path(paths[self.search_next_index])
+
+    def search_next(self):
+        text = self.search_box.text()
+        if text != self.last_search or text not in self.search_results:
+            self.search_next_index = 0
+            self.run_search()
+            return
+
+        self.search_next_index += 1
+        self.show_search_result(text)
 
 
-class AstTreeWidget(QtGui.QTreeWidget):
+class AstTreeWidget(QtGui.QTreeView):
     """
-    displays an ast as a tree widget
+    displays an ast as a tree, rows come from an AstTreeModel which
+    only builds the rows that are actually shown
     """
     COL_NODE = 0
     COL_FIELD = 1
@@ -99,16 +213,23 @@ class AstTreeWidget(QtGui.QTreeWidget):
     COL_HIGHLIGHT = 5
 
     expand_all_at_create = True
+    expand_row_budget = 2000
+
+    build_progress = QtCore.Signal(int, int)
+    build_finished = QtCore.Signal()
+    current_node_changed = QtCore.Signal(object)
 
     def __init__(self, code_presenter=None, ast_root=None, tab_name='tab'):
         super(AstTreeWidget, self).__init__()
 
         self.code_presenter = code_presenter
         self.tab_name = tab_name
+        self.code_item = None
+        self.builder = None
 
         self.ast_root = ast_root
-        self.setColumnCount(2)
-        self.setHeaderLabels(["Node"])
+        self.setUniformRowHeights(True)
+        self.setModel(AstTreeModel(parent=self))
         self.header().resizeSection(AstTreeWidget.COL_NODE, 800)
         self.header().setStretchLastSection(True)
 
@@ -156,35 +277,46 @@ class AstTreeWidget(QtGui.QTreeWidget):
         transformer = self.ast_transformers.get_instance_by_name(name)
         self.main_window.add_tree_tab(transformer=transformer)
 
+    def currentChanged(self, current, previous):
+        """announces the nearest ast node at or above the new current row"""
+        super(AstTreeWidget, self).currentChanged(current, previous)
+        if not current.isValid():
+            return
+        row = self.model().row_for_index(current)
+        while row is not None and row.spec is not None and not isinstance(row.ast_node, ast.AST):
+            row = row.parent_row
+        if row is not None and isinstance(row.ast_node, ast.AST):
+            self.current_node_changed.emit(row.ast_node)
+
+    def current_row(self):
+        index = self.currentIndex()
+        if not index.isValid():
+            return None
+        return self.model().row_for_index(index)
+
+    def current_node(self):
+        row = self.current_row()
+        return row.ast_node if row else None
+
+    def select_path(self, path):
+        """make the row at path current, creating the rows above it as needed"""
+        index = self.model().index_for_path(path)
+        if index.isValid():
+            self.setCurrentIndex(index)
+            self.scrollTo(index)
+
     def show_with_dot(self):
         from ctree.visual.dot_manager import DotManager
-        # start_node = self.currentItem().ast_node
-        #
-        # def find_appropriate_node(node):
-        #     if not node:
-        #         return None
-        #     if isinstance(node, ast.AST):
-        #         return node
-        #     if hasattr(node, 'parent'):
-        #         return find_appropriate_node(node.parent)
-        #     return None
-        #
-        # start_node = find_appropriate_node(start_node)
-        start_item = self.currentItem()
-
-        def find_appropriate_node(item):
-            if not item:
+        start_row = self.current_row()
+
+        def find_appropriate_node(row):
+            if not row:
                 return None
-            if hasattr(item, 'ast_node') and isinstance(item.ast_node, ast.AST):
-                return item.ast_node
-            if hasattr(item, 'parent'):
-                return find_appropriate_node(item.parent())
-            print("bad node %s" % item)
-            import pprint
-            pprint(dir(item))
-            return None
+            if isinstance(row.ast_node, ast.AST):
+                return row.ast_node
+            return find_appropriate_node(row.parent_row)
 
-        start_node = find_appropriate_node(start_item)
+        start_node = find_appropriate_node(start_row)
         if not start_node:
             self.code_presenter.show_error("Sorry, cannot find an ast node to begin graph")
             return
@@ -194,123 +326,107 @@ class AstTreeWidget(QtGui.QTreeWidget):
 
     def make_root(self):
         """make the current item the displayed root of the tree"""
-        # self.ast_root = self.currentItem().ast_node
-        # self.make_tree_from(self.ast_root)
-        self.code_presenter.apply_transform(code_item=self.currentItem().ast_node, transform_item=None)
-
-    def expand_descendants(self, item=None):
-        """Expand all descendants of the current item"""
-        if item is None:
-            print("item is none")
-            item = self.currentItem()
-            print("item is %s" % item)
-
-        item.setExpanded(True)
-        for child_index in range(item.childCount()):
-            self.expand_descendants(item.child(child_index))
-
-    def collapse_descendants(self, item=None):
-        """Expand all descendants of the current item"""
-        if item is None:
-            item = self.currentItem()
-
-        item.setExpanded(False)
-        for child_index in range(item.childCount()):
-            self.collapse_descendants(item.child(child_index))
+        self.code_presenter.apply_transform(code_item=self.current_node(), transform_item=None)
+
+    def root_index(self):
+        return self.model().index(0, 0)
+
+    def expand_descendants(self, index=None):
+        """Expand all descendants of the current item, a slice at a time"""
+        if index is None or not isinstance(index, QtCore.QModelIndex):
+            index = self.currentIndex()
+            if not index.isValid():
+                index = self.root_index()
+
+        self.start_build(self.expansion_steps(index, depth=None))
+
+    def collapse_descendants(self, index=None):
+        """Collapse all descendants of the current item"""
+        if index is None or not isinstance(index, QtCore.QModelIndex):
+            index = self.currentIndex()
+            if not index.isValid():
+                index = self.root_index()
+
+        self.cancel_build()
+        model = self.model()
+        to_collapse = [index]
+        while to_collapse:
+            index = to_collapse.pop()
+            if not index.isValid():
+                continue
+            self.setExpanded(index, False)
+            for row in range(model.rowCount(index)):
+                to_collapse.append(model.index(row, 0, index))
+
+    def expansion_steps(self, start_index, depth=None, row_budget=None):
+        """
+        generator that expands the tree breadth first below start_index,
+        down to depth levels (all of them when depth is None), stopping once
+        row_budget rows have been created. yields (rows created, row_budget)
+        after every bounded piece of work
+        """
+        model = self.model()
+        total = row_budget if row_budget else 0
+        level = [start_index]
+        rows_made = 0
+        levels_done = 0
+        while level and (depth is None or levels_done < depth):
+            next_level = []
+            for index in level:
+                if not index.isValid() or not model.hasChildren(index):
+                    continue
+                if row_budget is not None and rows_made >= row_budget:
+                    return
+                while model.canFetchMore(index):
+                    rows_made += model.fetch_rows(index, model.fetch_batch_size)
+                    yield rows_made, total
+                self.setExpanded(index, True)
+                for row in range(model.rowCount(index)):
+                    next_level.append(model.index(row, 0, index))
+            level = next_level
+            levels_done += 1
+
+    def start_build(self, steps):
+        """run steps from the event loop, replacing any build in progress"""
+        self.cancel_build()
+        self.builder = TimeSlicedTask(steps, parent=self)
+        self.builder.progress.connect(self.build_progress)
+        self.builder.finished.connect(self.build_done)
+        self.builder.start()
+
+    def cancel_build(self):
+        if self.builder is not None:
+            self.builder.cancel()
+            self.builder = None
+            self.build_finished.emit()
+
+    def build_done(self):
+        self.builder = None
+        self.build_finished.emit()
 
     def make_tree_from(self, syntax_tree, file_name="", display_depth=1):
         """
-        Populates the tree widget.
+        Populates the tree view, rows are created and expanded in small
+        batches from the event loop so the window stays responsive
         """
-        self.clear()
-
-        # State we keep during the recursion.
-        # Is needed to populate the selection column.
-        to_be_updated = list([])
-        state = {'from': '? : ?', 'to': '1 : 0'}
-
-        def add_node(ast_node, parent_item, field_label):
-            """
-            Helper function that recursively adds nodes.
-                :param parent_item: The parent QTreeWidgetItem to which this node will be added
-                :param field_label: Labels how this node is known to the parent
-            """
-
-            if isinstance(ast_node, types.ListType) or isinstance(ast_node, types.TupleType):
-                value_str = ''
-                node_str = "{} = {}".format(field_label, class_name(ast_node))
-                for idx, node in enumerate(ast_node):
-                    add_node(node, parent_item, "{}[{:d}]".format(field_label, idx))
-                return
+        self.cancel_build()
+        old_model = self.model()
+        self.setModel(AstTreeModel(syntax_tree, file_name=file_name, parent=self))
+        if old_model is not None:
+            old_model.deleteLater()
 
-            node_item = AstTreeWidgetItem(parent_item)
-            if parent_item is self:
-               self.setCurrentItem(node_item)
-
-            node_item.ast_node = ast_node
-
-            if hasattr(ast_node, 'lineno'):
-                position_str = " ({:d}:{:d})".format(ast_node.lineno, ast_node.col_offset)
-
-                # If we find a new position string we set the items found since the last time
-                # to 'old_line : old_col : new_line : new_col' and reset the list
-                # of to-be-updated nodes
-                if position_str != state['to']:
-                    state['from'] = state['to']
-                    state['to'] = position_str
-                    for node in to_be_updated:
-                        node.setText(AstTreeWidget.COL_HIGHLIGHT, "{} : {}".format(state['from'], state['to']))
-                    to_be_updated[:] = [node_item]
-                else:
-                    to_be_updated.append(node_item)
-            else:
-                to_be_updated.append(node_item)
-                position_str = ""
-
-            # Recursively descend the AST
-            if isinstance(ast_node, ast.AST):
-                value_str = ''
-                node_str = "{} = {}".format(field_label, class_name(ast_node))
-                for key, val in ast.iter_fields(ast_node):
-                    if val:
-                        add_node(val, node_item, key)
-            elif isinstance(ast_node, types.ListType) or isinstance(ast_node, types.TupleType):
-                raise Exception("%s list should have been handled earlier in function" % ast_node)
-            else:
-                value_str = repr(ast_node)
-                node_str = "{}: {}".format(field_label, value_str)
-
-            if position_str:
-                node_str += position_str
-
-            node_item.setText(AstTreeWidget.COL_NODE, node_str)
-
-        # End of helper function
-
-        #syntax_tree = ast.parse(self._source_code, filename=self._file_name, mode=self._mode)
-        #logger.debug(ast.dump(syntax_tree))
-        add_node(syntax_tree, self, '"{}"'.format(file_name))
+        self.ast_root = syntax_tree
+        if syntax_tree is None:
+            return
 
+        self.setCurrentIndex(self.root_index())
         if AstTreeWidget.expand_all_at_create:
-            self.expandToDepth(100)
+            steps = self.expansion_steps(
+                self.root_index(), depth=None, row_budget=AstTreeWidget.expand_row_budget
+            )
         else:
-            self.expandToDepth(display_depth)
-
-        self.ast_root = syntax_tree
-
-
-def class_name(obj):
-    """ Returns the class name of an object"""
-    return obj.__class__.__name__
-
-
-class AstTreeWidgetItem(QtGui.QTreeWidgetItem):
-    """
-    connects a gui tree item with the corresponding node in the actual ast tree
-    """
-    def __init__(self, parent, source_node=None):
-        super(AstTreeWidgetItem, self).__init__(parent)
-        self.ast_node = source_node
+            steps = self.expansion_steps(self.root_index(), depth=display_depth)
+        self.start_build(steps)
 
 
 class TransformerAction(QtGui.QAction):
@@ -324,7 +440,7 @@ class TransformerAction(QtGui.QAction):
     def do_transform(self):
         print("Triggered with string %s" % self.text)
         self.ast_tree_widget.code_presenter.apply_transform(
-            code_item=self.ast_tree_widget.currentItem().ast_node,
-            transform_item=self.transform_item
+            code_item=self.ast_tree_widget.current_node(),
+            transform_item=self.transform_item,
+            tree_item=self.ast_tree_widget.code_item
         )
-
@@ -3,7 +3,10 @@ __author__ = 'Chick Markley'
 from PySide import QtGui, QtCore
 from ast_tool_box.models.code_models.code_model import AstTreeItem, CodeItem, FileItem, GeneratedCodeItem
 from ast_tool_box.views.code_views.ast_tree_widget import AstTreePane, AstTreeWidget
+from ast_tool_box.views.code_views.generated_code_pane import GeneratedCodePane
+from ast_tool_box.views.code_views.pending_transform_pane import PendingTransformPane
 from ast_tool_box.views.editor_widget import EditorPane
+from ast_tool_box.models.subtree_splice import node_at
 
 
 class CodePane(QtGui.QGroupBox):
@@ -17,6 +20,7 @@ class CodePane(QtGui.QGroupBox):
         self.panel_count = panel_count
         self.all_expanded = True
         self.default_pane_size =default_pane_size
+        self.syncing_cursor = False
 
         layout = QtGui.QVBoxLayout()
 
@@ -105,14 +109,38 @@ class CodePane(QtGui.QGroupBox):
 
     def reload_panel(self):
         for index in range(self.code_splitter.count()-1, 1, -1):
+            widget = self.code_splitter.widget(index)
             self.tab_bar.removeTab(index)
-            self.code_splitter.widget(index).deleteLater()
-
+            self.discard_widget(widget)
+            if not isinstance(widget, PendingTransformPane):
+                self.code_presenter.remove_code_item(widget.code_item)
 
     def clear(self):
         for index in range(self.code_splitter.count()-1, -1, -1):
             self.tab_bar.removeTab(index)
-            self.code_splitter.widget(index).deleteLater()
+            self.discard_widget(self.code_splitter.widget(index))
+
+    @staticmethod
+    def discard_widget(widget):
+        """stop any tree still being built or transform still running in widget and schedule it for deletion"""
+        if isinstance(widget, (AstTreePane, PendingTransformPane)):
+            widget.cancel_build()
+        widget.deleteLater()
+
+    def show_build_progress(self, widget, done, total, unit="rows"):
+        index = self.code_splitter.indexOf(widget)
+        if index < 0:
+            return
+        if total:
+            progress = "%d%%" % min(99, 100 * done // total)
+        else:
+            progress = "%d %s" % (done, unit)
+        self.tab_bar.setTabText(index, u"%s \u231B %s" % (widget.tab_name, progress))
+
+    def show_build_finished(self, widget):
+        index = self.code_splitter.indexOf(widget)
+        if index >= 0:
+            self.tab_bar.setTabText(index, widget.tab_name)
 
     @QtCore.Slot(int)
     def tab_selected(self, index):
@@ -123,8 +151,9 @@ class CodePane(QtGui.QGroupBox):
     @QtCore.Slot(int)
     def delete_at(self, index):
         item = self.code_splitter.widget(index)
-        item.deleteLater()
-        self.code_presenter.delete_last_item()
+        self.discard_widget(item)
+        if not isinstance(item, PendingTransformPane):
+            self.code_presenter.remove_code_item(item.code_item)
         # item.destroy(destroyWindow=True, destroySubWindows=True)
         self.tab_bar.removeTab(index)
         #
@@ -201,6 +230,13 @@ class CodePane(QtGui.QGroupBox):
     def current_item(self):
         return self.code_presenter.current_item()
 
+    def selected_item(self):
+        """the code item of the current tab, None for a placeholder or no tab"""
+        index = self.tab_bar.currentIndex()
+        if index < 0:
+            return None
+        return getattr(self.code_splitter.widget(index), 'code_item', None)
+
     def add_code_item(self, code_item):
         """
         add a new code item widget to the right hand side of the
@@ -211,16 +247,72 @@ class CodePane(QtGui.QGroupBox):
         if isinstance(code_item, FileItem):
             widget = EditorPane()
             widget.setPlainText(code_item.code)
+            widget.cursorPositionChanged.connect(
+                lambda editor=widget: self.editor_cursor_moved(editor)
+            )
         elif isinstance(code_item, AstTreeItem):
-            widget = AstTreePane(self.code_presenter, code_item.code, tab_name=code_item.code_name)
+            widget = AstTreePane(self.code_presenter, tab_name=code_item.code_name)
+            widget.ast_tree_widget.build_progress.connect(
+                lambda done, total, pane=widget: self.show_build_progress(pane, done, total)
+            )
+            widget.ast_tree_widget.build_finished.connect(
+                lambda pane=widget: self.show_build_finished(pane)
+            )
+            widget.ast_tree_widget.current_node_changed.connect(
+                lambda node, pane=widget: self.tree_node_selected(pane, node)
+            )
         elif isinstance(code_item, GeneratedCodeItem):
-            widget = EditorPane()
-            widget.setPlainText(code_item.code)
+            widget = GeneratedCodePane(code_item)
+            widget.editor.cursorPositionChanged.connect(
+                lambda pane=widget: self.generated_cursor_moved(pane)
+            )
         else:
             CodePane.show_error("add_code_item got %s %s" % (type(code_item), code_item))
             return
 
-        self.tab_bar.addTab(code_item.code_name)
+        widget.code_item = code_item
+        if isinstance(code_item, AstTreeItem):
+            widget.ast_tree_widget.code_item = code_item
+        self.add_widget(widget, code_item.code_name)
+
+        if isinstance(code_item, AstTreeItem):
+            widget.make_tree_from(code_item.code)
+            if code_item.transform_profile is not None:
+                widget.show_profile(code_item.transform_profile)
+
+    def widget_indices(self, code_item):
+        """the tab indices of the widgets showing code_item"""
+        return [
+            index for index in range(self.code_splitter.count())
+            if getattr(self.code_splitter.widget(index), 'code_item', None) is code_item
+        ]
+
+    def delete_item(self, code_item):
+        """close the tab showing code_item, which removes it from the presenter"""
+        for index in reversed(self.widget_indices(code_item)):
+            self.delete_at(index)
+
+    def select_item(self, code_item):
+        """make the tab showing code_item the current one"""
+        indices = self.widget_indices(code_item)
+        if indices:
+            self.tab_bar.setCurrentIndex(indices[0])
+
+    def refresh_code_item(self, code_item):
+        """show the new contents of code_item, recomputed in place, in the tabs showing it"""
+        for index in self.widget_indices(code_item):
+            widget = self.code_splitter.widget(index)
+            if isinstance(widget, AstTreePane):
+                widget.cancel_build()
+                widget.make_tree_from(code_item.code)
+                widget.show_profile(code_item.transform_profile)
+            elif isinstance(widget, GeneratedCodePane):
+                widget.show_code_item(code_item)
+            else:
+                widget.setPlainText(code_item.code)
+
+    def add_widget(self, widget, tab_name):
+        self.tab_bar.addTab(tab_name)
         self.tab_bar.setCurrentIndex(self.tab_bar.count()-1)
 
         self.code_splitter.addWidget(widget)
@@ -229,6 +321,126 @@ class CodePane(QtGui.QGroupBox):
         self.code_splitter.setCollapsible(self.code_splitter.count()-1, True)
         self.set_panel_sizes()
 
+    def add_pending_pane(self, pane):
+        """a placeholder for a transform result that is still being computed"""
+        pane.progress_changed.connect(
+            lambda done, total, pane=pane: self.show_build_progress(pane, done, total, unit="nodes")
+        )
+        self.add_widget(pane, u"%s \u231B" % pane.tab_name)
+
+    def remove_pane(self, pane):
+        """take a pane out right away, unlike delete_at it does not touch the code items"""
+        index = self.code_splitter.indexOf(pane)
+        if index < 0:
+            return
+        self.tab_bar.removeTab(index)
+        pane.hide()
+        pane.setParent(None)
+        pane.deleteLater()
+        self.set_panel_sizes()
+
+    def widget_for(self, code_item):
+        for index in range(self.code_splitter.count()):
+            widget = self.code_splitter.widget(index)
+            if getattr(widget, 'code_item', None) is code_item:
+                return widget
+        return None
+
+    def parsed_tree_panes(self, file_item):
+        """the tree panes showing the parse of file_item, their positions refer to its text"""
+        panes = []
+        for index in range(self.code_splitter.count()):
+            widget = self.code_splitter.widget(index)
+            if isinstance(widget, AstTreePane) and widget.code_item.parent_item() is file_item:
+                panes.append(widget)
+        return panes
+
+    def editor_cursor_moved(self, editor):
+        """select the node under the cursor in the trees parsed from the editor's file"""
+        if self.syncing_cursor:
+            return
+        cursor = editor.textCursor()
+        line = cursor.blockNumber() + 1
+        column = cursor.positionInBlock()
+
+        self.syncing_cursor = True
+        try:
+            for pane in self.parsed_tree_panes(editor.code_item):
+                if pane.span_index is not None:
+                    pane.select_node(pane.span_index.node_at(line, column))
+        finally:
+            self.syncing_cursor = False
+
+    def generated_cursor_moved(self, pane):
+        """select the node that generated the code under the cursor in the tree it was generated from"""
+        source_map = pane.code_item.source_map
+        if self.syncing_cursor or source_map is None:
+            return
+        tree_item = pane.code_item.parent_item()
+        tree_pane = self.widget_for(tree_item)
+        if not isinstance(tree_pane, AstTreePane):
+            return
+        cursor = pane.editor.textCursor()
+        path = source_map.path_at(cursor.blockNumber() + 1, cursor.positionInBlock())
+        if path is None:
+            return
+        try:
+            node = node_at(tree_item.ast_tree, path)
+        except (AttributeError, IndexError):
+            return
+
+        self.syncing_cursor = True
+        try:
+            tree_pane.select_node(node)
+        finally:
+            self.syncing_cursor = False
+
+    def select_generated_code(self, pane, node):
+        """highlight what node generated in the code generated from the tree of pane"""
+        path = None
+        for index in range(self.code_splitter.count()):
+            widget = self.code_splitter.widget(index)
+            if not isinstance(widget, GeneratedCodePane) or widget.code_item.source_map is None:
+                continue
+            if widget.code_item.parent_item() is not pane.code_item:
+                continue
+            if path is None:
+                path = pane.code_item.node_path(node)
+                if path is None:
+                    return
+            span = widget.code_item.source_map.span_of(path)
+            if span is None:
+                continue
+            self.syncing_cursor = True
+            try:
+                widget.editor.select_span(span[0], span[1])
+            finally:
+                self.syncing_cursor = False
+
+    def tree_node_selected(self, pane, node):
+        """
+        select the source of node in the editor of the file the tree was parsed
+        from and what it generated in code generated from the tree
+        """
+        if self.syncing_cursor:
+            return
+        self.select_generated_code(pane, node)
+        if pane.span_index is None:
+            return
+        file_item = pane.code_item.parent_item()
+        if not isinstance(file_item, FileItem):
+            return
+        editor = self.widget_for(file_item)
+        span = pane.span_index.span_of(node)
+        if editor is None or span is None:
+            return
+
+        self.syncing_cursor = True
+        try:
+            editor.select_span(span[0], span[1])
+        finally:
+            self.syncing_cursor = False
+
     def resolve_transform_arguments(self, transform_thing):
         settings = QtCore.QSettings()
         group_name = "transforms/%s/parameters" % transform_thing.package_name
@@ -314,6 +526,12 @@ class CodePane(QtGui.QGroupBox):
         message_box.setText("Error:\n%s" % message)
         message_box.exec_()
 
+    @staticmethod
+    def show_message(message):
+        message_box = QtGui.QMessageBox()
+        message_box.setText(message)
+        message_box.exec_()
+
     def search_box_changed(self):
         if not self.search_box.text():
             return
@@ -0,0 +1,141 @@
+__author__ = 'Chick Markley'
+
+from PySide import QtGui, QtCore
+
+from ast_tool_box.views.editor_widget import EditorPane
+
+
+class GeneratedCodePane(QtGui.QSplitter):
+    """
+    the code of a GeneratedCodeItem with a table of how long each of its
+    files took to generate, the table is hidden when there are no timings.
+    after the item is regenerated the lines that changed since the run
+    before are marked and F8, shift F8 go to the next and previous change
+    """
+    changed_line_color = QtGui.QColor(220, 245, 220)
+    changed_token_color = QtGui.QColor(150, 225, 150)
+    removed_line_color = QtGui.QColor(245, 215, 215)
+
+    def __init__(self, code_item):
+        super(GeneratedCodePane, self).__init__(QtCore.Qt.Vertical)
+
+        top = QtGui.QWidget()
+        top_layout = QtGui.QVBoxLayout()
+        top_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.diff_bar = QtGui.QWidget()
+        diff_layout = QtGui.QHBoxLayout()
+        diff_layout.setContentsMargins(0, 0, 0, 0)
+        self.diff_label = QtGui.QLabel()
+        diff_layout.addWidget(self.diff_label)
+        diff_layout.addStretch(1)
+        previous_button = QtGui.QPushButton("Previous change")
+        previous_button.clicked.connect(self.previous_change)
+        diff_layout.addWidget(previous_button)
+        next_button = QtGui.QPushButton("Next change")
+        next_button.clicked.connect(self.next_change)
+        diff_layout.addWidget(next_button)
+        self.diff_bar.setLayout(diff_layout)
+        self.diff_bar.setVisible(False)
+        top_layout.addWidget(self.diff_bar)
+
+        self.editor = EditorPane()
+        top_layout.addWidget(self.editor)
+        top.setLayout(top_layout)
+        self.addWidget(top)
+
+        QtGui.QShortcut(QtGui.QKeySequence(QtCore.Qt.Key_F8), self, self.next_change)
+        QtGui.QShortcut(QtGui.QKeySequence(QtCore.Qt.SHIFT + QtCore.Qt.Key_F8), self, self.previous_change)
+
+        self.timings = QtGui.QTableWidget(0, 2)
+        self.timings.setHorizontalHeaderLabels(["File", "Generated in ms"])
+        self.timings.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+        self.timings.verticalHeader().setVisible(False)
+        self.addWidget(self.timings)
+        self.setStretchFactor(0, 4)
+        self.setStretchFactor(1, 1)
+
+        self.code_diff = None
+        self.show_code_item(code_item)
+
+    def setPlainText(self, text):
+        self.editor.setPlainText(text)
+
+    def show_code_item(self, code_item):
+        self.editor.setPlainText(code_item.code)
+        self.show_timings(code_item.file_timings)
+        self.show_diff(code_item.code_diff())
+
+    def show_timings(self, file_timings):
+        self.timings.setRowCount(len(file_timings))
+        for row, (file_name, seconds) in enumerate(file_timings):
+            self.timings.setItem(row, 0, QtGui.QTableWidgetItem(file_name or ""))
+            item = QtGui.QTableWidgetItem("" if seconds is None else "%.3f" % (seconds * 1000.0))
+            item.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+            self.timings.setItem(row, 1, item)
+        self.timings.resizeColumnsToContents()
+        self.timings.setVisible(bool(file_timings))
+
+    def show_diff(self, code_diff):
+        """mark the changes of code_diff, a CodeDiff of the text shown, None clears the marks"""
+        self.code_diff = code_diff
+        self.diff_bar.setVisible(code_diff is not None)
+        if code_diff is None:
+            self.editor.setExtraSelections([])
+            return
+
+        self.diff_label.setText(
+            "%d changes since the last run" % len(code_diff) if len(code_diff) else "No changes since the last run"
+        )
+        selections = []
+        for change in code_diff.changes:
+            if change.first_line == change.end_line:
+                # only removed lines, mark the line that followed them
+                line = min(change.first_line, max(code_diff.line_count, 1))
+                selections.append(self.line_selection(line, self.removed_line_color))
+            for line in change.lines():
+                selections.append(self.line_selection(line, self.changed_line_color))
+            for line, start, end in change.token_spans:
+                selections.append(self.span_selection(line, start, end, self.changed_token_color))
+        self.editor.setExtraSelections(selections)
+        if code_diff.changes:
+            self.go_to_change(code_diff.changes[0])
+
+    def line_selection(self, line, color):
+        selection = QtGui.QTextEdit.ExtraSelection()
+        selection.format.setBackground(color)
+        selection.format.setProperty(QtGui.QTextFormat.FullWidthSelection, True)
+        cursor = self.editor.textCursor()
+        cursor.setPosition(self.editor.position_of(line, 0))
+        selection.cursor = cursor
+        return selection
+
+    def span_selection(self, line, start, end, color):
+        selection = QtGui.QTextEdit.ExtraSelection()
+        selection.format.setBackground(color)
+        cursor = self.editor.textCursor()
+        cursor.setPosition(self.editor.position_of(line, start))
+        cursor.setPosition(self.editor.position_of(line, end), QtGui.QTextCursor.KeepAnchor)
+        selection.cursor = cursor
+        return selection
+
+    def current_line(self):
+        return self.editor.textCursor().blockNumber() + 1
+
+    def go_to_change(self, change):
+        cursor = self.editor.textCursor()
+        cursor.setPosition(self.editor.position_of(change.first_line, 0))
+        self.editor.setTextCursor(cursor)
+        self.editor.centerCursor()
+
+    def next_change(self):
+        if self.code_diff is not None:
+            change = self.code_diff.next_change(self.current_line())
+            if change is not None:
+                self.go_to_change(change)
+
+    def previous_change(self):
+        if self.code_diff is not None:
+            change = self.code_diff.previous_change(self.current_line())
+            if change is not None:
+                self.go_to_change(change)
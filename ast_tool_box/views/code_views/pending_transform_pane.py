@@ -0,0 +1,90 @@
+__author__ = 'Chick Markley'
+
+import time
+
+from PySide import QtGui, QtCore
+
+
+class PendingTransformPane(QtGui.QGroupBox):
+    """
+    stands in the code pane for the result of a transform that is still
+    running, shows a spinner, the elapsed time and, when the transform's
+    traversal is being counted, how many nodes it has visited. generated code
+    is previewed as its files arrive. the cancel button stops it and removes
+    the pane
+    """
+    cancel_requested = QtCore.Signal()
+    discarded = QtCore.Signal()
+    progress_changed = QtCore.Signal(int, int)
+
+    update_milliseconds = 100
+
+    def __init__(self, tab_name, message=None):
+        super(PendingTransformPane, self).__init__(tab_name)
+        self.tab_name = tab_name
+        self.code_item = None
+        self.progress = None
+        self.start_time = time.time()
+        self.preview = None
+
+        layout = QtGui.QVBoxLayout()
+        layout.addStretch(1)
+
+        self.message_label = QtGui.QLabel(message or "Running %s" % tab_name)
+        self.message_label.setAlignment(QtCore.Qt.AlignCenter)
+        layout.addWidget(self.message_label)
+
+        self.progress_bar = QtGui.QProgressBar()
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setTextVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        self.status_label = QtGui.QLabel()
+        self.status_label.setAlignment(QtCore.Qt.AlignCenter)
+        layout.addWidget(self.status_label)
+
+        self.cancel_button = QtGui.QPushButton("Cancel")
+        self.cancel_button.clicked.connect(lambda: self.cancel_requested.emit())
+        layout.addWidget(self.cancel_button, alignment=QtCore.Qt.AlignCenter)
+
+        layout.addStretch(1)
+        self.setLayout(layout)
+
+        self.update_timer = QtCore.QTimer(self)
+        self.update_timer.setInterval(self.update_milliseconds)
+        self.update_timer.timeout.connect(self.update_status)
+        self.update_timer.start()
+        self.update_status()
+
+    def watch(self, progress):
+        """progress is a VisitCounter updated by the thread running the transform"""
+        self.progress = progress
+        self.update_status()
+
+    def update_status(self):
+        status = "%.1f s" % (time.time() - self.start_time)
+        if self.progress is not None:
+            done, total = self.progress.count, self.progress.total
+            status += ", %d %s" % (done, self.progress.unit)
+            if total:
+                self.progress_bar.setRange(0, total)
+                # transforms may visit nodes they create, so count can pass total
+                self.progress_bar.setValue(min(done, total - 1))
+            self.progress_changed.emit(done, total)
+        self.status_label.setText(status)
+
+    def append_text(self, text):
+        """add text to the preview, shown from the first call on"""
+        if self.preview is None:
+            self.preview = QtGui.QPlainTextEdit()
+            self.preview.setReadOnly(True)
+            self.preview.setWordWrapMode(QtGui.QTextOption.NoWrap)
+            self.layout().insertWidget(0, self.preview, 1)
+        cursor = self.preview.textCursor()
+        cursor.movePosition(QtGui.QTextCursor.End)
+        cursor.insertText(text)
+
+    def cancel_build(self):
+        """called when the tab is closed, the transform is cancelled with it"""
+        self.update_timer.stop()
+        self.discarded.emit()
@@ -0,0 +1,68 @@
+__author__ = 'Chick Markley'
+
+from PySide import QtGui, QtCore
+
+
+class TransformProfileView(QtGui.QGroupBox):
+    """
+    the report of a TransformProfiler, one table row per visit_* method or
+    per node class, slowest exclusive time first. copy puts the json report
+    on the clipboard
+    """
+    columns = [
+        ('name', "Name"),
+        ('calls', "Calls"),
+        ('inclusive_seconds', "Inclusive ms"),
+        ('exclusive_seconds', "Exclusive ms"),
+        ('kept', "Kept"),
+        ('replaced', "Replaced"),
+        ('removed', "Removed"),
+        ('expanded', "Expanded"),
+        ('raised', "Raised"),
+    ]
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.report = profiler.report()
+        super(TransformProfileView, self).__init__(
+            "Profile of %s: %d nodes in %.1f ms" % (
+                self.report['transform'], self.report['nodes_visited'], self.report['total_seconds'] * 1000.0)
+        )
+
+        layout = QtGui.QVBoxLayout()
+        controls = QtGui.QHBoxLayout()
+        self.group_by = QtGui.QComboBox()
+        self.group_by.addItem("By visit method", 'methods')
+        self.group_by.addItem("By node class", 'node_classes')
+        self.group_by.currentIndexChanged.connect(lambda index: self.fill_table())
+        controls.addWidget(self.group_by)
+        controls.addStretch(1)
+        copy_button = QtGui.QPushButton("Copy JSON")
+        copy_button.clicked.connect(lambda: QtGui.QApplication.clipboard().setText(self.profiler.to_json()))
+        controls.addWidget(copy_button)
+        layout.addLayout(controls)
+
+        self.table = QtGui.QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels([label for _, label in self.columns])
+        self.table.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+        self.fill_table()
+
+    def fill_table(self):
+        rows = self.report[self.group_by.itemData(self.group_by.currentIndex())]
+        self.table.setRowCount(len(rows))
+        for row, entry in enumerate(rows):
+            for column, (key, _) in enumerate(self.columns):
+                value = entry[key]
+                if key.endswith('_seconds'):
+                    text = "%.3f" % (value * 1000.0)
+                else:
+                    text = str(value)
+                item = QtGui.QTableWidgetItem(text)
+                if column > 0:
+                    item.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        self.table.resizeColumnsToContents()
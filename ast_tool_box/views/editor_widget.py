@@ -42,6 +42,21 @@ class EditorPane(QtGui.QPlainTextEdit):
             self.parent_panel.undo_button.setEnabled(True)
         super(EditorPane, self).setPlainText(text)
 
+    def position_of(self, line, column):
+        """document position of a line (counted from 1) and column, clamped to the text"""
+        block = self.document().findBlockByNumber(line - 1)
+        if not block.isValid():
+            return self.document().characterCount() - 1
+        return block.position() + min(column, block.length() - 1)
+
+    def select_span(self, start, end):
+        """select from start to end, both (line, column) tuples"""
+        cursor = self.textCursor()
+        cursor.setPosition(self.position_of(*start))
+        cursor.setPosition(self.position_of(*end), QtGui.QTextCursor.KeepAnchor)
+        self.setTextCursor(cursor)
+        self.ensureCursorVisible()
+
 
 class EditorPanel(QtGui.QGroupBox):
     def __init__(self, transform_pane=None):
@@ -0,0 +1,53 @@
+__author__ = 'Chick Markley'
+
+import time
+
+from PySide import QtCore
+
+
+class TimeSlicedTask(QtCore.QObject):
+    """
+    runs a generator from the event loop a few milliseconds at a time so a
+    long job never holds the gui thread for more than a frame or two.
+    the generator does a bounded piece of work between yields and yields
+    (done, total) to report progress, total is 0 when it is not known
+    """
+    progress = QtCore.Signal(int, int)
+    finished = QtCore.Signal()
+
+    slice_milliseconds = 15
+
+    def __init__(self, work, parent=None):
+        super(TimeSlicedTask, self).__init__(parent)
+        self.work = work
+        self.running = False
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.run_slice)
+
+    def start(self):
+        self.running = True
+        self.timer.start()
+
+    def cancel(self):
+        """stop without finishing, finished is not emitted"""
+        self.timer.stop()
+        if self.running:
+            self.running = False
+            self.work.close()
+
+    def run_slice(self):
+        deadline = time.time() + self.slice_milliseconds / 1000.0
+        state = None
+        try:
+            while time.time() < deadline:
+                state = next(self.work)
+        except StopIteration:
+            self.timer.stop()
+            self.running = False
+            self.finished.emit()
+            return
+
+        if state is not None:
+            self.progress.emit(*state)
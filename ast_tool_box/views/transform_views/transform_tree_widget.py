@@ -27,7 +27,9 @@ class TransformTreeWidgetItem(QtGui.QTreeWidgetItem):
 
 class TransformTreeWidget(QtGui.QTreeWidget):
     """
-    displays an ast as a tree widget
+    displays an ast as a tree widget. a file or package whose transforms
+    have not been discovered yet gets a placeholder child saying what is
+    happening to it, expanding it asks the presenter to discover it
     """
     COL_NODE = 0
     COL_FIELD = 1
@@ -57,8 +59,10 @@ class TransformTreeWidget(QtGui.QTreeWidget):
             statusTip="Expand all descendant nodes",
             triggered=self.expand_descendants
         )
+        self.building = False
         self.itemClicked.connect(self.clicked)
         self.itemDoubleClicked.connect(self.double_clicked)
+        self.itemExpanded.connect(self.expanded)
 
     @QtCore.Slot(TransformTreeWidgetItem)
     def clicked(self, item):
@@ -78,6 +82,13 @@ class TransformTreeWidget(QtGui.QTreeWidget):
         else:
             self.transform_pane.show_error("Only works for Ast Transforms and Code Generators")
 
+    @QtCore.Slot(TransformTreeWidgetItem)
+    def expanded(self, item):
+        if self.building or item.parent() is not None:
+            return
+        if item.source is not None and not item.source.discovered:
+            self.transform_presenter.collection_expanded(item.source)
+
     def contextMenuEvent(self, event):
         menu = QtGui.QMenu(self)
         menu.addAction(self.expand_descendants_action)
@@ -116,29 +127,71 @@ class TransformTreeWidget(QtGui.QTreeWidget):
         for child_index in range(item.childCount()):
             self.collapse_descendants(item.child(child_index))
 
-    def rebuild(self, transform_file):
-        file_node = None
+    def file_node_for(self, transform_file):
         for index in range(self.topLevelItemCount()):
             wi = self.topLevelItem(index)
             if wi.source is transform_file:
-                file_node = wi
-                break
+                return wi
 
-        if not file_node:
-            print("Could not find %s" % transform_file)
+        print("Could not find %s" % transform_file)
+        return None
 
-        def remove_children(node):
-            for child_index in xrange(node.childCount()-1, -1, -1):
-                print("removing child %d from node %s" % (child_index, node))
-                remove_children(node.child(child_index))
-                node.takeChild(child_index)
+    @staticmethod
+    def remove_children(node):
+        for child_index in range(node.childCount()-1, -1, -1):
+            TransformTreeWidget.remove_children(node.child(child_index))
+            node.takeChild(child_index)
 
-        remove_children(file_node)
+    def rebuild(self, transform_file):
+        file_node = self.file_node_for(transform_file)
+        if not file_node:
+            return
+
+        self.remove_children(file_node)
+        file_node.setText(TransformTreeWidget.COL_NODE, self.file_node_text(transform_file))
         self.build_children(transform_file, file_node)
-        self.expandToDepth(100)
+        self.expand_discovered()
+
+    def show_pending(self, transform_file, message):
+        """put message, what is happening to the undiscovered transform_file, on its node"""
+        file_node = self.file_node_for(transform_file)
+        if not file_node:
+            return
+
+        self.remove_children(file_node)
+        file_node.setText(
+            TransformTreeWidget.COL_NODE, "%s  [%s]" % (self.file_node_text(transform_file), message)
+        )
+        self.build_placeholder(file_node, message)
+
+    @staticmethod
+    def build_placeholder(file_node, message):
+        placeholder = TransformTreeWidgetItem(file_node)
+        placeholder.setText(TransformTreeWidget.COL_NODE, message)
+        placeholder.setDisabled(True)
+
+    @staticmethod
+    def file_node_text(transform_file):
+        return "%s (%s)" % (transform_file.base_name, transform_file.package_name)
+
+    def expand_discovered(self):
+        """expand everything but the nodes of files and packages that have not been discovered"""
+        self.building = True
+        try:
+            self.expandToDepth(100)
+            for index in range(self.topLevelItemCount()):
+                file_node = self.topLevelItem(index)
+                if file_node.source is not None and not file_node.source.discovered:
+                    file_node.setExpanded(False)
+        finally:
+            self.building = False
 
     def build_children(self, transform_file, file_node):
         first_node = None
+        if not transform_file.discovered:
+            self.build_placeholder(file_node, "expand to load transforms")
+            return first_node
+
         if len(transform_file.node_transforms) > 0:
             transforms_node = TransformTreeWidgetItem(file_node)
             transforms_node.setText(
@@ -175,6 +228,11 @@ class TransformTreeWidget(QtGui.QTreeWidget):
                 code_generator_node.setText(TransformTreeWidget.COL_NODE, code_generator.name())
                 code_generator_node.setToolTip(TransformTreeWidget.COL_NODE, code_generator.doc)
 
+        if not transform_file.node_transforms and not transform_file.code_generators:
+            self.build_placeholder(
+                file_node, "failed to load" if transform_file.load_error_info else "no transforms found"
+            )
+
         return first_node
 
 
@@ -184,16 +242,13 @@ class TransformTreeWidget(QtGui.QTreeWidget):
         first_node = None
         for transform_file in transform_files:
             file_node = TransformTreeWidgetItem(self, name=transform_file.base_name, source=transform_file)
-            file_node.setText(
-                TransformTreeWidget.COL_NODE,
-                "%s (%s)" % (transform_file.base_name, transform_file.package_name)
-            )
+            file_node.setText(TransformTreeWidget.COL_NODE, self.file_node_text(transform_file))
             file_node.setToolTip(TransformTreeWidget.COL_NODE, transform_file.path)
             node = self.build_children(transform_file, file_node)
             if not first_node:
                 first_node = node
 
-        self.expandToDepth(100)
+        self.expand_discovered()
         if first_node:
             self.setCurrentItem(first_node)
             self.transform_pane.load_editor_from(self.currentItem())
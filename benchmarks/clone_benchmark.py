@@ -0,0 +1,71 @@
+"""
+compares ast_tool_box.models.ast_cloner.clone_tree with copy.deepcopy on
+small, medium and very large python trees, and on ctree trees when ctree
+is installed
+
+    python benchmarks/clone_benchmark.py [repeat]
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+import copy
+import sys
+import timeit
+
+from ast_tool_box.models.ast_cloner import clone_tree
+
+
+def make_source(function_count):
+    return "\n".join(
+        "def function_%d(x, y=%d):\n"
+        "    for index in range(len(x)):\n"
+        "        y = exp(x[index]) * y + %d\n"
+        "    return [value * 2 for value in x if value > y]\n" % (number, number, number)
+        for number in range(function_count)
+    )
+
+
+def node_count(tree):
+    return sum(1 for _ in ast.walk(tree))
+
+
+def ctree_trees():
+    """ctree versions of the python trees, skipped when ctree is not importable"""
+    try:
+        from ctree.transformations import PyBasicConversions
+    except ImportError:
+        return []
+    return [
+        ("ctree %s" % name, PyBasicConversions().visit(tree))
+        for name, tree in python_trees()[:2]
+    ]
+
+
+def python_trees():
+    return [
+        ("small", ast.parse(make_source(1))),
+        ("medium", ast.parse(make_source(100))),
+        ("very large", ast.parse(make_source(5000))),
+    ]
+
+
+def main(repeat=3):
+    # deepcopy recurses once per tree level, the cloner does not
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10000))
+
+    print("%-18s %9s %12s %12s %8s" % ("tree", "nodes", "deepcopy ms", "clone ms", "speedup"))
+    for name, tree in python_trees() + ctree_trees():
+        assert ast.dump(clone_tree(tree), include_attributes=True) == \
+            ast.dump(copy.deepcopy(tree), include_attributes=True)
+
+        number = max(1, 20000 // node_count(tree))
+        deepcopy_time = min(timeit.repeat(lambda: copy.deepcopy(tree), number=number, repeat=repeat)) / number
+        clone_time = min(timeit.repeat(lambda: clone_tree(tree), number=number, repeat=repeat)) / number
+        print("%-18s %9d %12.3f %12.3f %7.1fx" % (
+            name, node_count(tree), deepcopy_time * 1000, clone_time * 1000, deepcopy_time / clone_time))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])
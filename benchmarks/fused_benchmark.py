@@ -0,0 +1,72 @@
+"""
+compares a chain of small local transforms run as one pass each, with a
+clone of the tree before every pass as the gui makes, against the same chain
+fused into one walk over one clone
+
+    python benchmarks/fused_benchmark.py [repeat]
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+import os
+import sys
+import timeit
+
+from ast_tool_box.models.ast_cloner import clone_tree
+from ast_tool_box.models.fused_transform import fuse_passes, run_passes
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from clone_benchmark import make_source, node_count
+
+
+def rename_transform(old_name, new_name):
+    def visit_Name(self, node):
+        self.generic_visit(node)
+        if node.id == old_name:
+            node.id = new_name
+        return node
+    return type('Rename_%s_%s' % (old_name, new_name), (ast.NodeTransformer,), {'visit_Name': visit_Name})
+
+
+class SwapMultOperands(ast.NodeTransformer):
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Mult):
+            node.left, node.right = node.right, node.left
+        return node
+
+
+def chain():
+    names = ['x', 'a', 'b', 'c', 'd', 'e', 'f', 'g']
+    transforms = [rename_transform(old, new) for old, new in zip(names, names[1:])]
+    return [transform() for transform in transforms] + [SwapMultOperands(), SwapMultOperands()]
+
+
+def sequential(tree):
+    for transformer in chain():
+        tree = transformer.visit(clone_tree(tree))
+    return tree
+
+
+def fused(tree):
+    return run_passes(clone_tree(tree), chain())
+
+
+def main(repeat=3):
+    print("%-12s %9s %7s %14s %10s %8s" % ("tree", "nodes", "walks", "sequential ms", "fused ms", "speedup"))
+    for name, function_count in [("small", 1), ("medium", 100), ("very large", 5000)]:
+        tree = ast.parse(make_source(function_count))
+        assert ast.dump(sequential(tree)) == ast.dump(fused(tree))
+
+        number = max(1, 20000 // node_count(tree))
+        sequential_time = min(timeit.repeat(lambda: sequential(tree), number=number, repeat=repeat)) / number
+        fused_time = min(timeit.repeat(lambda: fused(tree), number=number, repeat=repeat)) / number
+        print("%-12s %9d %7d %14.3f %10.3f %7.1fx" % (
+            name, node_count(tree), len(fuse_passes(chain())),
+            sequential_time * 1000, fused_time * 1000, sequential_time / fused_time))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])
@@ -0,0 +1,115 @@
+"""
+compares code generation of mixed trees, ctree functions holding python
+statements, with the lazy NonCtreeNodeConverter against converting every
+node up front as it used to. reports time and peak memory of converting
+alone and of converting plus codegen. needs ctree
+
+    python benchmarks/non_ctree_benchmark.py [repeat]
+"""
+from __future__ import print_function
+
+__author__ = 'Chick Markley'
+
+import ast
+import os
+import sys
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from ctree.c.nodes import CFile, FunctionDecl, SymbolRef, Constant, Assign, Return
+from ctree.nodes import CtreeNode
+
+from ast_tool_box.models.ast_cloner import clone_tree
+from ast_tool_box.transformers.NonCtreeNodeConverter import NonCtreeNodeConverter, NonCtreeNode
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from clone_benchmark import make_source, node_count
+
+
+class EagerNonCtreeNode(NonCtreeNode):
+    """the wrapper as it was, every field copied onto it"""
+    def __init__(self, node=CtreeNode()):
+        self._fields = tuple(node._fields) + ('string',)
+        self.string = '// ' + type(node).__name__ + '\n'
+        for field, value in ast.iter_fields(node):
+            setattr(self, field, value)
+
+
+class EagerNonCtreeNodeConverter(ast.NodeTransformer):
+    """the converter as it was, every foreign node of the tree wrapped before codegen"""
+    def generic_visit(self, node):
+        if not isinstance(node, CtreeNode):
+            ast.NodeTransformer.generic_visit(self, node)
+            return EagerNonCtreeNode(node)
+        return ast.NodeTransformer.generic_visit(self, node)
+
+
+def make_mixed_tree(function_count):
+    python_functions = ast.parse(make_source(function_count)).body
+    return CFile("mixed", [
+        FunctionDecl(None, "c_function_%d" % number, params=[], defn=[
+            Assign(SymbolRef("y"), Constant(number)),
+            python_function,
+            Return(SymbolRef("y")),
+        ])
+        for number, python_function in enumerate(python_functions)
+    ])
+
+
+def convert(converter_class, tree):
+    return converter_class().visit(tree)
+
+
+def generate(converter_class, tree):
+    return convert(converter_class, tree).codegen()
+
+
+def seconds(function, tree, number, repeat):
+    """best time of function on a fresh copy of tree, copying is not timed"""
+    times = []
+    for _ in range(repeat):
+        copies = [clone_tree(tree) for _ in range(number)]
+        start = timeit.default_timer()
+        for copy in copies:
+            function(copy)
+        times.append((timeit.default_timer() - start) / number)
+    return min(times)
+
+
+def peak_kilobytes(function, tree):
+    """most memory function allocated at once on a copy of tree, the copy does not count"""
+    if tracemalloc is None:
+        return float('nan')
+    copy = clone_tree(tree)
+    tracemalloc.start()
+    try:
+        function(copy)
+        return tracemalloc.get_traced_memory()[1] / 1024.0
+    finally:
+        tracemalloc.stop()
+
+
+def main(repeat=3):
+    print("%-12s %8s %-9s %12s %12s %15s %15s" % (
+        "tree", "nodes", "converter", "convert ms", "convert kb", "+codegen ms", "+codegen kb"))
+    for name, function_count in [("small", 1), ("medium", 100), ("large", 1000)]:
+        tree = make_mixed_tree(function_count)
+        assert generate(EagerNonCtreeNodeConverter, clone_tree(tree)) == \
+            generate(NonCtreeNodeConverter, clone_tree(tree))
+
+        number = max(1, 20000 // node_count(tree))
+        for label, converter_class in [("eager", EagerNonCtreeNodeConverter), ("lazy", NonCtreeNodeConverter)]:
+            run_convert = lambda copy: convert(converter_class, copy)
+            run_generate = lambda copy: generate(converter_class, copy)
+            print("%-12s %8d %-9s %12.3f %12.1f %15.3f %15.1f" % (
+                name, node_count(tree), label,
+                seconds(run_convert, tree, number, repeat) * 1000, peak_kilobytes(run_convert, tree),
+                seconds(run_generate, tree, number, repeat) * 1000, peak_kilobytes(run_generate, tree)))
+
+
+if __name__ == '__main__':
+    main(*[int(argument) for argument in sys.argv[1:2]])
@@ -0,0 +1,50 @@
+import unittest
+import ast
+import copy
+import types
+
+from nose.tools import assert_equal, assert_true, assert_is
+
+from ast_tool_box.models.ast_cloner import clone_tree
+
+source = """def square_it(x):
+    y = exp(x) + 1
+    return [y * value for value in range(x)]
+
+z = square_it(3)
+"""
+
+
+class TestAstCloner(unittest.TestCase):
+    def test_clone_matches_deepcopy(self):
+        tree = ast.parse(source)
+        tree_clone = clone_tree(tree)
+
+        assert_equal(
+            ast.dump(tree_clone, include_attributes=True),
+            ast.dump(copy.deepcopy(tree), include_attributes=True)
+        )
+        for node, node_clone in zip(ast.walk(tree), ast.walk(tree_clone)):
+            assert_true(node is not node_clone)
+
+    def test_sharing_cycles_and_bound_methods(self):
+        name = ast.Name(id='x', ctx=ast.Load())
+        expression = ast.BinOp(left=name, op=ast.Add(), right=name)
+        name.parent = expression
+        name.codegen = types.MethodType(lambda self: self.id, name)
+
+        memo = {}
+        expression_clone = clone_tree(expression, memo)
+
+        assert_is(expression_clone.left, expression_clone.right)
+        assert_is(expression_clone.left.parent, expression_clone)
+        assert_is(memo[id(name)], expression_clone.left)
+        assert_is(expression_clone.left.codegen.__self__, expression_clone.left)
+
+    def test_deep_trees(self):
+        tree = ast.Name(id='x', ctx=ast.Load())
+        for _ in range(5000):
+            tree = ast.BinOp(left=tree, op=ast.Add(), right=ast.Num(n=1))
+        tree_clone = clone_tree(tree)
+
+        assert_equal(sum(1 for _ in ast.walk(tree_clone)), sum(1 for _ in ast.walk(tree)))
@@ -0,0 +1,57 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_raises, assert_is_none, assert_true
+
+from ast_tool_box.models.ast_query import compile_query, find_all, find, AstQueryError
+
+source = """
+for i in range(10):
+    y = exp(i) + log(i)
+    z = exp(2)
+
+
+def f(x):
+    return exp(x)
+"""
+
+
+def names(nodes):
+    return [(type(node).__name__, node.lineno) for node in nodes]
+
+
+class TestAstQuery(unittest.TestCase):
+    def setUp(self):
+        self.tree = ast.parse(source)
+
+    def test_descendant(self):
+        nodes = find_all("For Call[func=Name[id=exp]]", self.tree)
+
+        assert_equal(names(nodes), [("Call", 3), ("Call", 4)])
+
+    def test_child(self):
+        assert_equal(names(find_all("FunctionDef > Return", self.tree)), [("Return", 8)])
+        assert_equal(find_all("Module > Return", self.tree), [])
+
+    def test_union_and_base_classes(self):
+        nodes = find_all("FunctionDef, For", self.tree)
+
+        assert_equal(names(nodes), [("For", 2), ("FunctionDef", 7)])
+        assert_equal(len(find_all("stmt", self.tree)), 5)
+
+    def test_field_paths_and_operators(self):
+        assert_equal(names(find_all("Call[func.id=log]", self.tree)), [("Call", 3)])
+        assert_equal(names(find_all("Name[id^=ex]", self.tree)), [("Name", 3), ("Name", 4), ("Name", 8)])
+        assert_equal(names(find_all("FunctionDef[name='f']", self.tree)), [("FunctionDef", 7)])
+
+    def test_find(self):
+        assert_equal(find("Return", self.tree).lineno, 8)
+        assert_is_none(find("While", self.tree))
+
+    def test_compiled_once(self):
+        assert_true(compile_query("For Call") is compile_query("For Call"))
+
+    def test_syntax_errors(self):
+        assert_raises(AstQueryError, compile_query, "Call[")
+        assert_raises(AstQueryError, compile_query, "Call[id~=3]")
+        assert_raises(AstQueryError, compile_query, "> Call")
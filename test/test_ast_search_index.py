@@ -0,0 +1,59 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_true, assert_is_none
+
+from ast_tool_box.models.code_models.ast_search_index import AstSearchIndex
+from ast_tool_box.models.code_models.ast_tree_rows import walk_rows
+
+source = """
+def square_it(x):
+    return exp(x) * x
+
+
+def cube_it(y):
+    return y * y * y
+"""
+
+
+class TestAstSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tree = ast.parse(source)
+        self.index = AstSearchIndex(self.tree, "sample.py")
+        self.specs = dict((path, spec) for path, spec, _ in walk_rows(self.tree, "sample.py"))
+
+    def test_every_row_is_indexed(self):
+        assert_equal(len(self.index), len(self.specs))
+
+    def test_query_ignores_case(self):
+        paths = self.index.query("functiondef")
+
+        assert_equal(len(paths), 2)
+        assert_equal([self.specs[path].value.name for path in paths], ["square_it", "cube_it"])
+
+    def test_identifier_reported_once_per_node(self):
+        paths = self.index.query("exp")
+
+        assert_equal(len(paths), 1)
+        assert_true(isinstance(self.specs[paths[0]].value, ast.Name))
+
+    def test_no_match(self):
+        assert_equal(self.index.query("while"), [])
+        assert_equal(self.index.query(""), [])
+
+    def test_path_for_node(self):
+        function_def = self.tree.body[1]
+        path = self.index.path_for_node(function_def)
+
+        assert_true(self.specs[path].value is function_def)
+        assert_is_none(self.index.path_for_node(ast.Pass()))
+
+    def test_text_that_grows_when_lower_cased(self):
+        # u'İ'.lower() is two characters long
+        tree = ast.parse(u'x = "İİİİ"\ny = zeta\nw = 1\n')
+        index = AstSearchIndex(tree, "sample.py")
+        specs = dict((path, spec) for path, spec, _ in walk_rows(tree, "sample.py"))
+
+        paths = index.query("zeta")
+        assert_equal(len(paths), 1)
+        assert_equal(specs[paths[0]].value.id, "zeta")
@@ -0,0 +1,60 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_true, assert_is_none
+
+from ast_tool_box.models.code_models.ast_span_index import AstSpanIndex
+
+source = """def square_it(x):
+    y = exp(x) + 1
+    return y
+
+z = square_it(3)
+"""
+
+
+def strip_end_positions(tree):
+    for node in ast.walk(tree):
+        if hasattr(node, 'end_lineno'):
+            node.end_lineno = None
+            node.end_col_offset = None
+    return tree
+
+
+class TestAstSpanIndex(unittest.TestCase):
+    def test_node_at(self):
+        for tree in (ast.parse(source), strip_end_positions(ast.parse(source))):
+            index = AstSpanIndex(tree)
+
+            assert_true(isinstance(index.node_at(1, 0), ast.FunctionDef))
+            node = index.node_at(2, 8)
+            assert_true(isinstance(node, ast.Name))
+            assert_equal(node.id, "exp")
+            assert_equal(index.node_at(3, 11).id, "y")
+            assert_equal(index.node_at(5, 4).id, "square_it")
+
+    def test_nothing_before_first_node(self):
+        index = AstSpanIndex(ast.parse("\n\nx = 1\n"))
+
+        assert_is_none(index.node_at(1, 0))
+
+    def test_span_of(self):
+        tree = strip_end_positions(ast.parse(source))
+        index = AstSpanIndex(tree)
+        function_def = tree.body[0]
+        assign = tree.body[1]
+
+        assert_equal(index.span_of(function_def), ((1, 0), (5, 0)))
+        start, end = index.span_of(assign)
+        assert_equal(start, (5, 0))
+        assert_is_none(index.span_of(ast.Pass()))
+
+    def test_spans_nest(self):
+        tree = strip_end_positions(ast.parse(source))
+        index = AstSpanIndex(tree)
+        function_start, function_end = index.span_of(tree.body[0])
+
+        for node in ast.walk(tree.body[0]):
+            span = index.span_of(node)
+            if span:
+                assert_true(function_start <= span[0] and span[1] <= function_end)
@@ -0,0 +1,34 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_true
+
+from ast_tool_box.models.code_models.ast_tree_rows import child_specs, row_label, walk_rows
+
+
+class TestAstTreeRows(unittest.TestCase):
+    def test_lists_are_flattened(self):
+        tree = ast.parse("a = 1\nb = 2\n")
+        specs = child_specs(tree)
+
+        assert_equal([spec.label for spec in specs], ["body[0]", "body[1]"])
+        assert_equal([spec.list_path for spec in specs], [(0,), (1,)])
+        assert_equal(specs[1].field_name, "body")
+
+    def test_labels(self):
+        tree = ast.parse("a = 1\n")
+        assign = tree.body[0]
+
+        assert_equal(row_label("body[0]", assign), "body[0] = Assign (1:0)")
+        assert_equal(row_label("id", "a"), "id: 'a'")
+
+    def test_walk_rows_paths_match_children(self):
+        tree = ast.parse("def square_it(x):\n    return x * x\n")
+        rows = list(walk_rows(tree, "sample.py"))
+
+        assert_true(rows[0][1].value is tree)
+        assert_equal(rows[0][2], -1)
+        for path, spec, parent_position in rows[1:]:
+            parent_path, parent_spec, _ = rows[parent_position]
+            assert_equal(parent_path, path[:-1])
+            assert_equal(child_specs(parent_spec.value)[path[-1]], spec)
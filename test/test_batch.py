@@ -0,0 +1,49 @@
+import unittest
+import os
+import tempfile
+import shutil
+
+from nose.tools import assert_equal, assert_raises, assert_true
+
+from ast_tool_box.batch import parse_stage, expand_sources, output_name, StageError, run_batch
+
+
+class TestBatch(unittest.TestCase):
+    def test_parse_stage(self):
+        assert_equal(parse_stage("ctree.c.codegen.CCodeGen"), ("ctree.c.codegen.CCodeGen", [], {}))
+        assert_equal(
+            parse_stage("my.module.Lower(4, 'x', depth=2)"),
+            ("my.module.Lower", [4, 'x'], {'depth': 2})
+        )
+        assert_raises(StageError, parse_stage, "Lower")
+        assert_raises(StageError, parse_stage, "my.module.Lower(x)")
+        assert_raises(StageError, parse_stage, "my.module.Lower(")
+
+    def test_sources_and_output_names(self):
+        directory = tempfile.mkdtemp()
+        try:
+            for name in ('b.py', 'a.py', 'notes.txt'):
+                open(os.path.join(directory, name), 'w').close()
+            pattern = os.path.join(directory, '*.py')
+            file_names = expand_sources([pattern, os.path.join(directory, 'a.py')])
+
+            assert_equal([os.path.basename(name) for name in file_names], ['a.py', 'b.py'])
+            assert_equal(
+                output_name(os.path.join(directory, 'sub', 'a.py'), directory, 'out', '.c'),
+                os.path.join('out', 'sub', 'a.c')
+            )
+        finally:
+            shutil.rmtree(directory)
+
+    def test_failures_are_reported(self):
+        directory = tempfile.mkdtemp()
+        try:
+            file_name = os.path.join(directory, 'broken.py')
+            with open(file_name, 'w') as source_file:
+                source_file.write("x = (\n")
+
+            summary = run_batch([file_name], ["ast.NodeTransformer"], os.path.join(directory, 'out'), processes=1)
+            assert_equal(summary['failed'], 1)
+            assert_true('SyntaxError' in summary['files'][0]['error'])
+        finally:
+            shutil.rmtree(directory)
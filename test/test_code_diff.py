@@ -0,0 +1,39 @@
+import unittest
+import random
+
+from nose.tools import assert_equal
+
+from ast_tool_box.models.code_diff import CodeDiff, diff_lines
+
+
+class TestCodeDiff(unittest.TestCase):
+    def test_opcodes_rebuild_new_lines(self):
+        randomizer = random.Random(7)
+        for _ in range(500):
+            old = [randomizer.choice("abcdef") for _ in range(randomizer.randint(0, 25))]
+            new = list(old)
+            for _ in range(randomizer.randint(0, 5)):
+                position = randomizer.randint(0, len(new))
+                if randomizer.random() < 0.5 and new:
+                    del new[min(position, len(new) - 1)]
+                else:
+                    new.insert(position, randomizer.choice("abcxyz"))
+
+            rebuilt = []
+            for tag, i1, i2, j1, j2 in diff_lines(old, new):
+                rebuilt.extend(old[i1:i2] if tag == 'equal' else new[j1:j2])
+            assert_equal(rebuilt, new)
+
+    def test_changes_and_navigation(self):
+        old = "int a;\nint b = 1;\nint c;\nint d;\nint e;\n"
+        new = "int a;\nint b = 2;\nint c;\nint e;\nint f;\n"
+
+        code_diff = CodeDiff(old, new)
+
+        assert_equal([(change.first_line, change.end_line, change.removed) for change in code_diff.changes],
+                     [(2, 3, 1), (4, 4, 1), (5, 6, 0)])
+        assert_equal(code_diff.changes[0].token_spans, [(2, 8, 9)])
+        assert_equal(code_diff.next_change(2).first_line, 4)
+        assert_equal(code_diff.next_change(5).first_line, 2)
+        assert_equal(code_diff.previous_change(2).first_line, 5)
+        assert_equal(len(CodeDiff(old, old)), 0)
@@ -0,0 +1,43 @@
+import unittest
+import os
+import tempfile
+import shutil
+
+from nose.tools import assert_equal, assert_raises
+
+from ast_tool_box.models.code_export import (
+    export_files, export_path, write_if_changed, ExportError, WRITTEN, UNCHANGED
+)
+
+
+class TestCodeExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_unchanged_files_are_not_rewritten(self):
+        path = os.path.join(self.directory, 'sub', 'a.c')
+
+        assert_equal(write_if_changed(path, "int a;\n"), WRITTEN)
+        os.utime(path, (1000, 1000))
+        assert_equal(write_if_changed(path, "int a;\n"), UNCHANGED)
+        assert_equal(os.path.getmtime(path), 1000)
+        assert_equal(write_if_changed(path, "int b;\n"), WRITTEN)
+        with open(path) as code_file:
+            assert_equal(code_file.read(), "int b;\n")
+        assert_equal(os.listdir(os.path.dirname(path)), ['a.c'])
+
+    def test_export_files(self):
+        files = [('a.c', "int a;\n"), ('kernels/b.cl', "int b;\n"), ('c.c', "int c;\n")]
+        export_files(self.directory, files[:1])
+
+        results = export_files(self.directory, files, threads=2)
+
+        assert_equal(
+            results,
+            [(os.path.join(self.directory, name), status) for (name, _), status in zip(files, [UNCHANGED, WRITTEN, WRITTEN])]
+        )
+        assert_raises(ExportError, export_path, self.directory, '../outside.c')
+        assert_raises(ExportError, export_files, self.directory, [('a.c', ''), ('./a.c', '')])
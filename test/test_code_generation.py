@@ -0,0 +1,51 @@
+import unittest
+import multiprocessing
+
+from nose.tools import assert_equal, assert_true
+
+from ast_tool_box.models.code_generation import CodegenPool, GeneratedChunk, generate_file
+
+
+class FakeCodeFile(object):
+    """what generate_file uses of a ctree CFile"""
+    def __init__(self, name):
+        self.name = name
+
+    def codegen(self):
+        return "int %s;\n" % self.name
+
+    def get_filename(self):
+        return "%s.c" % self.name
+
+
+class TestCodeGeneration(unittest.TestCase):
+    def test_generate_file_is_timed(self):
+        chunk = generate_file(FakeCodeFile('a'))
+
+        assert_equal(chunk[:3], ('a', 'a.c', "int a;\n"))
+        assert_true(chunk.seconds >= 0.0)
+        assert_equal(GeneratedChunk('a', 'a.c', "").seconds, None)
+
+    def test_files_generated_in_a_pool_keep_their_order(self):
+        files = [FakeCodeFile(name) for name in "abcdefgh"]
+        pool = multiprocessing.Pool(2)
+        try:
+            chunks = list(pool.imap(generate_file, files))
+        finally:
+            pool.terminate()
+            pool.join()
+
+        assert_equal([chunk.file_name for chunk in chunks], [code_file.get_filename() for code_file in files])
+        assert_equal(chunks[3].display_text(), "File d\nint d;\n")
+
+    def test_codegen_pool_is_kept_between_uses(self):
+        codegen_pool = CodegenPool()
+        try:
+            pool = codegen_pool.get(2)
+            assert_true(codegen_pool.get(2) is pool)
+            chunks = list(pool.imap(generate_file, [FakeCodeFile(name) for name in "abc"]))
+            assert_equal([chunk.name for chunk in chunks], ['a', 'b', 'c'])
+            assert_true(codegen_pool.get(1) is not pool)
+        finally:
+            codegen_pool.close()
+        assert_true(codegen_pool.pool is None)
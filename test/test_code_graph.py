@@ -0,0 +1,67 @@
+import unittest
+
+from nose.tools import assert_equal, assert_true, assert_false
+
+from ast_tool_box.models.code_models.code_graph import CodeGraph
+
+
+class Item(object):
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+
+    def parent_item(self):
+        return self.parent
+
+    def __repr__(self):
+        return self.name
+
+
+class TestCodeGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = CodeGraph()
+        self.root = self.graph.add(Item('root'))
+        self.left = self.graph.add(Item('left', self.root))
+        self.right = self.graph.add(Item('right', self.root))
+        self.left_child = self.graph.add(Item('left_child', self.left))
+
+    def test_indexes(self):
+        graph = self.graph
+        assert_equal(len(graph), 4)
+        assert_equal(graph.item_at(1), self.left)
+        assert_equal(graph.last(), self.left_child)
+        assert_equal(graph.parent(self.left_child), self.left)
+        assert_equal(graph.children_of(self.root), [self.left, self.right])
+        assert_equal(graph.ancestors(self.left_child), [self.root, self.left])
+        assert_equal(graph.roots(), [self.root])
+        assert_equal(graph.closure([self.left_child, self.root]), [self.root, self.left, self.right, self.left_child])
+        assert_equal(graph.descendants(self.left), [self.left_child])
+
+    def test_removing_a_middle_item(self):
+        graph = self.graph
+        orphans = graph.remove(self.left)
+
+        assert_equal(orphans, [self.left_child])
+        assert_false(self.left in graph)
+        assert_equal(graph.parent(self.left_child), None)
+        assert_equal(graph.roots(), [self.root, self.left_child])
+        assert_equal(graph.children_of(self.root), [self.right])
+        assert_equal(list(graph), [self.root, self.right, self.left_child])
+        assert_equal(graph.item_at(1), self.right)
+
+    def test_many_branches(self):
+        graph = CodeGraph()
+        root = graph.add(Item('root'))
+        leaves = []
+        for branch in range(300):
+            item = graph.add(Item('branch %d' % branch, root))
+            leaves.append(graph.add(Item('leaf %d' % branch, item)))
+        graph.add(Item('outside', Item('not in graph')))
+
+        assert_equal(len(graph), 602)
+        assert_equal(len(graph.descendants(root)), 600)
+        assert_true(graph.index_of(leaves[-1]) < len(graph) - 1)
+        for leaf in leaves[::2]:
+            graph.remove(leaf)
+        assert_equal(len(graph.descendants(root)), 450)
+        assert_equal(len(graph.roots()), 2)
@@ -0,0 +1,76 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_true, assert_false
+
+from ast_tool_box.models.code_models.code_model import AstTreeItem, CodeTransformLink, GeneratedCodeItem
+from ast_tool_box.models.transform_models.transform_file import AstTransformItem
+from ast_tool_box.models.tree_hash import TreeHasher
+
+
+class UpperNames(ast.NodeTransformer):
+    def visit_Name(self, node):
+        node.id = node.id.upper()
+        return node
+
+
+class TestCodeLineage(unittest.TestCase):
+    def derive(self, code_item, tree, argument_values=None):
+        transform_item = AstTransformItem(UpperNames)
+        return AstTreeItem(tree, parent_link=CodeTransformLink(code_item, transform_item, argument_values))
+
+    def test_lineage_runs_from_the_original_item(self):
+        original = AstTreeItem(ast.parse("a = b"))
+        first = self.derive(original, ast.parse("A = B"), [1])
+        second = self.derive(first, ast.parse("A = B"))
+
+        links = second.lineage()
+        assert_equal([link.code_item for link in links], [original, first])
+        assert_equal(links[0].argument_values, [1])
+        assert_equal(original.lineage(), [])
+
+    def test_take_result_of_keeps_identity(self):
+        original = AstTreeItem(ast.parse("a = b"))
+        derived = self.derive(original, ast.parse("a = b"))
+        old_hash = derived.result_hash()
+
+        recomputed = self.derive(original, ast.parse("A = B"))
+        derived.take_result_of(recomputed)
+
+        assert_true(derived.ast_tree is recomputed.ast_tree)
+        assert_true(derived.parent_code_item is recomputed.parent_code_item)
+        assert_false(derived.result_hash() == old_hash)
+
+    def test_generated_code_hashes_its_text(self):
+        original = AstTreeItem(ast.parse("a = b"))
+        link = CodeTransformLink(original, None)
+        assert_equal(
+            GeneratedCodeItem("int a;", parent_link=link).result_hash(),
+            GeneratedCodeItem("int a;", parent_link=link).result_hash()
+        )
+
+    def test_shared_trees_are_cloned_before_they_change(self):
+        tree = ast.parse("a = b")
+        first = AstTreeItem(tree)
+        second = AstTreeItem(tree)
+        second.shared_tree = True
+        old_hash = second.tree_hash()
+
+        owned = second.own_tree()
+        owned.body[0].targets[0].id = 'c'
+        assert_false(owned is tree)
+        assert_true(first.ast_tree is tree)
+        assert_equal(tree.body[0].targets[0].id, 'a')
+        assert_false(second.tree_hash() == old_hash)
+        assert_true(second.own_tree() is owned)
+
+    def test_hash_base_is_let_go_once_hashed(self):
+        original = AstTreeItem(ast.parse("a = b\nc = d"))
+        original.tree_hasher()
+        tree = ast.parse("")
+        tree.body = original.ast_tree.body[:1]
+        derived = self.derive(original, tree)
+        derived.hash_base = original
+
+        assert_equal(len(derived.tree_hasher()), len(TreeHasher(derived.ast_tree)))
+        assert_true(derived.hash_base is None)
@@ -0,0 +1,57 @@
+import unittest
+import ast
+import copy
+
+from nose.tools import assert_equal, assert_true, assert_is
+
+from ast_tool_box.models.copy_on_write import CopyOnWriteTransform
+
+source = """def square_it(x):
+    y = exp(x) + 1
+    return y
+
+def cube_it(x):
+    return x * x * x
+"""
+
+
+class RenameExp(ast.NodeTransformer):
+    def visit_Name(self, node):
+        if node.id == 'exp':
+            node.id = 'expf'
+        return node
+
+
+class DropReturns(ast.NodeTransformer):
+    def visit_Return(self, node):
+        return None
+
+
+class TestCopyOnWrite(unittest.TestCase):
+    def test_input_tree_is_not_changed(self):
+        tree = ast.parse(source)
+        before = ast.dump(tree)
+
+        for transformer_class in (RenameExp, DropReturns):
+            expected = ast.dump(transformer_class().visit(copy.deepcopy(tree)))
+            new_tree = CopyOnWriteTransform(transformer_class()).visit(tree)
+
+            assert_equal(ast.dump(new_tree), expected)
+            assert_equal(ast.dump(tree), before)
+
+    def test_unchanged_subtrees_are_shared(self):
+        tree = ast.parse(source)
+        new_tree = CopyOnWriteTransform(RenameExp()).visit(tree)
+
+        assert_true(new_tree is not tree)
+        assert_true(new_tree.body[0] is not tree.body[0])
+        assert_is(new_tree.body[0].args, tree.body[0].args)
+        assert_is(new_tree.body[0].body[1], tree.body[0].body[1])
+        assert_is(new_tree.body[1], tree.body[1])
+
+    def test_identity_transform_returns_input(self):
+        tree = ast.parse(source)
+        transformer = ast.NodeTransformer()
+
+        assert_is(CopyOnWriteTransform(transformer).visit(tree), tree)
+        assert_true('visit' not in transformer.__dict__)
@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import threading
+import json
+
+from nose.tools import assert_equal, assert_true, assert_false, assert_is_instance
+
+from ast_tool_box.models.transform_models.discovery_cache import DiscoveryCache
+from ast_tool_box.models.transform_models.transform_file import TransformFile, AstTransformItem
+
+transform_source = '''import ast
+
+
+class CachedTransformer(ast.NodeTransformer):
+    """turns nothing into nothing"""
+    pass
+'''
+
+
+class TestDiscoveryCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'cached_transforms.py')
+        with open(self.file_name, 'w') as f:
+            f.write(transform_source)
+        self.cache_path = os.path.join(self.directory, 'cache', 'discovery.json')
+        self.saved_path = sys.path[:]
+
+    def tearDown(self):
+        sys.modules.pop('cached_transforms', None)
+        sys.path[:] = self.saved_path
+        shutil.rmtree(self.directory)
+
+    def test_cached_transforms_are_not_imported_until_used(self):
+        transform_file = TransformFile(self.file_name, discovery_cache=DiscoveryCache(self.cache_path))
+        assert_true('cached_transforms' in sys.modules)
+        assert_true(os.path.isfile(self.cache_path))
+        imported = transform_file.node_transforms[0]
+        del sys.modules['cached_transforms']
+
+        transform_file = TransformFile(self.file_name, discovery_cache=DiscoveryCache(self.cache_path))
+        assert_false('cached_transforms' in sys.modules)
+        cached = transform_file.node_transforms[0]
+        assert_is_instance(cached, AstTransformItem)
+        assert_equal(cached.name(), 'CachedTransformer')
+        assert_equal(cached.doc, "turns nothing into nothing")
+        assert_equal(cached.super_classes(), imported.super_classes())
+        assert_equal(cached.source_text, imported.source_text)
+        assert_false(cached.has_args())
+        assert_false('cached_transforms' in sys.modules)
+
+        assert_equal(cached.transform.__name__, 'CachedTransformer')
+        assert_true('cached_transforms' in sys.modules)
+
+    def test_changed_files_are_discovered_again(self):
+        TransformFile(self.file_name, discovery_cache=DiscoveryCache(self.cache_path))
+        del sys.modules['cached_transforms']
+
+        # a new mtime alone keeps the entry
+        os.utime(self.file_name, (1000, 1000))
+        TransformFile(self.file_name, discovery_cache=DiscoveryCache(self.cache_path))
+        assert_false('cached_transforms' in sys.modules)
+
+        with open(self.file_name, 'a') as f:
+            f.write("\n\nclass OtherTransformer(CachedTransformer):\n    pass\n")
+        transform_file = TransformFile(self.file_name, discovery_cache=DiscoveryCache(self.cache_path))
+        assert_true('cached_transforms' in sys.modules)
+        assert_equal([item.name() for item in transform_file.node_transforms], ['CachedTransformer', 'OtherTransformer'])
+
+    def test_lazy_files_wait_for_discover(self):
+        cache = DiscoveryCache(self.cache_path)
+        transform_file = TransformFile(self.file_name, discovery_cache=cache, lazy=True)
+        assert_false(transform_file.discovered)
+        assert_equal(transform_file.node_transforms, [])
+        assert_equal(transform_file.source_text, transform_source)
+        assert_false('cached_transforms' in sys.modules)
+
+        assert_false(transform_file.load_cached())
+        transform_file.discover()
+        assert_true(transform_file.discovered)
+        assert_true('cached_transforms' in sys.modules)
+        del sys.modules['cached_transforms']
+
+        transform_file = TransformFile(self.file_name, discovery_cache=cache, lazy=True)
+        assert_true(transform_file.load_cached())
+        assert_true(transform_file.discovered)
+        assert_equal([item.name() for item in transform_file.node_transforms], ['CachedTransformer'])
+        assert_false('cached_transforms' in sys.modules)
+
+    def test_threads_share_a_cache(self):
+        cache = DiscoveryCache(self.cache_path)
+        errors = []
+
+        def remember(index):
+            try:
+                for count in range(20):
+                    key = 'key_%d_%d' % (index, count)
+                    cache.put(key, [self.file_name], [{'name': key}])
+                    assert_equal(cache.get(key), [{'name': key}])
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=remember, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert_equal(errors, [])
+        with open(self.cache_path) as cache_file:
+            assert_equal(len(json.load(cache_file)['entries']), 80)
@@ -0,0 +1,164 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_true
+
+from ast_tool_box.models.fused_transform import FusedTransform, fuse_passes, run_passes
+
+
+class UpperNames(ast.NodeTransformer):
+    local_rewrite = True
+
+    def visit_Name(self, node):
+        node.id = node.id.upper()
+        return node
+
+
+class ExpandX(ast.NodeTransformer):
+    """replaces x by y + 1, later transforms have to see the new y"""
+    local_rewrite = True
+
+    def visit_Name(self, node):
+        if node.id == 'x':
+            return ast.parse("y + 1", mode='eval').body
+        return node
+
+
+class DropPass(ast.NodeTransformer):
+    local_rewrite = True
+
+    def visit_Pass(self, node):
+        return None
+
+
+class DoubleReturns(ast.NodeTransformer):
+    local_rewrite = True
+
+    def visit_Return(self, node):
+        self.generic_visit(node)
+        return [node, ast.Return(value=node.value)]
+
+
+class CountNames(ast.NodeTransformer):
+    needs_global_state = True
+
+    def __init__(self):
+        self.names = 0
+
+    def visit_Name(self, node):
+        self.names += 1
+        return node
+
+
+class RenameChildren(ast.NodeTransformer):
+    """visits the children itself, the way ctree transformers often do"""
+    def visit_Call(self, node):
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_Name(self, node):
+        node.id += '_'
+        return node
+
+
+class FoldXPlusOne(ast.NodeTransformer):
+    """looks at the children of the node it is handed, so it is not a local rewrite"""
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.left, ast.Name) and node.left.id == 'x':
+            return ast.Name(id='x_plus', ctx=ast.Load())
+        return node
+
+
+class SkipCalls(ast.NodeTransformer):
+    """upper cases names outside of calls"""
+    local_rewrite = True
+
+    def visit_Call(self, node):
+        return node
+
+    def visit_Name(self, node):
+        node.id = node.id.upper()
+        return node
+
+
+def sequential_passes(source, transformers):
+    tree = ast.parse(source)
+    for transformer in transformers:
+        tree = transformer.visit(tree)
+    return tree
+
+
+class TestFusedTransform(unittest.TestCase):
+    source = "def f(a, b):\n    pass\n    return a + b * x\n"
+
+    def chain(self):
+        return [ExpandX(), UpperNames(), DropPass(), DoubleReturns()]
+
+    def test_fused_matches_sequential_passes(self):
+        sequential = ast.parse(self.source)
+        for transformer in self.chain():
+            sequential = transformer.visit(sequential)
+
+        fused = run_passes(ast.parse(self.source), self.chain())
+
+        assert_equal(ast.dump(fused), ast.dump(sequential))
+        assert_true('Y' in ast.dump(fused))
+
+    def test_global_state_splits_the_chain(self):
+        passes = fuse_passes([ExpandX(), CountNames(), UpperNames(), DropPass()])
+
+        assert_equal(len(passes), 3)
+        assert_true(isinstance(passes[0], ExpandX))
+        assert_true(isinstance(passes[1], CountNames))
+        assert_true(isinstance(passes[2], FusedTransform))
+        assert_equal(passes[2].name(), "UpperNames+DropPass")
+
+    def test_transformers_are_left_as_they_were(self):
+        transformers = self.chain()
+        run_passes(ast.parse(self.source), transformers)
+
+        for transformer in transformers:
+            assert_true('generic_visit' not in transformer.__dict__)
+
+    def test_only_local_rewrites_are_fused(self):
+        source = "add(a, 1)"
+        sequential = ast.parse(source)
+        for transformer in [RenameChildren(), UpperNames()]:
+            sequential = transformer.visit(sequential)
+
+        passes = fuse_passes([RenameChildren(), UpperNames(), DropPass()])
+        assert_true(isinstance(passes[0], RenameChildren))
+        assert_true(isinstance(passes[1], FusedTransform))
+
+        fused = run_passes(ast.parse(source), [RenameChildren(), UpperNames()])
+        assert_equal(ast.dump(fused), ast.dump(sequential))
+        assert_true("'A_'" in ast.dump(fused))
+
+    def test_handlers_that_read_children_are_not_fused(self):
+        source = "y = x + 1"
+        sequential = sequential_passes(source, [FoldXPlusOne(), UpperNames()])
+
+        passes = fuse_passes([FoldXPlusOne(), UpperNames(), DropPass()])
+        assert_true(isinstance(passes[0], FoldXPlusOne))
+        assert_true(isinstance(passes[1], FusedTransform))
+
+        fused = run_passes(ast.parse(source), [FoldXPlusOne(), UpperNames(), DropPass()])
+        assert_equal(ast.dump(fused), ast.dump(sequential))
+        assert_true("'X_PLUS'" in ast.dump(fused))
+
+    def test_skipped_children_wait_for_the_next_transform(self):
+        source = "y = f(x)\npass\n"
+        sequential = sequential_passes(source, [SkipCalls(), DropPass()])
+
+        passes = fuse_passes([SkipCalls(), DropPass()])
+        assert_equal(len(passes), 1)
+        fused = run_passes(ast.parse(source), [SkipCalls(), DropPass()])
+        assert_equal(ast.dump(fused), ast.dump(sequential))
+        assert_true("'Y'" in ast.dump(fused))
+        assert_true("'f'" in ast.dump(fused) and "'x'" in ast.dump(fused))
+
+        sequential = sequential_passes(source, [SkipCalls(), UpperNames()])
+        fused = run_passes(ast.parse(source), [SkipCalls(), UpperNames()])
+        assert_equal(ast.dump(fused), ast.dump(sequential))
+        assert_true("'F'" in ast.dump(fused))
@@ -0,0 +1,28 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_true
+
+from ctree.c.nodes import CFile, FunctionDecl, SymbolRef, Return
+
+from ast_tool_box.transformers.NonCtreeNodeConverter import NonCtreeNodeConverter, NonCtreeNode
+
+
+class TestNonCtreeNode(unittest.TestCase):
+    def setUp(self):
+        self.assign = ast.parse("x = 1").body[0]
+        self.tree = CFile("mixed", [FunctionDecl(None, "f", params=[], defn=[self.assign, Return(SymbolRef("y"))])])
+
+    def test_python_subtrees_are_wrapped_where_they_hang(self):
+        tree = NonCtreeNodeConverter().visit(self.tree)
+        wrapper = tree.body[0].defn[0]
+
+        assert_true(isinstance(wrapper, NonCtreeNode))
+        assert_true(wrapper.node is self.assign)
+        assert_true(isinstance(wrapper.targets[0], ast.Name))
+
+    def test_codegen_converts_as_it_goes(self):
+        code = NonCtreeNodeConverter().visit(self.tree).codegen()
+
+        assert_equal(code, "// <file: mixed.c>\nvoid f() {\n    // Assign\n// %s\n\n    return y;\n};\n" % (
+            type(self.assign.value).__name__))
@@ -0,0 +1,44 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal
+
+from ctree.c.nodes import CFile, FunctionDecl, SymbolRef, Return, Assign, Constant, Add
+from ctree.nodes import Project
+
+from ast_tool_box.models.transform_worker import TransformJob
+from ast_tool_box.models.subtree_splice import node_at
+
+
+def c_file(name):
+    return CFile(name, [FunctionDecl(None, name + "_f", params=[], defn=[
+        Assign(SymbolRef("y"), Add(SymbolRef("y"), Constant(2))),
+        Return(SymbolRef("y")),
+    ])])
+
+
+class TestSourceMap(unittest.TestCase):
+    def setUp(self):
+        self.tree = Project([c_file("a"), c_file("b")])
+        job = TransformJob(ast.NodeTransformer, self.tree, generate=True)
+        job.record_source_map = True
+        self.lines = job.run().split("\n")
+        self.source_map = job.source_map
+
+    def test_position_to_node(self):
+        line = self.lines.index("void b_f() {") + 2
+        column = self.lines[line - 1].index("2")
+
+        path = self.source_map.path_at(line, column)
+
+        assert_equal(path[0], ('files', 1))
+        assert_equal(node_at(self.tree, path), self.tree.files[1].body[0].defn[0].right.right)
+        assert_equal(self.source_map.path_at(1, 0), None)
+
+    def test_node_to_span(self):
+        path = [('files', 0), ('body', 0), ('defn', 1)]
+
+        (line, column), end = self.source_map.span_of(path)
+
+        assert_equal(self.lines[line - 1][column:end[1]], "return y")
+        assert_equal(self.source_map.span_of(path + [('missing', None)]), ((line, column), end))
@@ -0,0 +1,51 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_true, assert_false
+
+from ast_tool_box.models.subtree_splice import node_path, node_at, splice
+from ast_tool_box.models.transform_worker import TransformJob
+from ast_tool_box.models.tree_hash import TreeHasher
+
+
+class UpperNames(ast.NodeTransformer):
+    def visit_Name(self, node):
+        node.id = node.id.upper()
+        return node
+
+
+class TestSubtreeSplice(unittest.TestCase):
+    source = "def f(a):\n    return a + b\n\ndef g(c):\n    return c * d\n"
+
+    def test_only_the_path_is_copied(self):
+        tree = ast.parse(self.source)
+        before = ast.dump(tree)
+        binop = tree.body[1].body[0].value
+        hasher = TreeHasher(tree)
+
+        path = node_path(tree, binop, hasher.parent_of)
+        assert_equal(path, node_path(tree, binop))
+        assert_equal(path, [('body', 1), ('body', 0), ('value', None)])
+
+        job = TransformJob(UpperNames, tree)
+        job.subtree_path = path
+        new_tree = job.run()
+
+        assert_equal(ast.dump(tree), before)
+        assert_true(new_tree.body[0] is tree.body[0])
+        assert_true(new_tree.body[1].args is tree.body[1].args)
+        assert_false(new_tree.body[1] is tree.body[1])
+        assert_equal(ast.dump(node_at(new_tree, path)), ast.dump(ast.parse("C * D", mode='eval').body))
+
+        new_hasher = TreeHasher(new_tree, base=hasher)
+        assert_equal(new_hasher.hash_of(), TreeHasher(new_tree).hash_of())
+        assert_true(new_hasher.parent_of(new_tree.body[1].args) is new_tree.body[1])
+
+    def test_removing_and_expanding(self):
+        tree = ast.parse(self.source)
+        path = node_path(tree, tree.body[0])
+
+        assert_equal(len(splice(tree, path, None).body), 1)
+        assert_equal(len(splice(tree, path, [tree.body[1], tree.body[1]]).body), 3)
+        assert_equal(len(tree.body), 2)
+        assert_true(splice(tree, [], tree.body[0]) is tree.body[0])
@@ -0,0 +1,70 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_not_equal, assert_is, assert_is_none
+
+from ast_tool_box.models.tree_hash import tree_hash
+from ast_tool_box.models.transform_cache import TransformCache
+
+
+class RenameExp(ast.NodeTransformer):
+    pass
+
+
+class FakeTransformItem(object):
+    def __init__(self, transform, source_text, transform_file=None):
+        self.transform = transform
+        self.source_text = source_text
+        self.transform_file = transform_file
+
+
+class TestTransformCache(unittest.TestCase):
+    def test_key_covers_tree_source_and_arguments(self):
+        transform_item = FakeTransformItem(RenameExp, "class RenameExp: pass")
+        edited_item = FakeTransformItem(RenameExp, "class RenameExp: x = 1")
+        key = TransformCache.key("abc", transform_item, [1])
+
+        assert_equal(key, TransformCache.key("abc", transform_item, [1]))
+        assert_not_equal(key, TransformCache.key("abd", transform_item, [1]))
+        assert_not_equal(key, TransformCache.key("abc", transform_item, [2]))
+        assert_not_equal(key, TransformCache.key("abc", edited_item, [1]))
+
+    def test_lru_and_invalidate(self):
+        cache = TransformCache(max_entries=2)
+        transform_file = object()
+        transform_item = FakeTransformItem(RenameExp, "", transform_file=transform_file)
+        result = ast.parse("a = 1")
+
+        cache.put('a', result, transform_item)
+        cache.put('b', "code")
+        assert_is(cache.get('a'), result)
+        cache.put('c', "more code")
+        assert_is_none(cache.get('b'))
+        assert_equal(len(cache), 2)
+
+        cache.invalidate(transform_file)
+        assert_is_none(cache.get('a'))
+        assert_equal(cache.get('c'), "more code")
+
+    def test_tree_hash_is_only_worked_out_for_a_possible_hit(self):
+        cache = TransformCache()
+        transform_item = FakeTransformItem(RenameExp, "")
+        other_item = FakeTransformItem(RenameExp, "class RenameExp: x = 1")
+        tree = ast.parse("a = 1")
+        calls = []
+
+        def hash_later(tree=tree):
+            calls.append(tree)
+            return tree_hash(tree)
+
+        key = TransformCache.key(hash_later, transform_item)
+        assert_is_none(cache.get(key))
+        cache.put(key, tree, transform_item)
+        assert_is_none(cache.get(TransformCache.key(hash_later, other_item)))
+        assert_equal(calls, [])
+
+        assert_is(cache.get(TransformCache.key(tree_hash(tree), transform_item)), tree)
+        assert_equal(len(calls), 1)
+        assert_is(cache.get(TransformCache.key(hash_later, transform_item)), tree)
+        assert_equal(len(calls), 2)
+        assert_is_none(cache.get(TransformCache.key("abc", transform_item)))
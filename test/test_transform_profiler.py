@@ -0,0 +1,56 @@
+import unittest
+import ast
+import json
+
+from nose.tools import assert_equal, assert_true
+
+from ast_tool_box.models.transform_profiler import TransformProfiler
+from ast_tool_box.models.transform_worker import TransformJob, TransformWorkerPool
+
+
+class RenameAndDropPass(ast.NodeTransformer):
+    def visit_Name(self, node):
+        return ast.copy_location(ast.Name(id=node.id.upper(), ctx=node.ctx), node)
+
+    def visit_Pass(self, node):
+        return None
+
+
+class TestTransformProfiler(unittest.TestCase):
+    source = "def f(a, b):\n    pass\n    return a + b * c\n"
+
+    def test_counts_by_method_and_node_class(self):
+        profiler = TransformProfiler()
+        transformer = RenameAndDropPass()
+        restore = profiler.install(transformer)
+        transformer.visit(ast.parse(self.source))
+        restore()
+
+        report = profiler.report()
+        methods = dict((row['name'], row) for row in report['methods'])
+        node_classes = dict((row['name'], row) for row in report['node_classes'])
+
+        assert_equal(report['transform'], 'RenameAndDropPass')
+        assert_equal(methods['visit_Name']['calls'], 3)
+        assert_equal(methods['visit_Name']['replaced'], 3)
+        assert_equal(methods['visit_Pass']['removed'], 1)
+        assert_equal(node_classes['Module']['kept'], 1)
+        assert_equal(sum(row['calls'] for row in report['methods']), report['nodes_visited'])
+        assert_equal(sum(row['calls'] for row in report['node_classes']), report['nodes_visited'])
+
+        generic = methods['generic_visit']
+        assert_true(generic['inclusive_seconds'] >= generic['exclusive_seconds'])
+        assert_true(report['total_seconds'] >= generic['inclusive_seconds'] - 1e-9)
+
+    def test_report_comes_back_from_a_worker(self):
+        pool = TransformWorkerPool(max_workers=1)
+        try:
+            job = TransformJob(RenameAndDropPass, ast.parse(self.source))
+            job.profiler = TransformProfiler(job.name)
+            pool.run(job)
+        finally:
+            pool.shutdown()
+
+        report = json.loads(job.profiler.to_json())
+        assert_true(report['nodes_visited'] > 0)
+        assert_equal(report['transform'], 'RenameAndDropPass')
@@ -0,0 +1,83 @@
+import unittest
+import ast
+import threading
+
+from nose.tools import assert_equal, assert_raises, assert_true
+
+from ast_tool_box.models.transform_worker import (
+    TransformJob, TransformWorkerPool, TransformWorkerError, TransformCancelled
+)
+from ast_tool_box.models.code_generation import GeneratedChunk
+
+
+class UpperNames(ast.NodeTransformer):
+    def visit_Name(self, node):
+        node.id = node.id.upper()
+        return node
+
+
+class Forever(ast.NodeTransformer):
+    def visit_Module(self, node):
+        while True:
+            pass
+
+
+class Broken(ast.NodeTransformer):
+    def visit_Name(self, node):
+        raise ValueError("broken transform")
+
+
+class TwoFileJob(TransformJob):
+    """stands in for a code generator on a project of two files"""
+    def generate_code(self):
+        chunks = [GeneratedChunk('a', 'a.c', 'int a;\n', 0.5), GeneratedChunk('b', 'b.c', 'int b;\n', 0.25)]
+        for chunk in chunks:
+            self.chunk_sink(chunk)
+        self.file_timings = [(chunk.file_name, chunk.seconds) for chunk in chunks]
+        return "".join(chunk.display_text() for chunk in chunks)
+
+
+class TestTransformWorker(unittest.TestCase):
+    def setUp(self):
+        self.pool = TransformWorkerPool(max_workers=1, timeout_seconds=1)
+        self.tree = ast.parse("a = b + 1")
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_in_process_job_copies_tree(self):
+        new_tree = TransformJob(UpperNames, self.tree).run()
+
+        assert_equal(new_tree.body[0].targets[0].id, 'A')
+        assert_equal(self.tree.body[0].targets[0].id, 'a')
+
+    def test_worker_runs_job(self):
+        new_tree = self.pool.run(TransformJob(UpperNames, self.tree))
+
+        assert_equal(new_tree.body[0].value.left.id, 'B')
+        assert_equal(self.tree.body[0].value.left.id, 'b')
+
+    def test_failures_cost_only_the_worker(self):
+        with assert_raises(TransformWorkerError) as context:
+            self.pool.run(TransformJob(Broken, self.tree))
+        assert_true("broken transform" in str(context.exception))
+
+        assert_raises(TransformWorkerError, self.pool.run, TransformJob(Forever, self.tree))
+
+        cancel_event = threading.Event()
+        threading.Timer(0.1, cancel_event.set).start()
+        assert_raises(TransformCancelled, self.pool.run, TransformJob(Forever, self.tree), cancel_event)
+
+        new_tree = self.pool.run(TransformJob(UpperNames, self.tree))
+        assert_equal(new_tree.body[0].targets[0].id, 'A')
+
+    def test_generated_chunks_arrive_before_the_result(self):
+        job = TwoFileJob(UpperNames, self.tree, generate=True)
+        arrived = []
+        job.chunk_sink = arrived.append
+
+        text = self.pool.run(job)
+
+        assert_equal([chunk.file_name for chunk in arrived], ['a.c', 'b.c'])
+        assert_equal(text, "File a\nint a;\nFile b\nint b;\n")
+        assert_equal(job.file_timings, [('a.c', 0.5), ('b.c', 0.25)])
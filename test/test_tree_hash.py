@@ -0,0 +1,113 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_not_equal, assert_true, assert_false, assert_is
+
+from ast_tool_box.models.tree_hash import tree_hash, TreeHasher
+import ast_tool_box.models.tree_hash as tree_hash_module
+from ast_tool_box.models.subtree_splice import node_path, splice
+
+source = """def square_it(x):
+    y = exp(x) + 1
+    return y
+
+def cube_it(x):
+    return x * x * x
+"""
+
+
+class TestTreeHash(unittest.TestCase):
+    def test_tree_hash(self):
+        assert_equal(tree_hash(ast.parse("a = b + 1")), tree_hash(ast.parse("a = b + 1")))
+        assert_not_equal(tree_hash(ast.parse("a = b + 1")), tree_hash(ast.parse("a = b + 2")))
+        assert_not_equal(tree_hash(ast.parse("a = b + 1")), tree_hash(ast.parse("\na = b + 1")))
+        assert_equal(
+            tree_hash(ast.parse("a = b + 1"), include_positions=False),
+            tree_hash(ast.parse("\na = b + 1"), include_positions=False)
+        )
+
+    def test_subtree_hashes(self):
+        tree = ast.parse(source)
+        hasher = TreeHasher(tree, include_positions=False)
+        other_tree = ast.parse("x * x * x")
+        other_hasher = TreeHasher(other_tree, include_positions=False)
+
+        cube_return = tree.body[1].body[0]
+        assert_true(hasher.same(cube_return.value, other_tree.body[0].value, other_hasher))
+        assert_false(hasher.same(tree.body[0], tree.body[1]))
+        assert_is(hasher.parent_of(cube_return), tree.body[1])
+
+        names = [node for node in ast.walk(tree) if isinstance(node, ast.Name) and node.id == 'x']
+        assert_equal(len(hasher.nodes_with_hash(hasher.hash_of(names[0]))), len(names))
+
+    def test_changed_rehashes_ancestors(self):
+        tree = ast.parse(source)
+        hasher = TreeHasher(tree)
+        before = hasher.hash_of()
+        untouched = hasher.hash_of(tree.body[1])
+
+        name = tree.body[0].body[0].value.left.func
+        name.id = 'expf'
+        assert_equal(hasher.changed(name), tree_hash(tree))
+        assert_not_equal(hasher.hash_of(), before)
+        assert_equal(hasher.hash_of(tree.body[1]), untouched)
+
+        tree.body[1].body.insert(0, ast.Pass(lineno=5, col_offset=4))
+        assert_equal(hasher.changed(tree.body[1]), tree_hash(tree))
+
+    def test_spliced_generations_drop_replaced_nodes(self):
+        tree = ast.parse(source)
+        hasher = TreeHasher(tree)
+        for generation in range(20):
+            target = tree.body[generation % 2].body[-1]
+            path = node_path(tree, target, hasher.parent_of)
+            tree = splice(tree, path, ast.Return(value=ast.Num(n=generation)))
+            hasher = TreeHasher(tree, base=hasher)
+
+            assert_equal(len(hasher), len(TreeHasher(tree)))
+            assert_equal(hasher.hash_of(), tree_hash(tree))
+
+    def test_forget_drops_subtrees_taken_out(self):
+        tree = ast.parse(source)
+        hasher = TreeHasher(tree)
+        removed = tree.body.pop()
+        hasher.forget(removed)
+        hasher.changed(tree)
+
+        assert_equal(hasher.hash_of(removed), None)
+        assert_equal(hasher.hash_of(), tree_hash(tree))
+        assert_equal(len(hasher), len(TreeHasher(tree)))
+
+    def test_splice_hashes_only_the_new_path(self):
+        tree = ast.parse(source * 200)
+        hasher = TreeHasher(tree)
+        target = tree.body[250].body[-1]
+        new_tree = splice(tree, node_path(tree, target, hasher.parent_of), ast.Return(value=ast.Num(n=1)))
+
+        digests = []
+        original_digest = tree_hash_module.node_digest
+
+        def counting_digest(node, *args):
+            digests.append(node)
+            return original_digest(node, *args)
+
+        tree_hash_module.node_digest = counting_digest
+        try:
+            new_hasher = TreeHasher(new_tree, base=hasher)
+        finally:
+            tree_hash_module.node_digest = original_digest
+
+        assert_true(len(digests) < 10)
+        assert_equal(new_hasher.hash_of(), tree_hash(new_tree))
+        assert_equal(len(new_hasher), len(hasher))
+        assert_equal(new_hasher.hash_of(target), None)
+        assert_equal(hasher.hash_of(target), TreeHasher(target).hash_of())
+
+        # changing the base later leaves what the new hasher read from it alone
+        shared = new_tree.body[0].body[0].targets[0]
+        before = new_hasher.hash_of(shared)
+        tree.body[0].body[0].targets[0] = ast.Name(id='z', ctx=ast.Store(), lineno=2, col_offset=4)
+        hasher.forget(shared)
+        hasher.changed(tree.body[0].body[0])
+        assert_equal(hasher.hash_of(), tree_hash(tree))
+        assert_equal(new_hasher.hash_of(shared), before)
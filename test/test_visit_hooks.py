@@ -0,0 +1,35 @@
+import unittest
+import ast
+
+from nose.tools import assert_equal, assert_raises, assert_true
+
+from ast_tool_box.models.visit_hooks import VisitCounter, VisitCancelled
+from ast_tool_box.models.copy_on_write import CopyOnWriteTransform
+from ast_tool_box.models.transform_worker import TransformJob
+
+
+class UpperNames(ast.NodeTransformer):
+    def visit_Name(self, node):
+        node.id = node.id.upper()
+        return node
+
+
+class TestVisitHooks(unittest.TestCase):
+    def test_counter_sees_every_node(self):
+        tree = ast.parse("a = b + c * 2")
+        counter = VisitCounter(total=len(list(ast.walk(tree))))
+        transformer = ast.NodeTransformer()
+        restore = counter.install(transformer)
+
+        CopyOnWriteTransform(transformer).visit(tree)
+        assert_equal(counter.count, counter.total)
+
+        restore()
+        assert_true('visit' not in transformer.__dict__)
+
+    def test_cancel_stops_traversal(self):
+        job = TransformJob(UpperNames, ast.parse("a = b + c * 2"))
+        job.progress = VisitCounter()
+        job.progress.cancelled = True
+
+        assert_raises(VisitCancelled, job.run)